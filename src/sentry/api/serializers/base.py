@@ -1,6 +1,9 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Any,
     Callable,
+    Dict,
     List,
     Mapping,
     MutableMapping,
@@ -12,7 +15,10 @@ from typing import (
 )
 
 import sentry_sdk
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from sentry_sdk import Hub
 
 from sentry.utils.json import JSONData
 
@@ -20,6 +26,10 @@ K = TypeVar("K")
 
 registry: MutableMapping[Any, Any] = {}
 
+_attr_fetcher_pool: Optional[ThreadPoolExecutor] = None
+_attr_fetcher_pool_lock = threading.Lock()
+_attr_fetcher_thread = threading.local()
+
 
 def register(type: Any) -> Callable[[Type[K]], Type[K]]:
     """A wrapper that adds the wrapped Serializer to the Serializer registry (see above) for the key `type`."""
@@ -85,6 +95,73 @@ def serialize(
             return [serializer(o, attrs=attrs.get(o, {}), user=user, **kwargs) for o in objects]
 
 
+def _get_attr_fetcher_pool() -> Optional[ThreadPoolExecutor]:
+    global _attr_fetcher_pool
+    if not settings.SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS:
+        return None
+    with _attr_fetcher_pool_lock:
+        if _attr_fetcher_pool is None:
+            _attr_fetcher_pool = ThreadPoolExecutor(
+                max_workers=settings.SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS,
+                thread_name_prefix="serializer-attrs",
+            )
+        return _attr_fetcher_pool
+
+
+def _run_attr_fetcher(hub: Hub, name: str, fetcher: Callable[[], Any]) -> Any:
+    _attr_fetcher_thread.active = True
+    try:
+        with hub, sentry_sdk.start_span(op="serialize.get_attrs.fetch", description=name):
+            return fetcher()
+    finally:
+        _attr_fetcher_thread.active = False
+        # Worker threads are not covered by the request lifecycle that usually
+        # takes care of database connections.
+        close_old_connections()
+
+
+def run_attr_fetchers(
+    fetchers: Mapping[str, Callable[[], Any]],
+    local_fetchers: Optional[Mapping[str, Callable[[], Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Run independent attribute fetchers, usually from `Serializer.get_attrs`,
+    and return their results by name.
+
+    `fetchers` run concurrently on a pool of
+    `SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS` threads, while `local_fetchers`
+    run on the calling thread. Fetchers that query the database belong in
+    `local_fetchers`, so that they run within the transaction and with the
+    connection of the request. That includes most Snuba queries, which look
+    up ids in the database to build the query. Without local fetchers, the
+    first fetcher runs on the calling thread. Fetchers must not depend on
+    each other. Fetchers run serially if the pool is disabled (the default)
+    or when fetchers are nested.
+    """
+    local_fetchers = dict(local_fetchers or {})
+    pool = _get_attr_fetcher_pool()
+    if (
+        pool is None
+        or len(fetchers) + len(local_fetchers) < 2
+        or getattr(_attr_fetcher_thread, "active", False)
+    ):
+        return {name: fetcher() for name, fetcher in {**fetchers, **local_fetchers}.items()}
+
+    remote_fetchers = dict(fetchers)
+    if not local_fetchers:
+        first_name = next(iter(remote_fetchers))
+        local_fetchers[first_name] = remote_fetchers.pop(first_name)
+
+    hub = Hub(Hub.current)
+    futures = {
+        name: pool.submit(_run_attr_fetcher, hub, name, fetcher)
+        for name, fetcher in remote_fetchers.items()
+    }
+    results = {name: fetcher() for name, fetcher in local_fetchers.items()}
+    results.update((name, future.result()) for name, future in futures.items())
+    return results
+
+
 class Serializer:
     """A Serializer class contains the logic to serialize a specific type of object."""
 
@@ -13,7 +13,7 @@ from django.db.models import Min, prefetch_related_objects
 from django.utils import timezone
 
 from sentry import release_health, tagstore, tsdb
-from sentry.api.serializers import Serializer, register, serialize
+from sentry.api.serializers import Serializer, register, run_attr_fetchers, serialize
 from sentry.api.serializers.models.actor import ActorSerializer
 from sentry.api.serializers.models.plugin import is_plugin_deprecated
 from sentry.api.serializers.models.user import UserSerializerResponse
@@ -748,7 +748,8 @@ class StreamGroupSerializer(GroupSerializer, GroupStatsMixin):
         try:
             environment = self.environment_func()
         except Environment.DoesNotExist:
-            stats = {key: tsdb.make_series(0, **query_params) for key in group_ids}
+            series = tsdb.make_series(0, **query_params)
+            stats = {key: list(series) for key in group_ids}
         else:
             stats = tsdb.get_range(
                 model=tsdb.models.group,
@@ -1020,84 +1021,102 @@ class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
             **query_params,
         )
 
+    def _get_session_counts(self, item_list):
+        uniq_project_ids = list({item.project_id for item in item_list})
+        cache_keys = {pid: self._build_session_cache_key(pid) for pid in uniq_project_ids}
+        cache_data = cache.get_many(cache_keys.values())
+        session_counts = {}
+        missed_items = []
+        for item in item_list:
+            num_sessions = cache_data.get(cache_keys[item.project_id])
+            if num_sessions is None:
+                found = "miss"
+                missed_items.append(item)
+            else:
+                found = "hit"
+                session_counts[item] = num_sessions
+            metrics.incr(f"group.get_session_counts.{found}")
+
+        if missed_items:
+            project_ids = list({item.project_id for item in missed_items})
+            project_sessions = release_health.get_num_sessions_per_project(
+                project_ids,
+                self.start,
+                self.end,
+                self.environment_ids,
+            )
+
+            results = {}
+            for project_id, count in project_sessions:
+                cache_key = self._build_session_cache_key(project_id)
+                results[project_id] = count
+                cache.set(cache_key, count, 3600)
+
+            for item in missed_items:
+                session_counts[item] = results.get(item.project_id)
+
+        return session_counts
+
     def get_attrs(self, item_list, user):
+        # All of the below are separate Snuba or Postgres queries that don't
+        # depend on each other. They all run on the request thread though, as
+        # even the Snuba queries look up groups, projects, environments and
+        # releases in Postgres to build the query, see
+        # `sentry.utils.snuba.get_snuba_translators`.
+        local_fetchers = {}
         if not self._collapse("base"):
-            attrs = super().get_attrs(item_list, user)
+            local_fetchers["base"] = functools.partial(super().get_attrs, item_list, user)
         else:
-            seen_stats = self._get_seen_stats(item_list, user)
-            if seen_stats:
-                attrs = {item: seen_stats.get(item, {}) for item in item_list}
-            else:
-                attrs = {item: {} for item in item_list}
+            local_fetchers["seen_stats"] = functools.partial(self._get_seen_stats, item_list, user)
 
         if self.stats_period and not self._collapse("stats"):
             partial_get_stats = functools.partial(
                 self.get_stats, item_list=item_list, user=user, environment_ids=self.environment_ids
             )
-            stats = partial_get_stats()
-            filtered_stats = (
-                partial_get_stats(conditions=self.conditions)
-                if self.conditions and not self._collapse("filtered")
-                else None
-            )
+            local_fetchers["stats"] = partial_get_stats
+            if self.conditions and not self._collapse("filtered"):
+                local_fetchers["filtered_stats"] = functools.partial(
+                    partial_get_stats, conditions=self.conditions
+                )
+            if self._expand("sessions"):
+                local_fetchers["session_counts"] = functools.partial(
+                    self._get_session_counts, item_list
+                )
+
+        if self._expand("inbox"):
+            local_fetchers["inbox"] = functools.partial(get_inbox_details, item_list)
+
+        if self._expand("owners"):
+            local_fetchers["owners"] = functools.partial(get_owner_details, item_list)
+
+        results = run_attr_fetchers({}, local_fetchers)
+
+        if "base" in results:
+            attrs = results["base"]
+        elif results["seen_stats"]:
+            attrs = {item: results["seen_stats"].get(item, {}) for item in item_list}
+        else:
+            attrs = {item: {} for item in item_list}
+
+        if "stats" in results:
+            stats = results["stats"]
+            filtered_stats = results.get("filtered_stats")
             for item in item_list:
                 if filtered_stats:
                     attrs[item].update({"filtered_stats": filtered_stats[item.id]})
                 attrs[item].update({"stats": stats[item.id]})
 
-            if self._expand("sessions"):
-                uniq_project_ids = list({item.project_id for item in item_list})
-                cache_keys = {pid: self._build_session_cache_key(pid) for pid in uniq_project_ids}
-                cache_data = cache.get_many(cache_keys.values())
-                missed_items = []
-                for item in item_list:
-                    num_sessions = cache_data.get(cache_keys[item.project_id])
-                    if num_sessions is None:
-                        found = "miss"
-                        missed_items.append(item)
-                    else:
-                        found = "hit"
-                        attrs[item].update(
-                            {
-                                "sessionCount": num_sessions,
-                            }
-                        )
-                    metrics.incr(f"group.get_session_counts.{found}")
-
-                if missed_items:
-                    project_ids = list({item.project_id for item in missed_items})
-                    project_sessions = release_health.get_num_sessions_per_project(
-                        project_ids,
-                        self.start,
-                        self.end,
-                        self.environment_ids,
-                    )
-
-                    results = {}
-                    for project_id, count in project_sessions:
-                        cache_key = self._build_session_cache_key(project_id)
-                        results[project_id] = count
-                        cache.set(cache_key, count, 3600)
-
-                    for item in missed_items:
-                        if item.project_id in results.keys():
-                            attrs[item].update(
-                                {
-                                    "sessionCount": results[item.project_id],
-                                }
-                            )
-                        else:
-                            attrs[item].update({"sessionCount": None})
+        if "session_counts" in results:
+            for item in item_list:
+                attrs[item].update({"sessionCount": results["session_counts"][item]})
 
-        if self._expand("inbox"):
-            inbox_stats = get_inbox_details(item_list)
+        if "inbox" in results:
             for item in item_list:
-                attrs[item].update({"inbox": inbox_stats.get(item.id)})
+                attrs[item].update({"inbox": results["inbox"].get(item.id)})
 
-        if self._expand("owners"):
-            owner_details = get_owner_details(item_list)
+        if "owners" in results:
             for item in item_list:
-                attrs[item].update({"owners": owner_details.get(item.id)})
+                attrs[item].update({"owners": results["owners"].get(item.id)})
 
         return attrs
 
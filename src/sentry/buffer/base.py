@@ -1,6 +1,10 @@
 import logging
+from collections import defaultdict
 
+from django.db import router, transaction
 from django.db.models import F
+from django.db.models.expressions import CombinedExpression
+from django.db.models.signals import post_save
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -28,7 +32,7 @@ class Buffer(Service, metaclass=BufferMount):
     keep up with the updates.
     """
 
-    __all__ = ("get", "incr", "process", "process_pending", "validate")
+    __all__ = ("get", "incr", "process", "process_batch", "process_pending", "validate")
 
     def get(self, model, columns, filters):
         """
@@ -57,27 +61,36 @@ class Buffer(Service, metaclass=BufferMount):
     def process_pending(self, partition=None):
         return []
 
-    def process(self, model, columns, filters, extra=None, signal_only=None):
+    def _get_update_kwargs(self, model, columns, extra):
         from sentry.event_manager import ScoreClause
         from sentry.models import Group
 
+        update_kwargs = {c: F(c) + v for c, v in columns.items()}
+
+        if extra:
+            update_kwargs.update(extra)
+
+        # HACK(dcramer): this is gross, but we don't have a good hook to compute this property today
+        # XXX(dcramer): remove once we can replace 'priority' with something reasonable via Snuba
+        if model is Group:
+            if "last_seen" in update_kwargs and "times_seen" in update_kwargs:
+                update_kwargs["score"] = ScoreClause(
+                    group=None,
+                    times_seen=update_kwargs["times_seen"],
+                    last_seen=update_kwargs["last_seen"],
+                )
+
+        return update_kwargs
+
+    def process(self, model, columns, filters, extra=None, signal_only=None):
+        from sentry.models import Group
+
         created = False
 
         if not signal_only:
-            update_kwargs = {c: F(c) + v for c, v in columns.items()}
+            update_kwargs = self._get_update_kwargs(model, columns, extra)
 
-            if extra:
-                update_kwargs.update(extra)
-
-            # HACK(dcramer): this is gross, but we don't have a good hook to compute this property today
-            # XXX(dcramer): remove once we can replace 'priority' with something reasonable via Snuba
             if model is Group:
-                if "last_seen" in update_kwargs and "times_seen" in update_kwargs:
-                    update_kwargs["score"] = ScoreClause(
-                        group=None,
-                        times_seen=update_kwargs["times_seen"],
-                        last_seen=update_kwargs["last_seen"],
-                    )
                 # XXX: create_or_update doesn't fire `post_save` signals, and so this update never
                 # ends up in the cache. This causes issues when handling issue alerts, and likely
                 # elsewhere. Use `update` here since we're already special casing, and we know that
@@ -102,3 +115,75 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, batch):
+        """
+        Applies many buffered increments at once. ``batch`` is a sequence of
+        ``(model, columns, filters, extra, signal_only)`` tuples, as they would
+        be passed to ``process``.
+
+        Increments on ``Group`` rows that are addressed by primary key are
+        coalesced: all affected groups are fetched with a single query and
+        updated with one bulk UPDATE per distinct set of updated columns, in a
+        single transaction. Everything else is handed to ``process``.
+        """
+        from sentry.db.models.utils import resolve_combined_expression
+        from sentry.models import Group
+
+        group_items = {}
+        for model, columns, filters, extra, signal_only in batch:
+            if model is Group and not signal_only and len(filters) == 1:
+                ((field, value),) = filters.items()
+                if field in ("id", "pk") and isinstance(value, int):
+                    group_items[value] = (columns, filters, extra)
+                    continue
+            # Subclasses overload ``process`` to flush their own storage, so
+            # explicitly apply the increment here.
+            Buffer.process(self, model, columns, filters, extra, signal_only)
+
+        if not group_items:
+            return
+
+        groups = Group.objects.in_bulk(list(group_items.keys()))
+
+        # Rows can only share a CASE statement if they update the same set of
+        # columns, otherwise we'd overwrite columns with stale values.
+        updates_by_fields = defaultdict(list)
+        for group_id, group in groups.items():
+            columns, _, extra = group_items[group_id]
+            update_kwargs = self._get_update_kwargs(Group, columns, extra)
+            # Resolve the values the row will have after the update (the same
+            # way ``update`` does) before replacing them with the expressions.
+            resolved = {
+                k: resolve_combined_expression(group, v) if isinstance(v, CombinedExpression) else v
+                for k, v in update_kwargs.items()
+            }
+            for k, v in update_kwargs.items():
+                setattr(group, k, v)
+            updates_by_fields[tuple(sorted(update_kwargs))].append((group, resolved))
+
+        using = router.db_for_write(Group)
+        with transaction.atomic(using=using):
+            for fields, updates in updates_by_fields.items():
+                Group.objects.using(using).bulk_update(
+                    [group for group, _ in updates], fields, batch_size=len(updates)
+                )
+
+        for updates in updates_by_fields.values():
+            for group, resolved in updates:
+                for k, v in resolved.items():
+                    setattr(group, k, v)
+                # Keep the group cache up to date, see ``process``.
+                post_save.send(sender=Group, instance=group, created=False)
+
+        # If a group was deleted by the time we flush buffers we still notify
+        # about it, matching ``process``.
+        for columns, filters, extra in group_items.values():
+            buffer_incr_complete.send_robust(
+                model=Group,
+                columns=columns,
+                filters=filters,
+                extra=extra,
+                created=False,
+                sender=Group,
+            )
@@ -1,4 +1,14 @@
+import atexit
+import os
+import threading
+import weakref
+from time import sleep, time
+
+from celery.signals import worker_process_shutdown
+
 from sentry.buffer import Buffer
+from sentry.utils import metrics
+from sentry.utils.services import build_instance_from_options
 
 
 class InProcessBuffer(Buffer):
@@ -11,3 +21,213 @@ class InProcessBuffer(Buffer):
 
     def incr(self, model, columns, filters, extra=None, signal_only=None):
         self.process(model, columns, filters, extra, signal_only)
+
+
+class CombiningBuffer(Buffer):
+    """
+    In-process write-combining layer in front of another buffer backend.
+
+    Increments for the same model and filters are combined locally: counters
+    are summed, extra values are last write wins and ``signal_only`` is set
+    if any combined increment set it. Combined increments are handed to the
+    backend once ``max_keys`` distinct keys are pending or ``max_delay``
+    seconds have passed, and when the process shuts down. Increments that
+    the backend fails to take are combined with the pending ones again and
+    retried with the next flush.
+
+    Everything other than ``incr`` is delegated to the backend, which is
+    configured like any other service::
+
+        SENTRY_BUFFER = "sentry.buffer.inprocess.CombiningBuffer"
+        SENTRY_BUFFER_OPTIONS = {
+            "backend": {"path": "sentry.buffer.redis.RedisBuffer", "options": {}},
+            "max_keys": 1000,
+            "max_delay": 1.0,
+        }
+    """
+
+    def __init__(self, backend=None, max_keys=1000, max_delay=1.0):
+        if backend is None:
+            backend = {"path": "sentry.buffer.redis.RedisBuffer"}
+        self.backend = build_instance_from_options(backend)
+        self.max_keys = max_keys
+        self.max_delay = max_delay
+        assert self.max_keys > 0
+        assert self.max_delay > 0
+
+        self.__lock = threading.Lock()
+        # Held while sending, so that batches reach the backend in the order
+        # they were taken and later extra values win.
+        self.__send_lock = threading.Lock()
+        self.__pending = {}
+        self.__last_flush = time()
+        self.__flusher_pid = None
+        self.__closed = False
+
+        _buffers.add(self)
+
+    def __ensure_flusher(self):
+        # The flusher thread does not survive forking (e.g. into a celery
+        # worker process), so (re)start it lazily from the process that
+        # is actually buffering.
+        pid = os.getpid()
+        if self.__flusher_pid == pid:
+            return
+        self.__flusher_pid = pid
+        threading.Thread(
+            target=_run_flusher,
+            args=(weakref.ref(self), self.max_delay),
+            name="buffer-flusher",
+            daemon=True,
+        ).start()
+
+    def _flush_if_due(self):
+        if time() - self.__last_flush >= self.max_delay:
+            self.flush()
+
+    def validate(self):
+        self.backend.validate()
+
+    def get(self, model, columns, filters):
+        result = self.backend.get(model, columns, filters)
+        try:
+            key = (model, tuple(sorted(filters.items())))
+            hash(key)
+        except TypeError:
+            return result
+
+        with self.__lock:
+            pending = self.__pending.get(key)
+            if pending is not None:
+                for column in columns:
+                    result[column] = result.get(column, 0) + pending[1].get(column, 0)
+        return result
+
+    def incr(self, model, columns, filters, extra=None, signal_only=None):
+        try:
+            key = (model, tuple(sorted(filters.items())))
+            hash(key)
+        except TypeError:
+            # Filters we can't use as a key can't be combined either.
+            self.backend.incr(model, columns, filters, extra=extra, signal_only=signal_only)
+            return
+
+        with self.__lock:
+            if key in self.__pending:
+                metrics.incr("buffer.combined", skip_internal=True)
+            self.__merge(key, [model, columns, filters, extra, signal_only])
+            due = (
+                len(self.__pending) >= self.max_keys or time() - self.__last_flush >= self.max_delay
+            )
+
+        if due:
+            self.flush()
+        else:
+            self.__ensure_flusher()
+
+    def __merge(self, key, increment):
+        # Must be called with the lock held.
+        model, columns, filters, extra, signal_only = increment
+        pending = self.__pending.get(key)
+        if pending is None:
+            pending = self.__pending[key] = [model, {}, filters, {}, None]
+
+        pending_columns = pending[1]
+        for column, amount in columns.items():
+            pending_columns[column] = pending_columns.get(column, 0) + amount
+        if extra:
+            pending[3].update(extra)
+        if signal_only is True:
+            pending[4] = True
+
+    def __take_pending(self):
+        # Must be called with the lock held.
+        self.__last_flush = time()
+        pending = self.__pending
+        self.__pending = {}
+        return list(pending.items())
+
+    def __restore_pending(self, batch):
+        # Must be called with the lock held. The increments of ``batch`` are
+        # older than the pending ones, so the pending extra values win.
+        pending = self.__pending
+        self.__pending = {}
+        for key, increment in batch:
+            self.__merge(key, increment)
+        for key, increment in pending.items():
+            self.__merge(key, increment)
+
+    def __send(self, batch):
+        # Must be called with the send lock held.
+        metrics.timing("buffer.combined-flush-size", len(batch))
+        for i, (_, (model, columns, filters, extra, signal_only)) in enumerate(batch):
+            try:
+                self.backend.incr(
+                    model, columns, filters, extra=extra or None, signal_only=signal_only
+                )
+            except Exception:
+                with self.__lock:
+                    self.__restore_pending(batch[i:])
+                raise
+
+    def flush(self):
+        """
+        Hands all pending combined increments to the backend.
+        """
+        with self.__send_lock:
+            with self.__lock:
+                batch = self.__take_pending()
+
+            if batch:
+                self.__send(batch)
+
+    def close(self):
+        """
+        Flushes all pending increments and stops flushing in the background.
+        """
+        self.__closed = True
+        _buffers.discard(self)
+        self.flush()
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def process_pending(self, partition=None):
+        return self.backend.process_pending(partition=partition)
+
+    def process(self, *args, **kwargs):
+        return self.backend.process(*args, **kwargs)
+
+    def process_batch(self, batch):
+        return self.backend.process_batch(batch)
+
+
+_buffers = weakref.WeakSet()
+
+
+def _run_flusher(buffer_ref, max_delay):
+    # Only holds a weak reference to the buffer between flushes, so that
+    # buffers that are no longer used can be garbage collected.
+    while True:
+        sleep(max_delay)
+        buffer = buffer_ref()
+        if buffer is None or buffer.closed:
+            return
+        try:
+            buffer._flush_if_due()
+        except Exception:
+            buffer.logger.exception("buffer.combined-flush-failed")
+        del buffer
+
+
+def _flush_all(**kwargs):
+    for buffer in list(_buffers):
+        try:
+            buffer.flush()
+        except Exception:
+            buffer.logger.exception("buffer.combined-flush-failed")
+
+
+atexit.register(_flush_all)
+worker_process_shutdown.connect(_flush_all)
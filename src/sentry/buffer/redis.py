@@ -1,8 +1,10 @@
 import pickle
 import threading
+from collections import defaultdict
 from datetime import datetime
 from time import time
 
+import rapidjson
 from django.db import models
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
@@ -14,11 +16,28 @@ from sentry.utils import json, metrics
 from sentry.utils.compat import crc32
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
 
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
 
+incr_script = load_script("buffer/incr.lua")
+
+#: Available strategies for writing increments to Redis. ``pipeline`` sends
+#: one command per counter/extra in a pipeline, ``script`` applies the whole
+#: increment server-side with a single script invocation.
+INCR_MODES = frozenset(["pipeline", "script"])
+
+#: Available encodings for buffered filters and extra values. ``pickle`` is
+#: the legacy encoding, ``json`` is smaller and cheaper to decode, and falls
+#: back to pickle for values it cannot represent losslessly.
+VALUE_CODECS = frozenset(["pickle", "json"])
+
+#: Available strategies for flushing a batch of pending keys. ``single``
+#: flushes one key at a time, ``batch`` fetches all keys of a batch with one
+#: transaction per Redis host and applies them with ``Buffer.process_batch``.
+FLUSH_MODES = frozenset(["single", "batch"])
+
 
 class PendingBuffer:
     def __init__(self, size):
@@ -51,12 +70,29 @@ class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        incr_mode="pipeline",
+        value_codec="pickle",
+        flush_mode="single",
+        pending_chunk_size=10000,
+        **options,
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        self.incr_mode = incr_mode
+        self.value_codec = value_codec
+        self.flush_mode = flush_mode
+        self.pending_chunk_size = pending_chunk_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.incr_mode in INCR_MODES, f"invalid incr_mode: {incr_mode}"
+        assert self.value_codec in VALUE_CODECS, f"invalid value_codec: {value_codec}"
+        assert self.flush_mode in FLUSH_MODES, f"invalid flush_mode: {flush_mode}"
+        assert self.pending_chunk_size > 0
 
     def validate(self):
         try:
@@ -117,7 +153,10 @@ class RedisBuffer(Buffer):
             type_ = "s"
         elif isinstance(value, datetime):
             type_ = "d"
-            value = value.strftime("%s.%f")
+            value = value.timestamp()
+        elif isinstance(value, bool):
+            # Would be written as "i" and fail to load.
+            raise TypeError(type(value))
         elif isinstance(value, int):
             type_ = "i"
         elif isinstance(value, float):
@@ -137,14 +176,36 @@ class RedisBuffer(Buffer):
         if type_ == "s":
             return force_text(value)
         elif type_ == "d":
-            return datetime.fromtimestamp(float(value)).replace(tzinfo=timezone.utc)
+            return datetime.fromtimestamp(float(value), timezone.utc)
         elif type_ == "i":
             return int(value)
         elif type_ == "f":
             return float(value)
+        elif type_ == "j":
+            # Structured values, embedded as-is. Not written yet, so that
+            # readers that don't know this type keep working during deploys.
+            return value
         else:
             raise TypeError(f"invalid type: {type_}")
 
+    def _encode_filters(self, filters):
+        if self.value_codec == "json":
+            try:
+                return rapidjson.dumps(self._dump_values(filters))
+            except TypeError:
+                pass
+        return pickle.dumps(filters)
+
+    def _encode_value(self, value):
+        # Values that ``_dump_value`` has no type for (``None``, bools,
+        # structured values, ...) fall back to pickle.
+        if self.value_codec == "json":
+            try:
+                return rapidjson.dumps(self._dump_value(value))
+            except TypeError:
+                pass
+        return pickle.dumps(value)
+
     def get(self, model, columns, filters):
         """
         Fetches buffered values for a model/filter. Passed columns must be integer columns.
@@ -170,41 +231,58 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
+
+        With ``incr_mode="script"`` all of the above is applied atomically by a
+        single server-side script invocation instead of a pipeline.
         """
 
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
         key = self._make_key(model, filters)
         pending_key = self._make_pending_key_from_key(key)
         # We can't use conn.map() due to wanting to support multiple pending
         # keys (one per Redis partition)
         conn = self.cluster.get_local_client_for_key(key)
 
-        pipe = conn.pipeline()
-        pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
+        model_name = f"{model.__module__}.{model.__name__}"
         # TODO(dcramer): once this goes live in production, we can kill the pickle path
         # (this is to ensure a zero downtime deploy where we can transition event processing)
-        pipe.hsetnx(key, "f", pickle.dumps(filters))
-        # pipe.hsetnx(key, 'f', json.dumps(self._dump_values(filters)))
-        for column, amount in columns.items():
-            pipe.hincrby(key, "i+" + column, amount)
-
-        if extra:
-            # Group tries to serialize 'score', so we'd need some kind of processing
-            # hook here
-            # e.g. "update score if last_seen or times_seen is changed"
-            for column, value in extra.items():
-                # TODO(dcramer): once this goes live in production, we can kill the pickle path
-                # (this is to ensure a zero downtime deploy where we can transition event processing)
-                pipe.hset(key, "e+" + column, pickle.dumps(value))
-                # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
-
-        if signal_only is True:
-            pipe.hset(key, "s", "1")
-
-        pipe.expire(key, self.key_expire)
-        pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
+        encoded_filters = self._encode_filters(filters)
+        # Group tries to serialize 'score', so we'd need some kind of processing
+        # hook here
+        # e.g. "update score if last_seen or times_seen is changed"
+        encoded_extra = {
+            column: self._encode_value(value) for column, value in (extra or {}).items()
+        }
+
+        if self.incr_mode == "script":
+            args = [
+                model_name,
+                encoded_filters,
+                self.key_expire,
+                time(),
+                "1" if signal_only is True else "0",
+                len(columns),
+            ]
+            for column, amount in columns.items():
+                args.extend((column, amount))
+            for column, value in encoded_extra.items():
+                args.extend((column, value))
+            incr_script(conn, [key, pending_key], args)
+        else:
+            pipe = conn.pipeline()
+            pipe.hsetnx(key, "m", model_name)
+            pipe.hsetnx(key, "f", encoded_filters)
+            for column, amount in columns.items():
+                pipe.hincrby(key, "i+" + column, amount)
+
+            for column, value in encoded_extra.items():
+                pipe.hset(key, "e+" + column, value)
+
+            if signal_only is True:
+                pipe.hset(key, "s", "1")
+
+            pipe.expire(key, self.key_expire)
+            pipe.zadd(pending_key, {key: time()})
+            pipe.execute()
 
         metrics.incr(
             "buffer.incr",
@@ -233,25 +311,51 @@ class RedisBuffer(Buffer):
 
         try:
             keycount = 0
-            with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
-
-            with self.cluster.all() as conn:
-                for host_id, keys in results.value.items():
-                    if not keys:
-                        continue
-                    keycount += len(keys)
-                    for key in keys:
-                        pending_buffer.append(key.decode("utf-8"))
-                        if pending_buffer.full():
-                            process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
-                    conn.target([host_id]).zrem(pending_key, *keys)
+            oldest = None
+            # Only drain keys which were pending when we started, anything
+            # added afterwards is picked up by the next run. This bounds the
+            # amount of work done here even while the set keeps growing.
+            now = time()
+            hosts = list(self.cluster.hosts)
+            # Walk all hosts in lock step, one chunk of pending keys per host
+            # per round, so memory use is bounded by the chunk size.
+            while hosts:
+                with self.cluster.fanout(hosts=hosts) as conn:
+                    results = conn.zrangebyscore(
+                        pending_key,
+                        "-inf",
+                        now,
+                        start=0,
+                        num=self.pending_chunk_size,
+                        withscores=True,
+                    )
+
+                hosts = []
+                with self.cluster.all() as conn:
+                    for host_id, chunk in results.value.items():
+                        if not chunk:
+                            continue
+                        if oldest is None or chunk[0][1] < oldest:
+                            oldest = chunk[0][1]
+                        keys = [key for key, _ in chunk]
+                        keycount += len(keys)
+                        for key in keys:
+                            pending_buffer.append(key.decode("utf-8"))
+                            if pending_buffer.full():
+                                process_incr.apply_async(
+                                    kwargs={"batch_keys": pending_buffer.flush()}
+                                )
+                        conn.target([host_id]).zrem(pending_key, *keys)
+                        if len(chunk) == self.pending_chunk_size:
+                            hosts.append(host_id)
 
             # queue up remainder of pending keys
             if not pending_buffer.empty():
                 process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
 
             metrics.timing("buffer.pending-size", keycount)
+            if oldest is not None:
+                metrics.timing("buffer.pending-lag", now - oldest)
         finally:
             client.delete(lock_key)
 
@@ -262,9 +366,60 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.flush_mode == "batch":
+            self._process_batch_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
+    def _load_payload(self, key, values):
+        """
+        Decodes the contents of a buffer hash into the arguments expected by
+        ``Buffer.process``. Returns ``None`` if the hash is empty.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        if not values:
+            metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            return None
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(
+                json.loads(values.pop("f").decode("utf-8"), use_rapid_json=True)
+            )
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(
+                        json.loads(v.decode("utf-8"), use_rapid_json=True)
+                    )
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -285,42 +440,58 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
+            payload = self._load_payload(key, values)
+            if payload is not None:
+                super().process(*payload)
+        finally:
+            client.delete(lock_key)
 
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
+    def _process_batch_incr(self, keys):
+        # prevent a stampede due to the way we use celery etas + duplicate
+        # tasks, same as ``_process_single_incr`` but with one round trip per
+        # host for the whole batch.
+        with self.cluster.map() as conn:
+            lock_results = [
+                (key, conn.set(self._make_lock_key(key), "1", nx=True, ex=10)) for key in keys
+            ]
+
+        locked_keys = []
+        for key, result in lock_results:
+            if result.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
+        if not locked_keys:
+            return
 
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            super().process(model, incr_values, filters, extra_values, signal_only)
+        try:
+            router = self.cluster.get_router()
+            keys_by_host = defaultdict(list)
+            for key in locked_keys:
+                keys_by_host[router.get_host_for_key(key)].append(key)
+
+            batch = []
+            for host, host_keys in keys_by_host.items():
+                # A single transaction per host guarantees that increments
+                # arriving while we flush are not lost between HGETALL and DEL.
+                pipe = self.cluster.get_local_client(host).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for i, key in enumerate(host_keys):
+                    payload = self._load_payload(key, results[i * 3])
+                    if payload is not None:
+                        batch.append(payload)
+
+            metrics.timing("buffer.batch-size", len(batch))
+            if batch:
+                super().process_batch(batch)
         finally:
-            client.delete(lock_key)
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
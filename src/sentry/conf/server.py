@@ -1420,6 +1420,11 @@ SENTRY_SNUBA = os.environ.get("SNUBA", "http://127.0.0.1:1218")
 SENTRY_SNUBA_TIMEOUT = 30
 SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
 
+# Number of threads that run independent Snuba queries of API serializers
+# concurrently, see `sentry.api.serializers.base.run_attr_fetchers`. 0 runs
+# them serially.
+SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS = 0
+
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
@@ -1467,6 +1472,8 @@ SENTRY_METRICS_SKIP_INTERNAL_PREFIXES = []  # Order this by most frequent prefix
 SENTRY_METRICS_INDEXER = "sentry.sentry_metrics.indexer.postgres_v2.StaticStringsIndexerDecorator"
 SENTRY_METRICS_INDEXER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_CACHE_TTL = 3600 * 2
+# Maximum number of strings looked up in one query by the indexer
+SENTRY_METRICS_INDEXER_DB_LOOKUP_CHUNK_SIZE = 1000
 
 # Release Health
 SENTRY_RELEASE_HEALTH = "sentry.release_health.sessions.SessionsReleaseHealthBackend"
@@ -2719,4 +2726,8 @@ ORGANIZATION_VITALS_OVERVIEW_PROJECT_LIMIT = 300
 SENTRY_STRING_INDEXER_CACHE_OPTIONS = {
     "version": 1,
     "cache_name": "default",
+    # Number of ids and seconds for which they are kept in-process, in front
+    # of the cache above.
+    "local_cache_size": 100000,
+    "local_cache_ttl": 600,
 }
@@ -86,6 +86,7 @@ class DiscoverProcessor:
                 auto_fields=True,
                 auto_aggregations=True,
                 use_aggregate_conditions=True,
+                stream=True,
             )
 
         return data_fn
@@ -93,7 +94,7 @@ class DiscoverProcessor:
     def handle_fields(self, result_list):
         # Find issue short_id if present
         # (originally in `/api/bases/organization_events.py`)
-        new_result_list = result_list[:]
+        new_result_list = list(result_list)
 
         if "issue" in self.header_fields:
             issue_ids = {result["issue.id"] for result in new_result_list}
@@ -263,6 +263,8 @@ def process_issues_by_tag(processor, limit, offset):
 
 @handle_snuba_errors(logger)
 def process_discover(processor, limit, offset):
+    # Rows are decoded from the Snuba response while they are handled, so
+    # only the handled rows of the batch are held in memory.
     raw_data_unicode = processor.data_fn(limit=limit, offset=offset)["data"]
     return processor.handle_fields(raw_data_unicode)
 
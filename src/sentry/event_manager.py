@@ -19,6 +19,7 @@ from sentry import (
     eventstream,
     eventtypes,
     features,
+    nodestore,
     options,
     quotas,
     reprocessing2,
@@ -84,7 +85,7 @@ from sentry.tasks.integrations import kick_off_status_syncs
 from sentry.tasks.process_buffer import buffer_incr
 from sentry.types.activity import ActivityType
 from sentry.utils import json, metrics
-from sentry.utils.cache import cache_key_for_event
+from sentry.utils.cache import LRUCache, cache_key_for_event
 from sentry.utils.canonical import CanonicalKeyDict
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.outcomes import Outcome, track_outcome
@@ -834,23 +835,29 @@ def _tsdb_record_all_metrics(jobs):
     """
     Do all tsdb-related things for save_event in here s.t. we can potentially
     put everything in a single redis pipeline someday.
+
+    Counters and distinct counters of all jobs are written with one call
+    each, carrying the timestamp and environment of every event per item.
     """
 
     # XXX: validate whether anybody actually uses those metrics
 
+    incrs = []
+    records = []
+
     for job in jobs:
-        incrs = []
         frequencies = []
-        records = []
 
-        incrs.append((tsdb.models.project, job["project_id"]))
         event = job["event"]
         group = job["group"]
         release = job["release"]
         environment = job["environment"]
+        options = {"timestamp": event.datetime, "environment_id": environment.id}
+
+        incrs.append((tsdb.models.project, job["project_id"], options))
 
         if group:
-            incrs.append((tsdb.models.group, group.id))
+            incrs.append((tsdb.models.group, group.id, options))
             frequencies.append(
                 (tsdb.models.frequent_environments_by_group, {group.id: {environment.id: 1}})
             )
@@ -864,30 +871,35 @@ def _tsdb_record_all_metrics(jobs):
                 )
 
         if release:
-            incrs.append((tsdb.models.release, release.id))
+            incrs.append((tsdb.models.release, release.id, options))
 
         user = job["user"]
 
         if user:
             project_id = job["project_id"]
-            records.append((tsdb.models.users_affected_by_project, project_id, (user.tag_value,)))
+            records.append(
+                (tsdb.models.users_affected_by_project, project_id, (user.tag_value,), options)
+            )
 
             if group:
-                records.append((tsdb.models.users_affected_by_group, group.id, (user.tag_value,)))
-
-        if incrs:
-            tsdb.incr_multi(incrs, timestamp=event.datetime, environment_id=environment.id)
-
-        if records:
-            tsdb.record_multi(records, timestamp=event.datetime, environment_id=environment.id)
+                records.append(
+                    (tsdb.models.users_affected_by_group, group.id, (user.tag_value,), options)
+                )
 
         if frequencies:
             tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
 
+    if incrs:
+        tsdb.incr_multi(incrs)
+
+    if records:
+        tsdb.record_multi(records)
+
 
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs):
     inserted_time = datetime.utcnow().replace(tzinfo=UTC).timestamp()
+    items = {}
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -902,7 +914,12 @@ def _nodestore_save_many(jobs):
                 subkeys["unprocessed"] = unprocessed
 
         job["event"].data["nodestore_insert"] = inserted_time
-        job["event"].data.save(subkeys=subkeys)
+        node_subkeys = job["event"].data.get_subkeys_to_save(subkeys=subkeys)
+        if node_subkeys is not None:
+            items[job["event"].data.id] = node_subkeys
+
+    if items:
+        nodestore.set_subkeys_multi(items)
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
@@ -1060,24 +1077,33 @@ def get_culprit(data):
 def _save_aggregate(event, hashes, release, metadata, received_timestamp, **kwargs):
     project = event.project
 
-    flat_grouphashes = [
-        GroupHash.objects.get_or_create(project=project, hash=hash)[0] for hash in hashes.hashes
-    ]
-
-    # The root_hierarchical_hash is the least specific hash within the tree, so
-    # typically hierarchical_hashes[0], unless a hash `n` has been split in
-    # which case `root_hierarchical_hash = hierarchical_hashes[n + 1]`. Chosing
-    # this for select_for_update mostly provides sufficient synchronization
-    # when groups are created and also relieves contention by locking a more
-    # specific hash than `hierarchical_hashes[0]`.
-    existing_grouphash, root_hierarchical_hash = _find_existing_grouphash(
-        project, flat_grouphashes, hashes.hierarchical_hashes
-    )
+    group = _get_cached_group(project, hashes)
+    if group is not None:
+        # All hashes are known to be assigned to a group already, nothing to
+        # create or update.
+        flat_grouphashes = []
+        existing_grouphash = root_hierarchical_hash = None
+        grouphashes = {}
+    else:
+        grouphashes = _get_or_create_grouphashes(project, hashes.hashes, hashes.hierarchical_hashes)
+        flat_grouphashes = [grouphashes[hash] for hash in hashes.hashes]
+
+        # The root_hierarchical_hash is the least specific hash within the tree, so
+        # typically hierarchical_hashes[0], unless a hash `n` has been split in
+        # which case `root_hierarchical_hash = hierarchical_hashes[n + 1]`. Chosing
+        # this for select_for_update mostly provides sufficient synchronization
+        # when groups are created and also relieves contention by locking a more
+        # specific hash than `hierarchical_hashes[0]`.
+        existing_grouphash, root_hierarchical_hash = _find_existing_grouphash(
+            project, flat_grouphashes, hashes.hierarchical_hashes, grouphashes
+        )
 
     if root_hierarchical_hash is not None:
-        root_hierarchical_grouphash = GroupHash.objects.get_or_create(
-            project=project, hash=root_hierarchical_hash
-        )[0]
+        root_hierarchical_grouphash = grouphashes.get(root_hierarchical_hash)
+        if root_hierarchical_grouphash is None:
+            root_hierarchical_grouphash = GroupHash.objects.get_or_create(
+                project=project, hash=root_hierarchical_hash
+            )[0]
 
         metadata.update(
             hashes.group_metadata_from_hash(
@@ -1102,7 +1128,7 @@ def _save_aggregate(event, hashes, release, metadata, received_timestamp, **kwar
     )
     kwargs["data"]["last_received"] = received_timestamp
 
-    if existing_grouphash is None:
+    if group is None and existing_grouphash is None:
 
         if killswitch_matches_context(
             "store.load-shed-group-creation-projects",
@@ -1191,7 +1217,8 @@ def _save_aggregate(event, hashes, release, metadata, received_timestamp, **kwar
 
                 return group, is_new, is_regression
 
-    group = Group.objects.get(id=existing_grouphash.group_id)
+    if group is None:
+        group = Group.objects.get(id=existing_grouphash.group_id)
 
     is_new = False
 
@@ -1234,6 +1261,8 @@ def _save_aggregate(event, hashes, release, metadata, received_timestamp, **kwar
         GroupHash.objects.filter(id__in=[h.id for h in new_hashes]).exclude(
             state=GroupHash.State.LOCKED_IN_MIGRATION
         ).update(group=group)
+    elif root_hierarchical_grouphash is None:
+        _cache_grouphashes(project, flat_grouphashes)
 
     is_regression = _process_existing_aggregate(
         group=group, event=event, data=kwargs, release=release
@@ -1242,10 +1271,87 @@ def _save_aggregate(event, hashes, release, metadata, received_timestamp, **kwar
     return group, is_new, is_regression
 
 
+def _get_or_create_grouphashes(project, hashes, lookup_hashes=()):
+    """
+    Returns a mapping of hash to `GroupHash` for all of `hashes`, creating the
+    ones that don't exist yet, and for those of `lookup_hashes` that exist.
+
+    This takes one query to look up all hashes of the event and, if some are
+    missing, one bulk insert and one query to read back the inserted rows,
+    instead of a `get_or_create` per hash.
+    """
+    grouphashes = {
+        gh.hash: gh
+        for gh in GroupHash.objects.filter(
+            project=project, hash__in=set(hashes).union(lookup_hashes)
+        )
+    }
+
+    missing_hashes = [hash for hash in dict.fromkeys(hashes) if hash not in grouphashes]
+    if missing_hashes:
+        # Concurrent saves may insert the same hashes, so conflicts are
+        # ignored and the rows are read back instead of relying on the
+        # (absent) primary keys of the inserted objects.
+        GroupHash.objects.bulk_create(
+            [GroupHash(project=project, hash=hash) for hash in missing_hashes],
+            ignore_conflicts=True,
+        )
+        grouphashes.update(
+            (gh.hash, gh)
+            for gh in GroupHash.objects.filter(project=project, hash__in=missing_hashes)
+        )
+
+    return grouphashes
+
+
+# Per-process cache of (project_id, hash) to the id of the group the hash is
+# assigned to, which lets events of existing issues skip looking up their
+# hashes. Entries are only written for hashes that were all assigned to a
+# group, and only trusted for `GROUPHASH_CACHE_TTL` seconds, since hashes may
+# be moved by merges, unmerges or reprocessing in other processes.
+GROUPHASH_CACHE_TTL = 10
+_grouphash_cache = LRUCache(max_size=100000, ttl=GROUPHASH_CACHE_TTL)
+
+
+def _get_cached_group(project, hashes):
+    if hashes.hierarchical_hashes or not hashes.hashes:
+        return None
+
+    if not options.get("store.grouphash-cache"):
+        return None
+
+    group_ids = _grouphash_cache.get_many([(project.id, hash) for hash in hashes.hashes])
+    if len(group_ids) < len(set(hashes.hashes)):
+        metrics.incr("event_manager.grouphash_cache", tags={"result": "miss"})
+        return None
+
+    # Like `_find_existing_grouphash`, the first hash decides the group.
+    group_id = group_ids[(project.id, hashes.hashes[0])]
+    try:
+        group = Group.objects.get(id=group_id)
+    except Group.DoesNotExist:
+        for hash in hashes.hashes:
+            _grouphash_cache.delete((project.id, hash))
+        metrics.incr("event_manager.grouphash_cache", tags={"result": "stale"})
+        return None
+
+    metrics.incr("event_manager.grouphash_cache", tags={"result": "hit"})
+    return group
+
+
+def _cache_grouphashes(project, flat_grouphashes):
+    if not options.get("store.grouphash-cache"):
+        return
+
+    if all(gh.group_id is not None for gh in flat_grouphashes):
+        _grouphash_cache.set_many({(project.id, gh.hash): gh.group_id for gh in flat_grouphashes})
+
+
 def _find_existing_grouphash(
     project,
     flat_grouphashes,
     hierarchical_hashes,
+    hierarchical_grouphashes=None,
 ):
     all_grouphashes = []
     root_hierarchical_hash = None
@@ -1253,10 +1359,11 @@ def _find_existing_grouphash(
     found_split = False
 
     if hierarchical_hashes:
-        hierarchical_grouphashes = {
-            h.hash: h
-            for h in GroupHash.objects.filter(project=project, hash__in=hierarchical_hashes)
-        }
+        if hierarchical_grouphashes is None:
+            hierarchical_grouphashes = {
+                h.hash: h
+                for h in GroupHash.objects.filter(project=project, hash__in=hierarchical_hashes)
+            }
 
         # Look for splits:
         # 1. If we find a hash with SPLIT state at `n`, we want to use
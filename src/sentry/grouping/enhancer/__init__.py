@@ -1,6 +1,7 @@
 import base64
 import os
 import zlib
+from collections import defaultdict
 
 import msgpack
 from parsimonious.exceptions import ParseError
@@ -113,8 +114,27 @@ class Enhancements:
             bases = []
         self.bases = bases
 
-        self._modifier_rules = [rule for rule in self.iter_rules() if rule.is_modifier]
-        self._updater_rules = [rule for rule in self.iter_rules() if rule.is_updater]
+    def _get_rule_indexes(self):
+        """Returns a tuple of the indexes of modifier and updater rules, in
+        the order of ``iter_rules``.
+
+        Indexes of the rules of a base are built once and shared by all
+        enhancements using the base, the own rules are indexed lazily.
+        """
+        rv = getattr(self, "_rule_indexes", None)
+        if rv is None:
+            modifier_indexes = []
+            updater_indexes = []
+            for base in self.bases:
+                base = ENHANCEMENT_BASES.get(base)
+                if base:
+                    base_modifier_indexes, base_updater_indexes = base._get_rule_indexes()
+                    modifier_indexes.extend(base_modifier_indexes)
+                    updater_indexes.extend(base_updater_indexes)
+            modifier_indexes.append(RuleIndex([rule for rule in self.rules if rule.is_modifier]))
+            updater_indexes.append(RuleIndex([rule for rule in self.rules if rule.is_updater]))
+            rv = self._rule_indexes = (modifier_indexes, updater_indexes)
+        return rv
 
     def apply_modifications_to_frame(self, frames, platform, exception_data):
         """This applies the frame modifications to the frames itself.  This
@@ -125,8 +145,9 @@ class Enhancements:
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
-        for rule in self._modifier_rules:
-            for idx, action in rule.get_matching_frame_actions(
+        modifier_indexes, _ = self._get_rule_indexes()
+        for index in modifier_indexes:
+            for rule, idx, action in index.iter_matching_frame_actions(
                 match_frames, platform, exception_data, cache
             ):
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
@@ -139,9 +160,9 @@ class Enhancements:
 
         stacktrace_state = StacktraceState()
         # Apply direct frame actions and update the stack state alongside
-        for rule in self._updater_rules:
-
-            for idx, action in rule.get_matching_frame_actions(
+        _, updater_indexes = self._get_rule_indexes()
+        for index in updater_indexes:
+            for rule, idx, action in index.iter_matching_frame_actions(
                 match_frames, platform, exception_data, cache
             ):
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
@@ -312,9 +333,29 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_index_key(self):
+        """Returns the most selective index key of the frame matchers of
+        this rule, see ``Match.get_index_key``.
+        """
+        rv = None
+        for matcher in self._other_matchers:
+            key = matcher.get_index_key()
+            if key is None:
+                continue
+            # Prefixes are more selective than families, and longer prefixes
+            # more selective than shorter ones.
+            if rv is None or rv[0] == "family" or (key[0] != "family" and len(key[1]) > len(rv[1])):
+                rv = key
+        return rv
+
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, frame_indices=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        If ``frame_indices`` is given, only the frames at these indices are
+        tested.
         """
         if not self.matchers:
             return []
@@ -326,8 +367,11 @@ class Rule:
 
         rv = []
 
+        if frame_indices is None:
+            frame_indices = range(len(frames))
+
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in frame_indices:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
@@ -351,6 +395,84 @@ class Rule:
         )
 
 
+class RuleIndex:
+    """Rules indexed by what a frame has to look like for them to match.
+
+    Rules are bucketed by the family or the literal prefix of the function
+    or module pattern they require (see ``Rule.get_index_key``), so that
+    only rules from the buckets of a frame have to be tested against it,
+    rather than every rule against every frame. Rules without an index key
+    are tested against all frames.
+    """
+
+    # Prefixes are looked up by up to this many leading bytes of a value.
+    PREFIX_LOOKUP_LENGTH = 4
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.unindexed = set()
+        self.by_family = defaultdict(list)
+        self.by_prefix = defaultdict(list)
+
+        for position, rule in enumerate(rules):
+            key = rule.get_index_key()
+            if key is None:
+                self.unindexed.add(position)
+            elif key[0] == "family":
+                for family in key[1]:
+                    self.by_family[family].append(position)
+            else:
+                field, prefix = key
+                self.by_prefix[(field, prefix[: self.PREFIX_LOOKUP_LENGTH])].append(
+                    (position, prefix)
+                )
+
+        self.prefix_fields = sorted({field for field, _ in self.by_prefix})
+
+    def get_candidate_frames(self, match_frames):
+        """Returns a mapping of indexed rule positions to the (ordered)
+        indices of the frames the rules may match."""
+        rv = defaultdict(list)
+        if not (self.by_family or self.by_prefix):
+            return rv
+
+        for idx, match_frame in enumerate(match_frames):
+            for position in self.by_family.get(match_frame["family"], ()):
+                rv[position].append(idx)
+
+            for field in self.prefix_fields:
+                value = match_frame[field]
+                if not value or not isinstance(value, bytes):
+                    continue
+                for length in range(1, min(len(value), self.PREFIX_LOOKUP_LENGTH) + 1):
+                    for position, prefix in self.by_prefix.get((field, value[:length]), ()):
+                        if value.startswith(prefix):
+                            rv[position].append(idx)
+
+        return rv
+
+    def iter_matching_frame_actions(self, match_frames, platform, exception_data, cache):
+        """Yields ``(rule, idx, action)`` for all matching rules, in the same
+        order as calling ``get_matching_frame_actions`` for every rule.
+
+        Indexed fields are never modified by actions, so the candidate frames
+        stay valid while actions of earlier rules are applied.
+        """
+        candidates = self.get_candidate_frames(match_frames)
+        for position, rule in enumerate(self.rules):
+            if position in self.unindexed:
+                frame_indices = None
+            else:
+                frame_indices = candidates.get(position)
+                if not frame_indices:
+                    continue
+
+            for idx, action in rule.get_matching_frame_actions(
+                match_frames, platform, exception_data, cache, frame_indices
+            ):
+                yield rule, idx, action
+
+
 class EnhancmentsVisitor(NodeVisitor):
     visit_comment = visit_empty = lambda *a: None
     unwrapped_exceptions = (InvalidEnhancerConfig,)
@@ -26,6 +26,10 @@ SHORT_MATCH_KEYS = {v: k for k, v in MATCH_KEYS.items()}
 assert len(SHORT_MATCH_KEYS) == len(MATCH_KEYS)  # assert short key names are not reused
 
 FAMILIES = {"native": "N", "javascript": "J", "all": "a"}
+
+# Characters with a special meaning in glob patterns. The part of a pattern
+# before the first of them has to match literally.
+GLOB_SPECIAL_CHARS = b"*?[]{}\\"
 REVERSE_FAMILIES = {v: k for k, v in FAMILIES.items()}
 
 
@@ -87,6 +91,17 @@ class Match:
     def matches_frame(self, frames, idx, platform, exception_data, cache):
         raise NotImplementedError()
 
+    def get_index_key(self):
+        """Returns a key under which rules with this matcher can be indexed.
+
+        The key is either ``("family", families)`` or ``(field, prefix)``,
+        and every frame that this matcher matches has to have one of the
+        families or a ``field`` value starting with the prefix. Only fields
+        that are never modified by actions qualify. ``None`` is returned if
+        the matcher cannot be indexed.
+        """
+        return None
+
     def _to_config_structure(self, version):
         raise NotImplementedError()
 
@@ -229,6 +244,11 @@ class FamilyMatch(FrameMatch):
 
         return match_frame["family"] in self._flags
 
+    def get_index_key(self):
+        if self.negated or b"all" in self._flags:
+            return None
+        return ("family", frozenset(self._flags))
+
 
 class InAppMatch(FrameMatch):
     def __init__(self, *args, **kwargs):
@@ -240,7 +260,29 @@ class InAppMatch(FrameMatch):
         return ref_val is not None and ref_val == match_frame["in_app"]
 
 
-class FunctionMatch(FrameMatch):
+class LiteralPrefixMixin:
+    """Indexes matchers by the literal prefix of their glob pattern."""
+
+    def get_index_key(self):
+        if self.negated:
+            return None
+        prefix = get_literal_prefix(self._encoded_pattern)
+        if not prefix:
+            return None
+        return (self.field, prefix)
+
+
+def get_literal_prefix(pattern):
+    for i, char in enumerate(pattern):
+        if char in GLOB_SPECIAL_CHARS:
+            return pattern[:i]
+    return pattern
+
+
+class FunctionMatch(LiteralPrefixMixin, FrameMatch):
+
+    field = "function"
+
     def _positive_frame_match(self, match_frame, platform, exception_data, cache):
 
         return cached(cache, glob_match, match_frame["function"], self._encoded_pattern)
@@ -255,7 +297,7 @@ class FrameFieldMatch(FrameMatch):
         return cached(cache, glob_match, field, self._encoded_pattern)
 
 
-class ModuleMatch(FrameFieldMatch):
+class ModuleMatch(LiteralPrefixMixin, FrameFieldMatch):
 
     field = "module"
 
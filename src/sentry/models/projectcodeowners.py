@@ -9,6 +9,7 @@ from rest_framework.exceptions import ValidationError
 from sentry.db.models import DefaultFieldsModel, FlexibleForeignKey, JSONField, sane_repr
 from sentry.ownership.grammar import convert_codeowners_syntax, create_schema_from_issue_owners
 from sentry.utils.cache import cache
+from sentry.utils.hashlib import hash_values
 
 logger = logging.getLogger(__name__)
 READ_CACHE_DURATION = 3600
@@ -36,6 +37,17 @@ class ProjectCodeOwners(DefaultFieldsModel):
 
     __repr__ = sane_repr("project_id", "id")
 
+    def get_schema_hash(self) -> str:
+        """
+        Hash of the schema, which keys the rules compiled from it, see
+        `ProjectOwnership.get_schema_hash`.
+        """
+        try:
+            return self._schema_hash
+        except AttributeError:
+            self._schema_hash = hash_values([self.schema])
+            return self._schema_hash
+
     @classmethod
     def get_cache_key(self, project_id):
         return f"projectcodeowners_project_id:1:{project_id}"
@@ -54,6 +66,8 @@ class ProjectCodeOwners(DefaultFieldsModel):
         if code_owners is None:
             query = self.objects.filter(project_id=project_id).order_by("-date_added") or False
             code_owners = self.merge_code_owners_list(code_owners_list=query) if query else query
+            if code_owners:
+                code_owners.get_schema_hash()
             cache.set(cache_key, code_owners, READ_CACHE_DURATION)
 
         return code_owners or None
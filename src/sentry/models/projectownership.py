@@ -7,12 +7,21 @@ from django.utils import timezone
 from sentry.db.models import Model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import ActorTuple
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.grammar import CompiledRules, Rule, resolve_actors
 from sentry.utils import metrics
-from sentry.utils.cache import cache
+from sentry.utils.cache import LRUCache, cache
+from sentry.utils.hashlib import hash_values
 
 READ_CACHE_DURATION = 3600
 
+# Compiled rules by the schema hashes of the ownership and codeowners they
+# were compiled from, bounded by the total number of rules. Changes to the
+# rules take effect as soon as the cached reads of the ownership and
+# codeowners are updated, as those carry the hashes of the new schemas.
+_compiled_rules_cache = LRUCache(
+    max_size=100000, ttl=READ_CACHE_DURATION, sizeof=lambda value: len(value) or 1
+)
+
 
 class ProjectOwnership(Model):
     __include_in_export__ = True
@@ -36,6 +45,24 @@ class ProjectOwnership(Model):
 
     __repr__ = sane_repr("project_id", "is_active")
 
+    def save(self, *args, **kwargs):
+        # The post_save signal caches this instance, with the hash of the
+        # schema that is saved.
+        self._schema_hash = hash_values([self.schema])
+        return super().save(*args, **kwargs)
+
+    def get_schema_hash(self) -> str:
+        """
+        Hash of the schema, which keys the rules compiled from it. It is
+        computed before instances are stored in the read cache, so cached
+        reads don't hash their schema again.
+        """
+        try:
+            return self._schema_hash
+        except AttributeError:
+            self._schema_hash = hash_values([self.schema])
+            return self._schema_hash
+
     @classmethod
     def get_cache_key(self, project_id):
         return f"projectownership_project_id:1:{project_id}"
@@ -75,6 +102,7 @@ class ProjectOwnership(Model):
         if ownership is None:
             try:
                 ownership = cls.objects.get(project_id=project_id)
+                ownership.get_schema_hash()
             except cls.DoesNotExist:
                 ownership = False
             cache.set(cache_key, ownership, READ_CACHE_DURATION)
@@ -105,9 +133,13 @@ class ProjectOwnership(Model):
             ownership = cls(project_id=project_id)
 
         codeowners = ProjectCodeOwners.get_codeowners_cached(project_id)
+        schema_key = (
+            ownership.get_schema_hash(),
+            codeowners.get_schema_hash() if codeowners else None,
+        )
         ownership.schema = cls.get_combined_schema(ownership, codeowners)
 
-        rules = cls._matching_ownership_rules(ownership, project_id, data)
+        rules = cls._matching_ownership_rules(ownership.schema, schema_key, data)
 
         if not rules:
             return cls.Everyone if ownership.fallthrough else [], None
@@ -159,9 +191,15 @@ class ProjectOwnership(Model):
             if not ownership:
                 ownership = cls(project_id=project_id)
 
-            ownership_rules = cls._matching_ownership_rules(ownership, project_id, data)
+            ownership_rules = cls._matching_ownership_rules(
+                ownership.schema, (ownership.get_schema_hash(), None), data
+            )
             codeowners_rules = (
-                cls._matching_ownership_rules(codeowners, project_id, data) if codeowners else []
+                cls._matching_ownership_rules(
+                    codeowners.schema, (None, codeowners.get_schema_hash()), data
+                )
+                if codeowners
+                else []
             )
 
             if not (codeowners_rules or ownership_rules):
@@ -191,17 +229,35 @@ class ProjectOwnership(Model):
                 assigned_by_codeowners,
             )
 
+    @classmethod
+    def _get_compiled_rules(
+        cls, schema: Mapping[str, Any], schema_key: Tuple[Optional[str], Optional[str]]
+    ) -> CompiledRules:
+        compiled = _compiled_rules_cache.get(schema_key)
+        if compiled is not None:
+            metrics.incr("projectownership.compiled_rules_cache", tags={"result": "hit"})
+            return compiled
+
+        metrics.incr("projectownership.compiled_rules_cache", tags={"result": "miss"})
+        compiled = CompiledRules.from_schema(schema)
+        _compiled_rules_cache.set(schema_key, compiled)
+        return compiled
+
     @classmethod
     def _matching_ownership_rules(
-        cls, ownership: "ProjectOwnership", project_id: int, data: Mapping[str, Any]
+        cls,
+        schema: Optional[Mapping[str, Any]],
+        schema_key: Tuple[Optional[str], Optional[str]],
+        data: Mapping[str, Any],
     ) -> Sequence["Rule"]:
-        rules = []
-        if ownership.schema is not None:
-            for rule in load_schema(ownership.schema):
-                if rule.test(data):
-                    rules.append(rule)
+        """
+        Rules of `schema` that match the event `data`. `schema_key` holds the
+        schema hashes of the ownership and codeowners that `schema` combines.
+        """
+        if schema is None:
+            return []
 
-        return rules
+        return cls._get_compiled_rules(schema, schema_key).match(data)
 
 
 # Signals update the cached reads used in post_processing
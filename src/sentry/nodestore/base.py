@@ -1,10 +1,12 @@
-from threading import local
+import struct
+from threading import Lock, local
 
 import sentry_sdk
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
-from sentry.utils.cache import memoize
+from sentry.nodestore.codecs import CODEC_HEADER, CODEC_MAGIC, CODECS, load_dictionaries
+from sentry.utils import json, metrics
+from sentry.utils.cache import LRUCache, memoize
 from sentry.utils.services import Service
 
 # Cache an instance of the encoder we want to use
@@ -22,6 +24,34 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# Nodes written with indexed subkeys start with ``INDEXED_MAGIC`` (a NUL byte
+# never starts a payload in the line based format), followed by the version
+# of the layout and the number of subkeys. The header is followed by one
+# entry per subkey (name length, offset, length, name) and then by the
+# concatenated JSON payloads. Offsets are relative to the start of the
+# payloads, the default subkey has an empty name.
+INDEXED_MAGIC = b"\x00ns"
+INDEXED_VERSION = 1
+INDEXED_HEADER = struct.Struct("<3sBH")
+INDEXED_ENTRY = struct.Struct("<HII")
+
+# In-process caches are shared by all threads of a process (NodeStorage
+# instances are thread local), keyed by their configuration.
+_local_caches = {}
+_local_caches_lock = Lock()
+
+
+def _get_local_cache(max_size, ttl):
+    with _local_caches_lock:
+        try:
+            return _local_caches[max_size, ttl]
+        except KeyError:
+            # Items are encoded nodes, which are decoded on every hit. They
+            # are immutable, so they are not copied, and their size is known
+            # without encoding them again.
+            rv = _local_caches[max_size, ttl] = LRUCache(max_size=max_size, ttl=ttl, sizeof=len)
+            return rv
+
 
 class NodeStorage(local, Service):
     """
@@ -56,8 +86,45 @@ class NodeStorage(local, Service):
 
     This is used in reprocessing to store a snapshot of the event from multiple
     stages of the pipeline.
+
+    By default values and subkeys are stored as JSON lines, and reading a
+    subkey requires scanning the whole value. With ``indexed_subkeys``
+    enabled, values are written with a small offset table instead so a single
+    subkey can be decoded without touching the others. Both layouts can
+    always be read.
+
+    Additionally, encoded nodes can be compressed by the NodeStorage itself
+    with one of the ``codec``s from ``sentry.nodestore.codecs``, optionally
+    with per-platform compression dictionaries (``codec_dictionaries`` maps
+    platform to a dictionary file). Nodes written with any known codec can
+    always be read, as long as their dictionaries are configured.
+
+    Default payloads are cached in the ``nodedata`` Django cache if it is
+    configured. With ``local_cache_size`` (in bytes of encoded nodes), an
+    in-process LRU cache with a TTL of ``local_cache_ttl`` seconds is
+    consulted before the shared cache. It only saves the round trip to the
+    shared cache or the backend: it holds the encoded nodes as read from or
+    written to the backend, and every hit still decompresses and decodes
+    them. Caching decoded nodes would not save that work, as callers mutate
+    node data and copying a node costs about as much as decoding it.
     """
 
+    def __init__(
+        self,
+        indexed_subkeys=False,
+        codec=None,
+        codec_dictionaries=None,
+        local_cache_size=0,
+        local_cache_ttl=60,
+    ):
+        self.indexed_subkeys = indexed_subkeys
+        dictionaries = load_dictionaries(codec_dictionaries)
+        self.codecs = {codec_cls.id: codec_cls(dictionaries) for codec_cls in CODECS.values()}
+        self.codec = None if codec is None else self.codecs[CODECS[codec].id]
+        self.local_cache = (
+            _get_local_cache(local_cache_size, local_cache_ttl) if local_cache_size else None
+        )
+
     __all__ = (
         "delete",
         "delete_multi",
@@ -65,6 +132,7 @@ class NodeStorage(local, Service):
         "get_multi",
         "set",
         "set_subkeys",
+        "set_subkeys_multi",
         "cleanup",
         "validate",
         "bootstrap",
@@ -92,6 +160,17 @@ class NodeStorage(local, Service):
         if value is None:
             return None
 
+        if value.startswith(CODEC_MAGIC):
+            _, codec_id = CODEC_HEADER.unpack_from(value)
+            try:
+                codec = self.codecs[codec_id]
+            except KeyError:
+                raise ValueError(f"Unsupported nodestore codec: {codec_id}")
+            value = codec.decode(value[CODEC_HEADER.size :])
+
+        if value.startswith(INDEXED_MAGIC):
+            return self._decode_indexed(value, subkey)
+
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -112,6 +191,27 @@ class NodeStorage(local, Service):
         except StopIteration:
             return None
 
+    def _decode_indexed(self, value, subkey):
+        _, version, count = INDEXED_HEADER.unpack_from(value)
+        if version != INDEXED_VERSION:
+            raise ValueError(f"Unsupported nodestore layout version: {version}")
+
+        name = b"" if subkey is None else subkey.encode("ascii")
+        found = None
+        pos = INDEXED_HEADER.size
+        for _ in range(count):
+            name_length, offset, length = INDEXED_ENTRY.unpack_from(value, pos)
+            pos += INDEXED_ENTRY.size
+            if found is None and value[pos : pos + name_length] == name:
+                found = offset, length
+            pos += name_length
+
+        if found is None:
+            return None
+
+        offset, length = found
+        return json_loads(value[pos + offset : pos + offset + length])
+
     def _get_bytes(self, id):
         """
         >>> nodestore._get_bytes('key1')
@@ -138,7 +238,7 @@ class NodeStorage(local, Service):
             rv = self._decode(bytes_data, subkey=subkey)
             if subkey is None:
                 # set cache item only after we know decoding did not fail
-                self._set_cache_item(id, rv)
+                self._set_cache_item(id, rv, bytes_data)
 
             span.set_tag("result", "from_service")
             if bytes_data:
@@ -179,12 +279,10 @@ class NodeStorage(local, Service):
             else:
                 uncached_ids = id_list
 
-            items = {
-                id: self._decode(value, subkey=subkey)
-                for id, value in self._get_bytes_multi(uncached_ids).items()
-            }
+            bytes_items = self._get_bytes_multi(uncached_ids)
+            items = {id: self._decode(value, subkey=subkey) for id, value in bytes_items.items()}
             if subkey is None:
-                self._set_cache_items(items)
+                self._set_cache_items(items, bytes_items)
                 items.update(cache_items)
 
             span.set_tag("result", "from_service")
@@ -201,12 +299,42 @@ class NodeStorage(local, Service):
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
         """
-        lines = [json_dumps(data.pop(None)).encode("utf8")]
+        default = data.get(None)
+        platform = default.get("platform") if isinstance(default, dict) else None
+
+        if self.indexed_subkeys:
+            value = self._encode_indexed(data)
+        else:
+            lines = [json_dumps(data.pop(None)).encode("utf8")]
+            for key, value in data.items():
+                lines.append(key.encode("ascii"))
+                lines.append(json_dumps(value).encode("utf8"))
+            value = b"\n".join(lines)
+
+        if self.codec is not None:
+            value = CODEC_HEADER.pack(CODEC_MAGIC, self.codec.id) + self.codec.encode(
+                value, platform=platform
+            )
+
+        return value
+
+    def _encode_indexed(self, data):
+        """
+        Encode data dict with an offset table, see ``INDEXED_MAGIC``.
+        """
+        payloads = [(b"", json_dumps(data.pop(None)).encode("utf8"))]
         for key, value in data.items():
-            lines.append(key.encode("ascii"))
-            lines.append(json_dumps(value).encode("utf8"))
+            payloads.append((key.encode("ascii"), json_dumps(value).encode("utf8")))
 
-        return b"\n".join(lines)
+        chunks = [INDEXED_HEADER.pack(INDEXED_MAGIC, INDEXED_VERSION, len(payloads))]
+        offset = 0
+        for name, payload in payloads:
+            chunks.append(INDEXED_ENTRY.pack(len(name), offset, len(payload)))
+            chunks.append(name)
+            offset += len(payload)
+        chunks.extend(payload for _, payload in payloads)
+
+        return b"".join(chunks)
 
     def _set_bytes(self, id, data, ttl=None):
         """
@@ -244,7 +372,39 @@ class NodeStorage(local, Service):
             bytes_data = self._encode(data)
             self._set_bytes(id, bytes_data, ttl=ttl)
             # set cache only after encoding and write to nodestore has succeeded
-            self._set_cache_item(id, cache_item)
+            self._set_cache_item(id, cache_item, bytes_data)
+
+    def _set_bytes_multi(self, items, ttl=None):
+        """
+        >>> nodestore._set_bytes_multi({
+        ...     'key1': b"{'foo': 'bar'}",
+        ...     'key2': b"{'foo': 'baz'}",
+        ... })
+        """
+        for id, data in items.items():
+            self._set_bytes(id, data, ttl=ttl)
+
+    def set_subkeys_multi(self, items, ttl=None):
+        """
+        Set values and subkeys for multiple ids at once, see `set_subkeys`.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_subkeys_multi({
+        ...    'key1': {None: {'foo': 'bar'}, "reprocessing": {'foo': 'bam'}},
+        ...    'key2': {None: {'foo': 'baz'}},
+        ... })
+        """
+        with sentry_sdk.start_span(op="nodestore.set_subkeys_multi") as span:
+            span.set_tag("num_ids", len(items))
+            cache_items = {id: data.get(None) for id, data in items.items()}
+            bytes_data = {id: self._encode(data) for id, data in items.items()}
+            self._set_bytes_multi(bytes_data, ttl=ttl)
+            # set cache only after encoding and write to nodestore has succeeded
+            self._set_cache_items(
+                {id: data for id, data in cache_items.items() if data}, bytes_data
+            )
 
     def cleanup(self, cutoff_timestamp):
         raise NotImplementedError
@@ -253,30 +413,76 @@ class NodeStorage(local, Service):
         raise NotImplementedError
 
     def _get_cache_item(self, id):
+        if self.local_cache is not None:
+            bytes_data = self.local_cache.get(id)
+            self._record_cache_result(
+                "local", hits=int(bytes_data is not None), misses=int(bytes_data is None)
+            )
+            if bytes_data is not None:
+                return self._decode(bytes_data, subkey=None)
+
         if self.cache:
-            return self.cache.get(id)
+            rv = self.cache.get(id)
+            self._record_cache_result("shared", hits=int(rv is not None), misses=int(rv is None))
+            if rv is not None and self.local_cache is not None:
+                self.local_cache.set(id, json_dumps(rv).encode("utf8"))
+            return rv
 
     def _get_cache_items(self, id_list):
-        if self.cache:
-            return self.cache.get_many(id_list)
-        return {}
+        rv = {}
+        if self.local_cache is not None:
+            for id, bytes_data in self.local_cache.get_many(id_list).items():
+                rv[id] = self._decode(bytes_data, subkey=None)
+            self._record_cache_result("local", hits=len(rv), misses=len(id_list) - len(rv))
+            if len(rv) == len(id_list):
+                return rv
+            id_list = [id for id in id_list if id not in rv]
 
-    def _set_cache_item(self, id, data):
+        if self.cache:
+            shared_items = self.cache.get_many(id_list)
+            self._record_cache_result(
+                "shared", hits=len(shared_items), misses=len(id_list) - len(shared_items)
+            )
+            if self.local_cache is not None:
+                # Items of the shared cache are encoded once here, rather
+                # than on every set.
+                self.local_cache.set_many(
+                    {id: json_dumps(data).encode("utf8") for id, data in shared_items.items()}
+                )
+            rv.update(shared_items)
+
+        return rv
+
+    def _set_cache_item(self, id, data, bytes_data):
+        if self.local_cache is not None and data:
+            self.local_cache.set(id, bytes_data)
         if self.cache and data:
             self.cache.set(id, data)
 
-    def _set_cache_items(self, items):
+    def _set_cache_items(self, items, bytes_items):
+        if self.local_cache is not None:
+            self.local_cache.set_many({id: bytes_items[id] for id, data in items.items() if data})
         if self.cache:
             self.cache.set_many(items)
 
     def _delete_cache_item(self, id):
+        if self.local_cache is not None:
+            self.local_cache.delete(id)
         if self.cache:
             self.cache.delete(id)
 
     def _delete_cache_items(self, id_list):
+        if self.local_cache is not None:
+            self.local_cache.delete_many(id_list)
         if self.cache:
             self.cache.delete_many([id for id in id_list])
 
+    def _record_cache_result(self, tier, hits, misses):
+        if hits:
+            metrics.incr("nodestore.cache", amount=hits, tags={"tier": tier, "result": "hit"})
+        if misses:
+            metrics.incr("nodestore.cache", amount=misses, tags={"tier": tier, "result": "miss"})
+
     @memoize
     def cache(self):
         try:
@@ -1,8 +1,10 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import sentry_sdk
 
 from sentry.nodestore.base import NodeStorage
+from sentry.utils.iterators import chunked
 from sentry.utils.kvstore.bigtable import BigtableKVStorage
 
 
@@ -18,6 +20,19 @@ class BigtableNodeStorage(NodeStorage):
         valid for reading + returning)
     :param compression: A boolean whether to enable zlib-compression, or the
         string "zstd" to use zstd.
+    :param multi_batch_size: Maximum number of rows read, written or deleted
+        with a single request by the multi-key operations.
+    :param multi_concurrency: Maximum number of those requests that are in
+        flight at the same time.
+    :param indexed_subkeys: Whether to write nodes with an offset table for
+        subkeys, see ``NodeStorage``.
+    :param codec: Name of the codec to compress nodes with before they are
+        written, see ``NodeStorage``.
+    :param codec_dictionaries: Mapping of platform to a compression
+        dictionary file used by ``codec``.
+    :param local_cache_size: Size in bytes of the in-process cache in front
+        of the shared cache, see ``NodeStorage``. Disabled if 0.
+    :param local_cache_ttl: Seconds items are kept in the in-process cache.
 
     >>> BigtableNodeStorage(
     ...     project='some-project',
@@ -38,8 +53,23 @@ class BigtableNodeStorage(NodeStorage):
         automatic_expiry=False,
         default_ttl=None,
         compression=False,
+        multi_batch_size=100,
+        multi_concurrency=4,
+        indexed_subkeys=False,
+        codec=None,
+        codec_dictionaries=None,
+        local_cache_size=0,
+        local_cache_ttl=60,
         **client_options,
     ):
+        super().__init__(
+            indexed_subkeys=indexed_subkeys,
+            codec=codec,
+            codec_dictionaries=codec_dictionaries,
+            local_cache_size=local_cache_size,
+            local_cache_ttl=local_cache_ttl,
+        )
+
         if compression is True:
             compression = "zlib"
         elif compression is False:
@@ -55,18 +85,42 @@ class BigtableNodeStorage(NodeStorage):
         )
         self.automatic_expiry = automatic_expiry
         self.skip_deletes = automatic_expiry and "_SENTRY_CLEANUP" in os.environ
+        assert multi_batch_size > 0
+        assert multi_concurrency > 0
+        self.multi_batch_size = multi_batch_size
+        self.multi_concurrency = multi_concurrency
+
+    def _map_batches(self, func, items):
+        """
+        Apply ``func`` to ``items`` split into batches of ``multi_batch_size``,
+        running up to ``multi_concurrency`` batches at the same time.
+        """
+        batches = list(chunked(items, self.multi_batch_size))
+        if len(batches) <= 1 or self.multi_concurrency == 1:
+            return [func(batch) for batch in batches]
+
+        with ThreadPoolExecutor(max_workers=min(len(batches), self.multi_concurrency)) as executor:
+            return list(executor.map(func, batches))
 
     def _get_bytes(self, id):
         return self.store.get(id)
 
     def _get_bytes_multi(self, id_list):
+        # NodeStorage is thread local, so only access the store from this
+        # thread and hand it to the workers.
+        store = self.store
         rv = {id: None for id in id_list}
-        rv.update(self.store.get_many(id_list))
+        for result in self._map_batches(lambda batch: list(store.get_many(batch)), id_list):
+            rv.update(result)
         return rv
 
     def _set_bytes(self, id, data, ttl=None):
         self.store.set(id, data, ttl)
 
+    def _set_bytes_multi(self, items, ttl=None):
+        store = self.store
+        self._map_batches(lambda batch: store.set_many(dict(batch), ttl), items.items())
+
     def delete(self, id):
         if self.skip_deletes:
             return
@@ -88,8 +142,9 @@ class BigtableNodeStorage(NodeStorage):
                 self.delete(id_list[0])
                 return
 
+            store = self.store
             try:
-                self.store.delete_many(id_list)
+                self._map_batches(store.delete_many, id_list)
             finally:
                 self._delete_cache_items(id_list)
 
@@ -0,0 +1,104 @@
+"""
+Codecs that are applied to encoded nodes before they are written to the
+backend.
+
+Encoded values start with ``CODEC_MAGIC`` (a NUL byte never starts a node in
+the line based layout, see ``sentry.nodestore.base``) followed by one byte
+identifying the codec, and the output of the codec.
+"""
+
+import struct
+from typing import Mapping, MutableMapping, Optional, Sequence, Type
+
+import zstandard
+
+CODEC_MAGIC = b"\x00nc"
+CODEC_HEADER = struct.Struct("<3sB")
+
+
+class NodeCodec:
+    """
+    Encodes and decodes the bytes of a node. ``id`` is stored in the header
+    of every encoded value and must never be reused for another codec.
+    """
+
+    id: int
+    name: str
+
+    def __init__(self, dictionaries: Optional[Mapping[str, bytes]] = None) -> None:
+        pass
+
+    def encode(self, value: bytes, platform: Optional[str] = None) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, value: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class ZstdNodeCodec(NodeCodec):
+    """
+    Compresses nodes with zstd. If a dictionary is configured for the
+    platform of the event, it is used for compression. Events of the same
+    platform share a lot of structure, so small payloads compress much
+    better with a dictionary trained on them (see ``train_dictionary``).
+
+    Zstd frames record the id of the dictionary they were compressed with,
+    so decompression picks the dictionary up again regardless of the
+    platform. Retired dictionaries have to stay configured for as long as
+    nodes compressed with them are retained.
+    """
+
+    id = 1
+    name = "zstd"
+
+    def __init__(self, dictionaries: Optional[Mapping[str, bytes]] = None, level: int = 3) -> None:
+        # Compression contexts are reused between calls, which is fine since
+        # nodestore instances (and thereby codecs) are thread local.
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+        self.compressors: MutableMapping[str, zstandard.ZstdCompressor] = {}
+        self.decompressors: MutableMapping[int, zstandard.ZstdDecompressor] = {}
+        for platform, data in (dictionaries or {}).items():
+            dictionary = zstandard.ZstdCompressionDict(data)
+            dictionary.precompute_compress(level=level)
+            self.compressors[platform] = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+            self.decompressors[dictionary.dict_id()] = zstandard.ZstdDecompressor(
+                dict_data=dictionary
+            )
+
+    def encode(self, value: bytes, platform: Optional[str] = None) -> bytes:
+        return self.compressors.get(platform, self.compressor).compress(value)
+
+    def decode(self, value: bytes) -> bytes:
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        if not dict_id:
+            return self.decompressor.decompress(value)
+
+        try:
+            decompressor = self.decompressors[dict_id]
+        except KeyError:
+            raise ValueError(f"Missing zstd dictionary {dict_id} to decode node")
+        return decompressor.decompress(value)
+
+
+CODECS: Mapping[str, Type[NodeCodec]] = {codec.name: codec for codec in [ZstdNodeCodec]}
+CODECS_BY_ID: Mapping[int, Type[NodeCodec]] = {codec.id: codec for codec in CODECS.values()}
+
+
+def load_dictionaries(paths: Optional[Mapping[str, str]]) -> Mapping[str, bytes]:
+    """
+    Load compression dictionaries from a mapping of platform to file path.
+    """
+    dictionaries = {}
+    for platform, path in (paths or {}).items():
+        with open(path, "rb") as f:
+            dictionaries[platform] = f.read()
+    return dictionaries
+
+
+def train_dictionary(samples: Sequence[bytes], size: int = 112640) -> bytes:
+    """
+    Train a zstd dictionary on encoded nodes of a single platform, to be
+    saved to a file and configured in the nodestore ``codec_dictionaries``.
+    """
+    return zstandard.train_dictionary(size, list(samples)).as_bytes()
@@ -2,10 +2,13 @@ import logging
 import math
 import pickle
 
+from django.db import IntegrityError, router, transaction
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.base import INDEXED_MAGIC, NodeStorage
+from sentry.nodestore.codecs import CODEC_MAGIC
+from sentry.utils.iterators import chunked
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
@@ -14,6 +17,41 @@ logger = logging.getLogger("sentry")
 
 
 class DjangoNodeStorage(NodeStorage):
+    """
+    A Django-based backend for storing node data.
+
+    :param multi_batch_size: Maximum number of nodes read, written or deleted
+        with a single query by the multi-key operations.
+    :param indexed_subkeys: Whether to write nodes with an offset table for
+        subkeys, see ``NodeStorage``.
+    :param codec: Name of the codec to compress nodes with before they are
+        written, see ``NodeStorage``.
+    :param codec_dictionaries: Mapping of platform to a compression
+        dictionary file used by ``codec``.
+    :param local_cache_size: Size in bytes of the in-process cache in front
+        of the shared cache, see ``NodeStorage``. Disabled if 0.
+    :param local_cache_ttl: Seconds items are kept in the in-process cache.
+    """
+
+    def __init__(
+        self,
+        multi_batch_size=500,
+        indexed_subkeys=False,
+        codec=None,
+        codec_dictionaries=None,
+        local_cache_size=0,
+        local_cache_ttl=60,
+    ):
+        super().__init__(
+            indexed_subkeys=indexed_subkeys,
+            codec=codec,
+            codec_dictionaries=codec_dictionaries,
+            local_cache_size=local_cache_size,
+            local_cache_ttl=local_cache_ttl,
+        )
+        assert multi_batch_size > 0
+        self.multi_batch_size = multi_batch_size
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
         self._delete_cache_item(id)
@@ -23,7 +61,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith((b"{", INDEXED_MAGIC, CODEC_MAGIC)):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -42,15 +80,46 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
     def _get_bytes_multi(self, id_list):
-        return {n.id: decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
+        rv = {}
+        for chunk in chunked(id_list, self.multi_batch_size):
+            rv.update((n.id, decompress(n.data)) for n in Node.objects.filter(id__in=chunk))
+        return rv
 
     def delete_multi(self, id_list):
-        Node.objects.filter(id__in=id_list).delete()
+        for chunk in chunked(id_list, self.multi_batch_size):
+            Node.objects.filter(id__in=chunk).delete()
         self._delete_cache_items(id_list)
 
     def _set_bytes(self, id, data, ttl=None):
         create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
 
+    def _set_bytes_multi(self, items, ttl=None):
+        using = router.db_for_write(Node)
+        for chunk in chunked(items.items(), self.multi_batch_size):
+            timestamp = timezone.now()
+            nodes = {
+                id: Node(id=id, data=compress(data), timestamp=timestamp) for id, data in chunk
+            }
+            try:
+                with transaction.atomic(using=using):
+                    existing = set(
+                        Node.objects.using(using)
+                        .filter(id__in=list(nodes.keys()))
+                        .values_list("id", flat=True)
+                    )
+                    if existing:
+                        Node.objects.using(using).bulk_update(
+                            [nodes[id] for id in existing], ["data", "timestamp"]
+                        )
+                    Node.objects.using(using).bulk_create(
+                        [node for id, node in nodes.items() if id not in existing]
+                    )
+            except IntegrityError:
+                # Lost a race against a concurrent write of one of the nodes,
+                # fall back to upserting them one by one.
+                for id, data in chunk:
+                    self._set_bytes(id, data, ttl=ttl)
+
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
 
@@ -58,6 +127,8 @@ class DjangoNodeStorage(NodeStorage):
         days = math.floor(total_seconds / 86400)
 
         BulkDeleteQuery(model=Node, dtfield="timestamp", days=days).execute()
+        if self.local_cache is not None:
+            self.local_cache.clear()
         if self.cache:
             self.cache.clear()
 
@@ -257,6 +257,15 @@ register("snuba.search.max-chunk-size", default=2000)
 register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
 register("snuba.track-outcomes-sample-rate", default=0.0)
+# Coalesce concurrent identical cached Snuba queries: "off", "local" (within
+# the process) or "redis" (across processes).
+register("snuba.single-flight", default="off")
+# Referrers for which cached Snuba results are served up to a hard TTL and
+# refreshed in the background after a soft TTL, eg.
+# {"api.organization-events": {"soft_ttl": 60, "hard_ttl": 600}}
+register("snuba.cache.stale-while-revalidate", default={})
+# Cache completed buckets of TSDB time series queried from Snuba.
+register("snuba.tsdb.bucket-cache", default=False)
 
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
@@ -360,6 +369,10 @@ register("store.reprocessing-force-disable", default=False)
 
 register("store.race-free-group-creation-force-disable", default=False)
 
+# Resolve the group of events whose hashes were all recently seen assigned to
+# a group from a short-lived per-process cache, see sentry.event_manager.
+register("store.grouphash-cache", default=False)
+
 
 # ## sentry.killswitches
 #
@@ -4,7 +4,20 @@ import operator
 import re
 from collections import namedtuple
 from functools import reduce
-from typing import Any, Callable, Iterable, List, Mapping, Optional, Pattern, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from django.db.models import Q
 from parsimonious.exceptions import ParseError
@@ -18,7 +31,7 @@ from sentry.utils.event_frames import find_stack_frames, get_sdk_name, munged_fi
 from sentry.utils.glob import glob_match
 from sentry.utils.safe import PathSearchable, get_path
 
-__all__ = ("parse_rules", "dump_schema", "load_schema")
+__all__ = ("parse_rules", "dump_schema", "load_schema", "CompiledRules")
 
 VERSION = 1
 
@@ -203,6 +216,114 @@ class Matcher(namedtuple("Matcher", "type pattern")):
         return False
 
 
+class CompiledRules:
+    """
+    The rules of a schema, prepared for testing them against many events.
+
+    ``match`` returns the same rules as testing every rule in order, but
+    extracts (and munges) the frames of the event only once, and compiles
+    the regexes of ``codeowners`` rules upfront. ``codeowners`` rules are
+    also indexed by a path segment without wildcards that any matching path
+    has to contain, so only the rules indexed under one of the segments of a
+    frame's path (and the few rules without such a segment) are tested for
+    that frame.
+    """
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self.rules = rules
+        self.codeowners_regexes: Dict[int, Pattern[str]] = {}
+        self.codeowners_index: Dict[str, List[int]] = {}
+        self.codeowners_unindexed: List[int] = []
+        self.other: List[int] = []
+        self.needs_munged_frames = False
+
+        for i, rule in enumerate(rules):
+            if rule.matcher.type != CODEOWNERS:
+                self.other.append(i)
+                self.needs_munged_frames |= rule.matcher.type == PATH
+                continue
+
+            self.needs_munged_frames = True
+
+            self.codeowners_regexes[i] = _path_to_regex(rule.matcher.pattern)
+            segment = _required_path_segment(rule.matcher.pattern)
+            if segment is None:
+                self.codeowners_unindexed.append(i)
+            else:
+                self.codeowners_index.setdefault(segment, []).append(i)
+
+    @classmethod
+    def from_schema(cls, schema: Mapping[str, Any]) -> CompiledRules:
+        return cls(load_schema(schema))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, data: PathSearchable) -> Sequence[Rule]:
+        """Return all rules matching the event data, in order."""
+        matched: Set[int] = set()
+
+        munged = Matcher.munge_if_needed(data) if self.needs_munged_frames else None
+
+        if self.codeowners_regexes:
+            frames, keys = munged
+            for value in _frame_values(frames, keys):
+                candidates = set(self.codeowners_unindexed)
+                for segment in value.split("/"):
+                    candidates.update(self.codeowners_index.get(segment, ()))
+                for i in candidates - matched:
+                    if self.codeowners_regexes[i].search(value):
+                        matched.add(i)
+
+        module_frames = None
+        for i in self.other:
+            matcher = self.rules[i].matcher
+            if matcher.type == PATH:
+                is_match = matcher.test_frames(*munged)
+            elif matcher.type == MODULE:
+                if module_frames is None:
+                    module_frames = find_stack_frames(data)
+                is_match = matcher.test_frames(module_frames, ["module"])
+            else:
+                is_match = matcher.test(data)
+
+            if is_match:
+                matched.add(i)
+
+        return [self.rules[i] for i in sorted(matched)]
+
+
+def _frame_values(frames: Sequence[Mapping[str, Any]], keys: Sequence[str]) -> Iterable[str]:
+    for frame in frames:
+        if not isinstance(frame, Mapping):
+            continue
+        for key in keys:
+            value = frame.get(key)
+            if value:
+                yield value
+
+
+def _required_path_segment(pattern: str) -> Optional[str]:
+    """
+    Return a segment without wildcards of a codeowners pattern, which any
+    path matched by ``_path_to_regex(pattern)`` contains as a full segment.
+    """
+    if pattern.startswith("\\"):
+        return None
+
+    parts = pattern.split("/")
+    segments = [
+        segment
+        for previous, segment in zip([None] + parts, parts)
+        # ``**/`` also consumes the following slash, so the segment after it
+        # may match the end of a longer segment.
+        if segment and "*" not in segment and "?" not in segment and previous != "**"
+    ]
+    if not segments:
+        return None
+    return max(segments, key=len)
+
+
 class Owner(namedtuple("Owner", "type identifier")):
     """
     An Owner represents a User or Team who owns this Rule.
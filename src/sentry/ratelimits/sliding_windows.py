@@ -73,6 +73,24 @@ When using the quotas, the keys change as follows:
     sliding-window-rate-limit:123:3:902 = 1
     sliding-window-rate-limit:123:30:90 = 2
 
+Aggregated windows
+==================
+
+Reading every granule means that the cost of a request grows with
+`window_seconds / granularity_seconds`, a 1-hour window at 10-second
+granularity reads 360 keys. With `window_mode="aggregate"` the redis backend
+instead stores each quota in a single hash of granules, alongside the sum of
+all granules within the window. A server-side script subtracts granules from
+the sum as they slide out of the window, so a request costs one script call
+per quota regardless of the window size::
+
+    sliding-window-rate-limit:123:30:10 = {"head": 90, "sum": 2, "90": 2}
+
+Granules that slid out of the window are deleted, so a request with a
+timestamp older than the window ending at the newest request seen counts
+nothing as used and is not recorded.
+
+Switching between window modes starts all quotas out empty.
 """
 
 from dataclasses import dataclass
@@ -83,6 +101,13 @@ from sentry.exceptions import InvalidConfiguration
 from sentry.utils import redis
 from sentry.utils.services import Service
 
+sliding_window = redis.load_script("ratelimits/sliding_window.lua")
+
+#: Available representations of quotas in Redis. ``granules`` stores one key
+#: per granule and reads the entire window, ``aggregate`` stores one hash per
+#: quota with a rolling sum maintained by a server-side script.
+WINDOW_MODES = frozenset(["granules", "aggregate"])
+
 
 @dataclass(frozen=True)
 class Quota:
@@ -270,6 +295,8 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     def __init__(self, **options: Any) -> None:
         cluster_key = options.get("cluster", "default")
         self.client = redis.redis_clusters.get(cluster_key)
+        self.window_mode = options.get("window_mode", "granules")
+        assert self.window_mode in WINDOW_MODES, f"invalid window_mode: {self.window_mode}"
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -300,6 +327,44 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
             granule=granule,
         )
 
+    def _build_aggregate_redis_key(self, request: RequestedQuota, quota: Quota) -> str:
+        # The granule keys of the same quota have one more component, so the
+        # two window modes never share keys.
+        prefix = quota.prefix_override or request.prefix
+        if "{" in prefix or "}" in prefix:
+            raise ValueError("Explicit sharding not allowed in RequestedQuota.prefix")
+
+        return (
+            f"sliding-window-rate-limit:{prefix}:{quota.window_seconds}:{quota.granularity_seconds}"
+        )
+
+    def _run_aggregate_script(
+        self,
+        requests: Sequence[RequestedQuota],
+        amounts: Sequence[int],
+        timestamp: Timestamp,
+    ) -> Sequence[Sequence[int]]:
+        """
+        Run the aggregate window script for every quota of every request, in
+        a single round trip. Returns the used quota per quota per request.
+        """
+        with self.client.pipeline(transaction=False) as pipeline:
+            for request, amount in zip(requests, amounts):
+                for quota in request.quotas:
+                    sliding_window(
+                        pipeline,
+                        [self._build_aggregate_redis_key(request=request, quota=quota)],
+                        [
+                            next(quota.iter_window(timestamp)),
+                            quota.window_seconds // quota.granularity_seconds,
+                            amount,
+                            quota.window_seconds,
+                        ],
+                    )
+            results = iter(pipeline.execute())
+
+        return [[int(next(results)) for _ in request.quotas] for request in requests]
+
     def check_within_quotas(
         self, requests: Sequence[RequestedQuota], timestamp: Optional[Timestamp] = None
     ) -> Tuple[Timestamp, Sequence[GrantedQuota]]:
@@ -308,13 +373,23 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         else:
             timestamp = int(timestamp)
 
+        # We could potentially run this check inside of __post__init__ of
+        # RequestedQuota, but the list is actually mutable after
+        # construction.
+        assert all(request.quotas for request in requests)
+
+        if self.window_mode == "aggregate":
+            used_quotas = self._run_aggregate_script(requests, [0] * len(requests), timestamp)
+            return timestamp, [
+                GrantedQuota(
+                    prefix=request.prefix,
+                    granted=self._get_granted_quota(request, used),
+                )
+                for request, used in zip(requests, used_quotas)
+            ]
+
         keys_to_fetch = []
         for request in requests:
-            # We could potentially run this check inside of __post__init__ of
-            # RequestedQuota, but the list is actually mutable after
-            # construction.
-            assert request.quotas
-
             for quota in request.quotas:
                 for granule in quota.iter_window(timestamp):
                     keys_to_fetch.append(
@@ -326,19 +401,8 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         results = []
 
         for request in requests:
-            # We start out with assuming the entire request can be granted in
-            # its entirety.
-            granted_quota = request.requested
-
-            # A request succeeds (partially) if it fits (partially) into all
-            # quotas. For each quota, we calculate how much quota has been used
-            # up, and trim the granted_quota by the remaining quota.
-            #
-            # We need to explicitly handle the possibility that quotas have
-            # been overused, in those cases we want to truncate resulting
-            # negative "grants" to zero.
-            for quota in request.quotas:
-                used_quota = sum(
+            used_quotas = [
+                sum(
                     int(
                         redis_results.get(
                             self._build_redis_key(request=request, quota=quota, granule=granule)
@@ -347,12 +411,33 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                     )
                     for granule in quota.iter_window(timestamp)
                 )
+                for quota in request.quotas
+            ]
+            results.append(
+                GrantedQuota(
+                    prefix=request.prefix,
+                    granted=self._get_granted_quota(request, used_quotas),
+                )
+            )
 
-                granted_quota = max(0, min(granted_quota, quota.limit - used_quota))
+        return timestamp, results
 
-            results.append(GrantedQuota(prefix=request.prefix, granted=granted_quota))
+    def _get_granted_quota(self, request: RequestedQuota, used_quotas: Sequence[int]) -> int:
+        # We start out with assuming the entire request can be granted in
+        # its entirety.
+        granted_quota = request.requested
 
-        return timestamp, results
+        # A request succeeds (partially) if it fits (partially) into all
+        # quotas. For each quota, we calculate how much quota has been used
+        # up, and trim the granted_quota by the remaining quota.
+        #
+        # We need to explicitly handle the possibility that quotas have
+        # been overused, in those cases we want to truncate resulting
+        # negative "grants" to zero.
+        for quota, used_quota in zip(request.quotas, used_quotas):
+            granted_quota = max(0, min(granted_quota, quota.limit - used_quota))
+
+        return granted_quota
 
     def use_quotas(
         self,
@@ -362,6 +447,18 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     ) -> None:
         assert len(requests) == len(grants)
 
+        if self.window_mode == "aggregate":
+            keys = set()
+            for request, grant in zip(requests, grants):
+                assert request.prefix == grant.prefix
+                for quota in request.quotas:
+                    key = self._build_aggregate_redis_key(request=request, quota=quota)
+                    assert key not in keys, "conflicting quotas specified"
+                    keys.add(key)
+
+            self._run_aggregate_script(requests, [grant.granted for grant in grants], timestamp)
+            return
+
         keys_to_incr = {}
 
         for request, grant in zip(requests, grants):
@@ -4,8 +4,9 @@ import abc
 import contextlib
 import logging
 import re
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Any, Mapping
+from typing import Any, Iterator, Mapping
 
 from django import forms
 from django.core.cache import cache
@@ -44,6 +45,28 @@ comparison_types = {
 }
 
 
+# Results of frequency queries within `batch_frequency_queries`, by
+# condition, group, environment, interval and comparison interval.
+_query_results: ContextVar[dict[tuple[Any, ...], int] | None] = ContextVar(
+    "frequency_query_results", default=None
+)
+
+
+@contextlib.contextmanager
+def batch_frequency_queries() -> Iterator[None]:
+    """
+    Shares query results between the frequency conditions evaluated within
+    the context, so that all rules of a project with the same condition,
+    interval and comparison interval cause one query per event. The results
+    are discarded when the context exits.
+    """
+    token = _query_results.set({})
+    try:
+        yield
+    finally:
+        _query_results.reset(token)
+
+
 class EventFrequencyForm(forms.Form):  # type: ignore
     intervals = standard_intervals
     interval = forms.ChoiceField(
@@ -135,6 +158,34 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         """ """
         raise NotImplementedError  # subclass must implement
 
+    def query_batched(
+        self,
+        event: Event,
+        end: datetime,
+        duration: timedelta,
+        environment_id: str,
+        comparison_interval: timedelta = timedelta(0),
+    ) -> int:
+        """
+        Queries the `duration` before `end - comparison_interval`, sharing
+        the result with other conditions within `batch_frequency_queries`.
+        """
+        end = end - comparison_interval
+        query_results = _query_results.get()
+        if query_results is None:
+            return self.query(event, end - duration, end, environment_id=environment_id)
+
+        key = (self.id, event.group_id, environment_id, duration, comparison_interval)
+        result = query_results.get(key)
+        metrics.incr(
+            "rules.conditions.batched_query", tags={"result": "miss" if result is None else "hit"}
+        )
+        if result is None:
+            result = query_results[key] = self.query(
+                event, end - duration, end, environment_id=environment_id
+            )
+        return result
+
     def get_rate(self, event: Event, interval: str, environment_id: str) -> int:
         _, duration = self.intervals[interval]
         end = timezone.now()
@@ -145,16 +196,12 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         if duration >= timedelta(hours=1):
             option_override_cm = options_override({"consistent": False})
         with option_override_cm:
-            result: int = self.query(event, end - duration, end, environment_id=environment_id)
+            result: int = self.query_batched(event, end, duration, environment_id)
             comparison_type = self.get_option("comparisonType", COMPARISON_TYPE_COUNT)
             if comparison_type == COMPARISON_TYPE_PERCENT:
                 comparison_interval = comparison_intervals[self.get_option("comparisonInterval")][1]
-                comparison_end = end - comparison_interval
-                # TODO: Figure out if there's a way we can do this less frequently. All queries are
-                # automatically cached for 10s. We could consider trying to cache this and the main
-                # query for 20s to reduce the load.
-                comparison_result = self.query(
-                    event, comparison_end - duration, comparison_end, environment_id=environment_id
+                comparison_result = self.query_batched(
+                    event, end, duration, environment_id, comparison_interval
                 )
                 result = (
                     int(max(0, ((result / comparison_result) * 100) - 100))
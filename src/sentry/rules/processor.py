@@ -3,21 +3,113 @@ from __future__ import annotations
 import logging
 from datetime import timedelta
 from random import randrange
-from typing import Any, Callable, Iterable, List, Mapping, MutableMapping, Sequence, Set, Tuple
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 
 from django.core.cache import cache
 from django.utils import timezone
 
 from sentry import analytics
 from sentry.eventstore.models import Event
-from sentry.models import GroupRuleStatus, Rule
+from sentry.models import GroupRuleStatus, Project, Rule
 from sentry.rules import EventState, history, rules
+from sentry.rules.base import RuleBase
+from sentry.rules.conditions.event_frequency import batch_frequency_queries
 from sentry.types.rules import RuleFuture
+from sentry.utils import metrics
+from sentry.utils.cache import LRUCache
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
 
 SLOW_CONDITION_MATCHES = ["event_frequency"]
 
+logger = logging.getLogger("sentry.rules")
+
+
+class CompiledRule:
+    """
+    The parsed conditions and filters of a version of a rule: their classes
+    looked up in the rule registry and split into filters and conditions,
+    with the most expensive conditions last.
+
+    Compiled rules are shared between events and threads, so they don't hold
+    any model instances or condition instances. Conditions are instantiated
+    with the current project and rule when they are evaluated.
+    """
+
+    def __init__(self, rule: Rule) -> None:
+        self.rule_id = rule.id
+        self.version = self.get_version(rule)
+        self.condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
+        self.filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
+        self.frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
+
+        conditions: List[Tuple[Mapping[str, Any], Type[RuleBase] | None]] = []
+        filters: List[Tuple[Mapping[str, Any], Type[RuleBase] | None]] = []
+        for rule_cond in rule.data.get("conditions", ()):
+            rule_cls = rules.get(rule_cond["id"])
+            if rule_cls is None:
+                logger.warning("Unregistered condition or filter %r", rule_cond["id"])
+                filters.append((rule_cond, None))
+            elif rule_cls.rule_type == "condition/event":
+                conditions.append((rule_cond, rule_cls))
+            else:
+                filters.append((rule_cond, rule_cls))
+
+        # Sort `conditions` so that most expensive conditions run last.
+        conditions.sort(
+            key=lambda condition: any(
+                condition_match in condition[0]["id"] for condition_match in SLOW_CONDITION_MATCHES
+            )
+        )
+        self.conditions = tuple(conditions)
+        self.filters = tuple(filters)
+
+    @staticmethod
+    def get_version(rule: Rule) -> Tuple[Any, ...]:
+        return (rule.environment_id, rule.label, rule.data)
+
+
+# Compiled rules per project id, along with the rule registry they were
+# compiled with. Rules are recompiled whenever the cached (shared) rules of
+# the project no longer match the version they were compiled from. Cached
+# values are never mutated, a changed project gets a new mapping.
+_compiled_rules_cache = LRUCache(max_size=100000, sizeof=lambda value: len(value[1]) or 1)
+
+
+def get_compiled_rules(project: Project, project_rules: Sequence[Rule]) -> Sequence[CompiledRule]:
+    cached = _compiled_rules_cache.get(project.id)
+    if cached is not None and cached[0] is rules:
+        compiled_by_id: Mapping[int, CompiledRule] = cached[1]
+    else:
+        compiled_by_id = {}
+
+    compiled: List[CompiledRule] = []
+    changed = cached is None or len(compiled_by_id) != len(project_rules)
+    for rule in project_rules:
+        compiled_rule = compiled_by_id.get(rule.id)
+        if compiled_rule is None or compiled_rule.version != CompiledRule.get_version(rule):
+            compiled_rule = CompiledRule(rule)
+            changed = True
+        compiled.append(compiled_rule)
+
+    metrics.incr(
+        "rules.processor.compiled_rules_cache", tags={"result": "miss" if changed else "hit"}
+    )
+    if changed:
+        _compiled_rules_cache.set(project.id, (rules, {c.rule_id: c for c in compiled}))
+    return compiled
+
 
 class RuleProcessor:
     logger = logging.getLogger("sentry.rules")
@@ -64,44 +156,20 @@ class RuleProcessor:
                 rule_statuses[rule.id] = rule_status
 
         if missing_rule_ids:
-            # If not cached, attempt to fetch status from the database
-            statuses = GroupRuleStatus.objects.filter(
-                group=self.group, rule_id__in=missing_rule_ids
-            )
+            # If not cached, fetch the statuses from the database, creating
+            # the ones that don't exist yet.
             to_cache: List[GroupRuleStatus] = list()
-            for status in statuses:
+            for status in self._get_or_create_rule_statuses(missing_rule_ids):
                 rule_statuses[status.rule_id] = status
-                missing_rule_ids.remove(status.rule_id)
+                missing_rule_ids.discard(status.rule_id)
                 to_cache.append(status)
 
-            # We might need to create some statuses if they don't already exist
             if missing_rule_ids:
-                # We use `ignore_conflicts=True` here to avoid race conditions where the statuses
-                # might be created between when we queried above and attempt to create the rows now.
-                GroupRuleStatus.objects.bulk_create(
-                    [
-                        GroupRuleStatus(rule_id=rule_id, group=self.group, project=self.project)
-                        for rule_id in missing_rule_ids
-                    ],
-                    ignore_conflicts=True,
-                )
-                # Using `ignore_conflicts=True` prevents the pk from being set on the model
-                # instances. Re-query the database to fetch the rows, they should all exist at this
-                # point.
-                statuses = GroupRuleStatus.objects.filter(
-                    group=self.group, rule_id__in=missing_rule_ids
+                # Shouldn't happen, but log just in case
+                self.logger.error(
+                    "Failed to fetch some GroupRuleStatuses in RuleProcessor",
+                    extra={"missing_rule_ids": missing_rule_ids, "group_id": self.group.id},
                 )
-                for status in statuses:
-                    rule_statuses[status.rule_id] = status
-                    missing_rule_ids.remove(status.rule_id)
-                    to_cache.append(status)
-
-                if missing_rule_ids:
-                    # Shouldn't happen, but log just in case
-                    self.logger.error(
-                        "Failed to fetch some GroupRuleStatuses in RuleProcessor",
-                        extra={"missing_rule_ids": missing_rule_ids, "group_id": self.group.id},
-                    )
             if to_cache:
                 cache.set_many(
                     {self._build_rule_status_cache_key(item.rule_id): item for item in to_cache}
@@ -109,28 +177,45 @@ class RuleProcessor:
 
         return rule_statuses
 
-    def condition_matches(
-        self, condition: Mapping[str, Any], state: EventState, rule: Rule
-    ) -> bool | None:
-        condition_cls = rules.get(condition["id"])
-        if condition_cls is None:
-            self.logger.warning("Unregistered condition %r", condition["id"])
-            return None
-
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
-        passes: bool = safe_execute(
-            condition_inst.passes, self.event, state, _with_transaction=False
-        )
-        return passes
+    def _get_or_create_rule_statuses(self, rule_ids: Set[int]) -> Iterable[GroupRuleStatus]:
+        """
+        Returns the statuses of the rules for the group, creating the missing
+        ones. Only statuses that don't exist yet take the two extra queries to
+        create and fetch them.
+        """
+        statuses = list(GroupRuleStatus.objects.filter(group=self.group, rule_id__in=rule_ids))
+        missing_rule_ids = rule_ids - {status.rule_id for status in statuses}
+        if missing_rule_ids:
+            # We use `ignore_conflicts=True` here to avoid race conditions where the statuses
+            # might be created between when we queried above and attempt to create the rows now.
+            GroupRuleStatus.objects.bulk_create(
+                [
+                    GroupRuleStatus(rule_id=rule_id, group=self.group, project=self.project)
+                    for rule_id in sorted(missing_rule_ids)
+                ],
+                ignore_conflicts=True,
+            )
+            # Using `ignore_conflicts=True` prevents the pk from being set on the model
+            # instances. Re-query the database to fetch the rows, they should all exist at this
+            # point.
+            statuses.extend(
+                GroupRuleStatus.objects.filter(group=self.group, rule_id__in=missing_rule_ids)
+            )
+        return statuses
 
-    def get_rule_type(self, condition: Mapping[str, Any]) -> str | None:
-        rule_cls = rules.get(condition["id"])
+    def _predicate_passes(
+        self,
+        rule_cond: Mapping[str, Any],
+        rule_cls: Type[RuleBase] | None,
+        rule: Rule,
+        state: EventState,
+    ) -> bool | None:
         if rule_cls is None:
-            self.logger.warning("Unregistered condition or filter %r", condition["id"])
             return None
 
-        rule_type: str = rule_cls.rule_type
-        return rule_type
+        predicate = rule_cls(self.project, data=rule_cond, rule=rule)
+        passes: bool = safe_execute(predicate.passes, self.event, state, _with_transaction=False)
+        return passes
 
     def get_state(self) -> EventState:
         return EventState(
@@ -149,17 +234,18 @@ class RuleProcessor:
             return lambda bool_iter: not any(bool_iter)
         return None
 
-    def apply_rule(self, rule: Rule, status: GroupRuleStatus) -> None:
+    def apply_rule(
+        self, rule: Rule, status: GroupRuleStatus, compiled_rule: CompiledRule | None = None
+    ) -> None:
         """
         If all conditions and filters pass, execute every action.
 
         :param rule: `Rule` object
+        :param compiled_rule: `CompiledRule` for `rule`, compiled if not given
         :return: void
         """
-        condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
-        filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
-        rule_condition_list = rule.data.get("conditions", ())
-        frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
+        if compiled_rule is None:
+            compiled_rule = CompiledRule(rule)
 
         if (
             rule.environment_id is not None
@@ -168,41 +254,31 @@ class RuleProcessor:
             return
 
         now = timezone.now()
-        freq_offset = now - timedelta(minutes=frequency)
+        freq_offset = now - timedelta(minutes=compiled_rule.frequency)
         if status.last_active and status.last_active > freq_offset:
             return
 
         state = self.get_state()
 
-        condition_list = []
-        filter_list = []
-        for rule_cond in rule_condition_list:
-            if self.get_rule_type(rule_cond) == "condition/event":
-                condition_list.append(rule_cond)
-            else:
-                filter_list.append(rule_cond)
-
-        # Sort `condition_list` so that most expensive conditions run last.
-        condition_list.sort(
-            key=lambda condition: any(
-                condition_match in condition["id"] for condition_match in SLOW_CONDITION_MATCHES
-            )
-        )
-
         for predicate_list, match, name in (
-            (filter_list, filter_match, "filter"),
-            (condition_list, condition_match, "condition"),
+            (compiled_rule.filters, compiled_rule.filter_match, "filter"),
+            (compiled_rule.conditions, compiled_rule.condition_match, "condition"),
         ):
             if not predicate_list:
                 continue
-            predicate_iter = (self.condition_matches(f, state, rule) for f in predicate_list)
+            predicate_iter = (
+                self._predicate_passes(rule_cond, rule_cls, rule, state)
+                for rule_cond, rule_cls in predicate_list
+            )
             predicate_func = self.get_match_function(match)
             if predicate_func:
                 if not predicate_func(predicate_iter):
                     return
             else:
                 self.logger.error(
-                    f"Unsupported {name}_match {match!r} for rule {rule.id}", filter_match, rule.id
+                    f"Unsupported {name}_match {match!r} for rule {rule.id}",
+                    compiled_rule.filter_match,
+                    rule.id,
                 )
                 return
 
@@ -256,7 +332,9 @@ class RuleProcessor:
 
         self.grouped_futures.clear()
         rules = self.get_rules()
+        compiled_rules = get_compiled_rules(self.project, rules)
         rule_statuses = self.bulk_get_rule_status(rules)
-        for rule in rules:
-            self.apply_rule(rule, rule_statuses[rule.id])
+        with batch_frequency_queries():
+            for rule, compiled_rule in zip(rules, compiled_rules):
+                self.apply_rule(rule, rule_statuses[rule.id], compiled_rule)
         return self.grouped_futures.values()
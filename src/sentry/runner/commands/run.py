@@ -555,12 +555,33 @@ def ingest_consumer(consumer_types, all_consumer_types, **options):
 @click.option("--ingest-profile")
 @click.option("commit_max_batch_size", "--commit-max-batch-size", type=int, default=25000)
 @click.option("commit_max_batch_time", "--commit-max-batch-time-ms", type=int, default=10000)
+@click.option(
+    "--adaptive-batching",
+    is_flag=True,
+    default=False,
+    help="Tune batch and input block sizes to the traffic (multiprocess factory only).",
+)
+@click.option("--min-batch-size", type=int, default=10)
+@click.option(
+    "--partial-parse",
+    is_flag=True,
+    default=False,
+    help="Only parse the parts of messages that are indexed.",
+)
 def metrics_streaming_consumer(**options):
     from sentry.sentry_metrics.configuration import UseCaseKey, get_ingest_config
-    from sentry.sentry_metrics.consumers.indexer.multiprocess import get_streaming_metrics_consumer
     from sentry.sentry_metrics.metrics_wrapper import MetricsWrapper
     from sentry.utils.metrics import backend, global_tags
 
+    if options["factory_name"] == "multiprocess":
+        from sentry.sentry_metrics.consumers.indexer.parallel import get_streaming_metrics_consumer
+    elif options["adaptive_batching"]:
+        raise click.ClickException("--adaptive-batching requires --factory-name multiprocess")
+    else:
+        from sentry.sentry_metrics.consumers.indexer.multiprocess import (
+            get_streaming_metrics_consumer,
+        )
+
     ingest_config = get_ingest_config(UseCaseKey(options["ingest_profile"]))
     metrics_wrapper = MetricsWrapper(backend, "sentry_metrics.indexer")
     configure_metrics(metrics_wrapper)
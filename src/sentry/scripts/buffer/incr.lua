@@ -0,0 +1,45 @@
+-- Apply a single buffer increment to a buffer hash and register it as
+-- pending, atomically and in one round trip. This is the scripted
+-- equivalent of the pipeline built by ``RedisBuffer.incr``.
+--
+-- KEYS = {buffer key, pending key}
+-- ARGV = {
+--     model name, encoded filters, expiration (seconds), pending score,
+--     signal only ("1" or "0"), number of counter columns,
+--     counter column 1, amount 1, ..., counter column N, amount N,
+--     extra column 1, encoded value 1, ..., extra column M, encoded value M,
+-- }
+--
+-- Counter columns are stored as ``i+<column>`` and incremented, extra
+-- columns are stored as ``e+<column>`` with last write wins semantics.
+assert(#KEYS == 2, "expected buffer key and pending key")
+
+local key = KEYS[1]
+local pending_key = KEYS[2]
+
+redis.call('HSETNX', key, 'm', ARGV[1])
+redis.call('HSETNX', key, 'f', ARGV[2])
+
+local expiration = ARGV[3]
+local score = ARGV[4]
+local signal_only = ARGV[5]
+local num_columns = tonumber(ARGV[6])
+
+local i = 7
+local columns_end = i + num_columns * 2
+while i < columns_end do
+    redis.call('HINCRBY', key, 'i+' .. ARGV[i], ARGV[i + 1])
+    i = i + 2
+end
+
+while i < #ARGV do
+    redis.call('HSET', key, 'e+' .. ARGV[i], ARGV[i + 1])
+    i = i + 2
+end
+
+if signal_only == '1' then
+    redis.call('HSET', key, 's', '1')
+end
+
+redis.call('EXPIRE', key, expiration)
+redis.call('ZADD', pending_key, score, key)
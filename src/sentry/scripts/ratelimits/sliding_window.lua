@@ -0,0 +1,69 @@
+-- Check (and optionally use) a single quota of the sliding window rate
+-- limiter with ``window_mode="aggregate"``, see
+-- ``sentry.ratelimits.sliding_windows``.
+--
+-- KEYS = {quota key}
+-- ARGV = {granule, granules per window, amount to use, expiration (seconds)}
+--
+-- Returns the quota used within the window ending at ``granule``, not
+-- including ``amount``. Granules that are older than the window ending at
+-- the newest granule seen always return 0.
+--
+-- The quota key is a hash of granule -> count, plus a ``head`` field with
+-- the newest granule seen and a ``sum`` field with the sum of all granules
+-- within the window ending at ``head``. Granules are subtracted from the
+-- sum and deleted once they slide out of the window, so the cost of a call
+-- depends on the number of granules elapsed since the previous call instead
+-- of the number of granules in the window.
+assert(#KEYS == 1, "expected quota key")
+
+local key = KEYS[1]
+local granule = tonumber(ARGV[1])
+local granules = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local expiration = tonumber(ARGV[4])
+
+local state = redis.call('HMGET', key, 'head', 'sum')
+local head = tonumber(state[1])
+local sum = tonumber(state[2]) or 0
+
+if head == nil or granule - head >= granules then
+    -- Nothing that is stored is within the window anymore.
+    if head ~= nil then
+        redis.call('DEL', key)
+    end
+    head = granule
+    sum = 0
+elseif granule > head then
+    for expired = head - granules + 1, granule - granules do
+        local count = redis.call('HGET', key, expired)
+        if count then
+            sum = sum - tonumber(count)
+            redis.call('HDEL', key, expired)
+        end
+    end
+    head = granule
+    redis.call('HMSET', key, 'head', head, 'sum', sum)
+end
+
+local used = sum
+if granule <= head - granules then
+    -- The timestamp is older than the window ending at ``head``. The granules
+    -- of its own window are deleted already, so it sees an empty window and
+    -- is not recorded, just like expired keys in ``window_mode="granules"``.
+    used = 0
+elseif granule < head then
+    -- The timestamp is older than a previous one, exclude the granules that
+    -- are newer than it.
+    for newer = granule + 1, head do
+        used = used - (tonumber(redis.call('HGET', key, newer)) or 0)
+    end
+end
+
+if amount > 0 and granule > head - granules then
+    redis.call('HINCRBY', key, granule, amount)
+    redis.call('HMSET', key, 'head', head, 'sum', sum + amount)
+    redis.call('EXPIRE', key, expiration)
+end
+
+return used
@@ -0,0 +1,23 @@
+-- Apply a batch of counter increments to the hashes on a single host in one
+-- round trip. This is the scripted equivalent of issuing ``HINCRBY`` and
+-- ``EXPIREAT`` for every hash field, as ``RedisTSDB.incr_multi`` used to.
+--
+-- KEYS = {hash key 1, ..., hash key N}
+-- ARGV = {
+--     expiration timestamp 1, number of fields 1,
+--     field 1, amount 1, ..., field M, amount M,
+--     ...
+--     expiration timestamp N, number of fields N,
+--     field 1, amount 1, ..., field M, amount M,
+-- }
+local cursor = 1
+for _, key in ipairs(KEYS) do
+    local expiration = ARGV[cursor]
+    local fields_end = cursor + 2 + tonumber(ARGV[cursor + 1]) * 2
+    cursor = cursor + 2
+    while cursor < fields_end do
+        redis.call('HINCRBY', key, ARGV[cursor], ARGV[cursor + 1])
+        cursor = cursor + 2
+    end
+    redis.call('EXPIREAT', key, expiration)
+end
@@ -0,0 +1,30 @@
+-- Add a batch of members to the HyperLogLogs on a single host in one round
+-- trip. This is the scripted equivalent of issuing ``PFADD`` and ``EXPIREAT``
+-- for every distinct counter, as ``RedisTSDB.record_multi`` used to.
+--
+-- KEYS = {distinct counter key 1, ..., distinct counter key N}
+-- ARGV = {
+--     expiration timestamp 1, number of members 1, member 1, ..., member M,
+--     ...
+--     expiration timestamp N, number of members N, member 1, ..., member M,
+-- }
+
+-- Members are passed to ``PFADD`` in chunks, since ``unpack`` is limited by
+-- the size of the Lua stack.
+local CHUNK_SIZE = 1000
+
+local cursor = 1
+for _, key in ipairs(KEYS) do
+    local expiration = ARGV[cursor]
+    local members_end = cursor + 2 + tonumber(ARGV[cursor + 1])
+    cursor = cursor + 2
+    if cursor == members_end then
+        redis.call('PFADD', key)
+    end
+    while cursor < members_end do
+        local chunk_end = math.min(cursor + CHUNK_SIZE, members_end)
+        redis.call('PFADD', key, unpack(ARGV, cursor, chunk_end - 1))
+        cursor = chunk_end
+    end
+    redis.call('EXPIREAT', key, expiration)
+end
@@ -85,8 +85,10 @@ from sentry.utils.snuba import (
     DATASETS,
     Dataset,
     QueryOutsideRetentionError,
+    SnubaStreamingResult,
     bulk_snql_query,
     raw_snql_query,
+    raw_snql_query_stream,
     resolve_column,
 )
 from sentry.utils.validators import INVALID_ID_DETAILS, INVALID_SPAN_ID, WILDCARD_NOT_ALLOWED
@@ -1226,6 +1228,9 @@ class QueryBuilder:
     def run_query(self, referrer: str, use_cache: bool = False) -> Any:
         return raw_snql_query(self.get_snql_query(), referrer, use_cache)
 
+    def run_query_stream(self, referrer: str) -> SnubaStreamingResult:
+        return raw_snql_query_stream(self.get_snql_query(), referrer)
+
 
 class UnresolvedQuery(QueryBuilder):
     def __init__(
@@ -1,6 +1,18 @@
 import logging
+import re
 from collections import defaultdict
-from typing import List, Mapping, MutableMapping, NamedTuple, Optional, Sequence, Set, Tuple
+from typing import (
+    Any,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import rapidjson
 import sentry_sdk
@@ -26,6 +38,113 @@ class PartitionIdxOffset(NamedTuple):
     offset: int
 
 
+# Grammar of the payloads that `parse_partial_payload` understands: an object
+# whose members are scalars, or arrays or objects of scalars. Arrays of
+# numbers, the values of distributions and sets, are only checked for the
+# characters they contain, as matching every number is about as slow as
+# decoding them.
+_WS = rb"[ \t\n\r]*"
+_STRING = rb'"(?:[^"\\\x00-\x1f]|\\.)*"'
+_NUMBER = rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?"
+_SCALAR = rb"(?:%s|%s|true|false|null)" % (_STRING, _NUMBER)
+_NUMBERS = rb"\[[-+.0-9eE, \t\n\r]*\]"
+_ARRAY = rb"\[%s(?:%s(?:%s,%s%s)*)?%s\]" % (_WS, _SCALAR, _WS, _WS, _SCALAR, _WS)
+_OBJECT_MEMBER = rb"%s%s:%s%s" % (_STRING, _WS, _WS, _SCALAR)
+_OBJECT = rb"\{%s(?:%s(?:%s,%s%s)*)?%s\}" % (
+    _WS,
+    _OBJECT_MEMBER,
+    _WS,
+    _WS,
+    _OBJECT_MEMBER,
+    _WS,
+)
+_PAYLOAD_START = re.compile(rb"%s\{" % _WS)
+_PAYLOAD_MEMBER = re.compile(
+    rb'%s"([^"\\\x00-\x1f]*)"%s:%s(%s|%s|%s|%s)%s([,}])'
+    % (_WS, _WS, _WS, _SCALAR, _NUMBERS, _ARRAY, _OBJECT, _WS)
+)
+_PAYLOAD_END = re.compile(rb"%s\Z" % _WS)
+
+# Members that are read for indexing, and whether they are copied to the
+# outgoing payload as they are.
+_PARSED_MEMBERS = {b"name": False, b"tags": False, b"org_id": True, b"type": True}
+# Members that are set by the indexer, and replace any incoming ones.
+_REPLACED_MEMBERS = {b"metric_id", b"retention_days", b"mapping_meta", b"use_case_id"}
+
+
+class PartialPayload(NamedTuple):
+    """
+    The members of a metrics message that are needed for indexing, and the
+    raw bytes of the members that are passed on as they are.
+    """
+
+    name: Any
+    org_id: Any
+    type: Any
+    tags: Mapping[str, str]
+    members: List[bytes]
+
+    def splice(self, new_members: Mapping[str, Any]) -> bytes:
+        """
+        Returns the outgoing payload, the passed on members followed by
+        `new_members`.
+        """
+        return b"{" + b",".join(self.members) + b"," + rapidjson.dumps(new_members).encode()[1:]
+
+
+def parse_partial_payload(payload: bytes) -> Optional[PartialPayload]:
+    """
+    Reads the members of a metrics message that are needed for indexing
+    without decoding the rest of it, in particular the values of
+    distributions and sets.
+
+    Returns `None` for anything that doesn't fit the expected shape of a
+    metrics message (deeper nesting, escaped or duplicate member names,
+    missing members, invalid JSON, ...), which is then decoded completely.
+    """
+    start = _PAYLOAD_START.match(payload)
+    if start is None:
+        return None
+
+    pos = start.end()
+    parsed: MutableMapping[bytes, bytes] = {}
+    members: List[bytes] = []
+    seen: Set[bytes] = set()
+    while True:
+        member = _PAYLOAD_MEMBER.match(payload, pos)
+        if member is None:
+            return None
+        key = member.group(1)
+        if key in seen:
+            return None
+        seen.add(key)
+
+        passed_on = _PARSED_MEMBERS.get(key)
+        if passed_on is not None:
+            parsed[key] = member.group(2)
+        if passed_on is not False and key not in _REPLACED_MEMBERS:
+            members.append(payload[member.start(1) - 1 : member.end(2)])
+
+        pos = member.end()
+        if member.group(3) == b"}":
+            break
+
+    if not _PAYLOAD_END.match(payload, pos) or not {b"name", b"org_id", b"type"} <= parsed.keys():
+        return None
+
+    tags = rapidjson.loads(parsed[b"tags"]) if b"tags" in parsed else {}
+    if not isinstance(tags, dict):
+        return None
+
+    return PartialPayload(
+        name=rapidjson.loads(parsed[b"name"]),
+        org_id=rapidjson.loads(parsed[b"org_id"]),
+        type=rapidjson.loads(parsed[b"type"]),
+        tags=tags,
+        members=members,
+    )
+
+
 def valid_metric_name(name: Optional[str]) -> bool:
     if name is None:
         return False
@@ -47,9 +166,26 @@ def invalid_metric_tags(tags: Mapping[str, str]) -> Sequence[str]:
 
 
 class IndexerBatch:
-    def __init__(self, use_case_id: UseCaseKey, outer_message: Message[MessageBatch]) -> None:
+    """
+    The strings of a batch of metrics messages, and the messages rewritten
+    with the ids they were resolved to.
+
+    Payloads are fully decoded with rapidjson and fully encoded again. With
+    `partial_parse`, only the members needed for indexing are decoded, see
+    `parse_partial_payload`, and the ids are spliced into the original
+    bytes. That pays off for distributions and sets with more than about a
+    hundred values, while smaller messages are faster to decode completely.
+    """
+
+    def __init__(
+        self,
+        use_case_id: UseCaseKey,
+        outer_message: Message[MessageBatch],
+        partial_parse: bool = False,
+    ) -> None:
         self.use_case_id = use_case_id
         self.outer_message = outer_message
+        self.partial_parse = partial_parse
 
     @metrics.wraps("process_messages.parse_outer_message")
     def extract_strings(self) -> Tuple[Mapping[int, Set[str]], Set[str]]:
@@ -57,28 +193,41 @@ class IndexerBatch:
         strings = set()
 
         self.skipped_offsets: Set[PartitionIdxOffset] = set()
-        self.parsed_payloads_by_offset: MutableMapping[PartitionIdxOffset, json.JSONData] = {}
+        self.parsed_payloads_by_offset: MutableMapping[
+            PartitionIdxOffset, Union[PartialPayload, json.JSONData]
+        ] = {}
 
         for msg in self.outer_message.payload:
-            partition_offset = PartitionIdxOffset(msg.partition.index, msg.offset)
-            try:
-                parsed_payload = json.loads(msg.payload.value.decode("utf-8"), use_rapid_json=True)
-                self.parsed_payloads_by_offset[partition_offset] = parsed_payload
-            except rapidjson.JSONDecodeError:
-                self.skipped_offsets.add(partition_offset)
-                logger.error(
-                    "process_messages.invalid_json",
-                    extra={"payload_value": str(msg.payload.value)},
-                    exc_info=True,
-                )
-                continue
-
-        for partition_offset, message in self.parsed_payloads_by_offset.items():
-            partition_idx, offset = partition_offset
-            metric_name = message["name"]
-            metric_type = message["type"]
-            org_id = message["org_id"]
-            tags = message.get("tags", {})
+            partition_idx, offset = partition_offset = PartitionIdxOffset(
+                msg.partition.index, msg.offset
+            )
+            message: Union[PartialPayload, json.JSONData, None] = (
+                parse_partial_payload(msg.payload.value) if self.partial_parse else None
+            )
+            if message is not None:
+                metric_name = message.name
+                metric_type = message.type
+                org_id = message.org_id
+                tags = message.tags
+            else:
+                try:
+                    # rapidjson decodes the payload bytes as they are. Going
+                    # through `json.loads` would copy every payload into a str
+                    # and start a span per message.
+                    message = rapidjson.loads(msg.payload.value)
+                except rapidjson.JSONDecodeError:
+                    self.skipped_offsets.add(partition_offset)
+                    logger.error(
+                        "process_messages.invalid_json",
+                        extra={"payload_value": str(msg.payload.value)},
+                        exc_info=True,
+                    )
+                    continue
+
+                metric_name = message["name"]
+                metric_type = message["type"]
+                org_id = message["org_id"]
+                tags = message.get("tags", {})
 
             if not valid_metric_name(metric_name):
                 logger.error(
@@ -119,6 +268,8 @@ class IndexerBatch:
                 self.skipped_offsets.add(partition_offset)
                 continue
 
+            self.parsed_payloads_by_offset[partition_offset] = message
+
             parsed_strings = {
                 metric_name,
                 *tags.keys(),
@@ -153,11 +304,18 @@ class IndexerBatch:
                     extra={"offset": message.offset, "partition": message.partition.index},
                 )
                 continue
-            new_payload_value = self.parsed_payloads_by_offset.pop(partition_offset)
-
-            metric_name = new_payload_value["name"]
-            org_id = new_payload_value["org_id"]
-            tags = new_payload_value.get("tags", {})
+            parsed_payload = self.parsed_payloads_by_offset.pop(partition_offset)
+
+            if isinstance(parsed_payload, PartialPayload):
+                metric_name = parsed_payload.name
+                metric_type = parsed_payload.type
+                org_id = parsed_payload.org_id
+                tags = parsed_payload.tags
+            else:
+                metric_name = parsed_payload["name"]
+                metric_type = parsed_payload["type"]
+                org_id = parsed_payload["org_id"]
+                tags = parsed_payload.get("tags", {})
             used_tags.add(metric_name)
 
             new_tags: MutableMapping[str, int] = {}
@@ -179,21 +337,27 @@ class IndexerBatch:
             mapping_header_content = bytes(
                 "".join([t.value for t in fetch_types_encountered]), "utf-8"
             )
-            new_payload_value["tags"] = new_tags
-            new_payload_value["metric_id"] = mapping[org_id][metric_name]
-            new_payload_value["retention_days"] = 90
-            new_payload_value["mapping_meta"] = output_message_meta
-            new_payload_value["use_case_id"] = self.use_case_id.value
-
-            del new_payload_value["name"]
+            new_members = {
+                "tags": new_tags,
+                "metric_id": mapping[org_id][metric_name],
+                "retention_days": 90,
+                "mapping_meta": output_message_meta,
+                "use_case_id": self.use_case_id.value,
+            }
+            if isinstance(parsed_payload, PartialPayload):
+                new_payload_value = parsed_payload.splice(new_members)
+            else:
+                parsed_payload.update(new_members)
+                del parsed_payload["name"]
+                new_payload_value = rapidjson.dumps(parsed_payload).encode()
 
             new_payload = KafkaPayload(
                 key=message.payload.key,
-                value=rapidjson.dumps(new_payload_value).encode(),
+                value=new_payload_value,
                 headers=[
                     *message.payload.headers,
                     ("mapping_sources", mapping_header_content),
-                    ("metric_type", new_payload_value["type"]),
+                    ("metric_type", metric_type),
                 ],
             )
             new_message = Message(
@@ -7,6 +7,7 @@ from arroyo.backends.kafka import KafkaPayload
 from arroyo.processing.strategies import MessageRejected
 from arroyo.processing.strategies import ProcessingStrategy
 from arroyo.processing.strategies import ProcessingStrategy as ProcessingStep
+from arroyo.processing.strategies.streaming.transform import ValueTooLarge
 from arroyo.types import Message
 from django.conf import settings
 
@@ -51,6 +52,77 @@ class DuplicateMessage(Exception):
     pass
 
 
+class AdaptiveBatchSize:
+    """
+    Tunes the number of messages per batch built by `BatchMessages`, and the
+    sizes of the shared memory blocks used to pass batches to and from the
+    processes of the `ParallelTransformStep`.
+
+    Batches grow while the next step rejects them, which means that the
+    processes can't keep up (their queue is full) and bigger batches are
+    needed to amortize the per-batch cost of indexing. Otherwise batches
+    shrink slowly, which lowers the latency and memory used when traffic is
+    low. The batch size always stays between `min_batch_size` and
+    `max_batch_size`.
+
+    Block sizes are chosen to hold `BLOCK_BATCHES` batches of the largest
+    size with the largest messages seen so far, within the configured
+    block sizes. Blocks are allocated when the strategy is created, so
+    block sizes only change on the next rebalance. A message larger than
+    any seen before can still make a batch overflow its block. Once that
+    happened, the configured block sizes are used again, and `BatchMessages`
+    splits the batches that don't fit until then.
+    """
+
+    GROWTH_FACTOR = 2.0
+    DECAY_FACTOR = 0.95
+    BLOCK_BATCHES = 4
+    # Room for the message envelope and pickling overhead per message
+    MESSAGE_OVERHEAD = 512
+    MIN_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, min_batch_size: int, max_batch_size: int) -> None:
+        assert 0 < min_batch_size <= max_batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = max_batch_size
+        self.largest_message_size = 0
+        self.overflowed = False
+        self.__rejected = False
+        self.__metrics = get_metrics()
+
+    def record_rejected(self) -> None:
+        self.__rejected = True
+
+    def record_overflow(self) -> None:
+        if not self.overflowed:
+            self.__metrics.incr("batch_messages.adaptive.block_overflow")
+        self.overflowed = True
+
+    def record_batch(self, batch: "MetricsBatchBuilder") -> None:
+        self.largest_message_size = max(self.largest_message_size, batch.largest_message_size)
+
+        if self.__rejected:
+            batch_size = self.batch_size * self.GROWTH_FACTOR
+        else:
+            batch_size = self.batch_size * self.DECAY_FACTOR
+        self.batch_size = int(min(max(batch_size, self.min_batch_size), self.max_batch_size))
+        self.__rejected = False
+
+        self.__metrics.gauge("batch_messages.adaptive.batch_size", self.batch_size)
+
+    def get_block_size(self, configured_block_size: int) -> int:
+        if not self.largest_message_size or self.overflowed:
+            return configured_block_size
+
+        block_size = (
+            self.BLOCK_BATCHES
+            * self.max_batch_size
+            * (self.largest_message_size + self.MESSAGE_OVERHEAD)
+        )
+        return min(max(block_size, self.MIN_BLOCK_SIZE), configured_block_size)
+
+
 class MetricsBatchBuilder:
     """
     Batches up individual messages - type: Message[KafkaPayload] - into a
@@ -65,6 +137,7 @@ class MetricsBatchBuilder:
         self.__max_batch_size = max_batch_size
         self.__deadline = time.time() + max_batch_time / 1000.0
         self.__offsets: Set[int] = set()
+        self.largest_message_size = 0
 
     def __len__(self) -> int:
         return len(self.__messages)
@@ -78,6 +151,7 @@ class MetricsBatchBuilder:
             raise DuplicateMessage
         self.__messages.append(message)
         self.__offsets.add(message.offset)
+        self.largest_message_size = max(self.largest_message_size, len(message.payload.value))
 
     def ready(self) -> bool:
         if len(self.messages) >= self.__max_batch_size:
@@ -98,6 +172,10 @@ class BatchMessages(ProcessingStep[KafkaPayload]):  # type: ignore
     Flushing the batch here means wrapping the batch in a Message, the batch
     itself being the payload. This is what the ParallelTransformStep will
     process in the process_message function.
+
+    If `adaptive_batch_size` is passed, it decides the size of the batches
+    instead of `max_batch_size`. Batches that are too large for the shrunk
+    blocks of the next step are then split in halves until they fit.
     """
 
     def __init__(
@@ -105,12 +183,15 @@ class BatchMessages(ProcessingStep[KafkaPayload]):  # type: ignore
         next_step: ProcessingStrategy[MessageBatch],
         max_batch_time: float,
         max_batch_size: int,
+        adaptive_batch_size: Optional[AdaptiveBatchSize] = None,
     ):
         self.__max_batch_size = max_batch_size
         self.__max_batch_time = max_batch_time
+        self.__adaptive_batch_size = adaptive_batch_size
 
         self.__next_step = next_step
         self.__batch: Optional[MetricsBatchBuilder] = None
+        self.__submitted = 0
         self.__closed = False
         self.__batch_start: Optional[float] = None
         self.__metrics = get_metrics()
@@ -132,7 +213,12 @@ class BatchMessages(ProcessingStep[KafkaPayload]):  # type: ignore
     def submit(self, message: Message[KafkaPayload]) -> None:
         if self.__batch is None:
             self.__batch_start = time.time()
-            self.__batch = MetricsBatchBuilder(self.__max_batch_size, self.__max_batch_time)
+            max_batch_size = (
+                self.__adaptive_batch_size.batch_size
+                if self.__adaptive_batch_size is not None
+                else self.__max_batch_size
+            )
+            self.__batch = MetricsBatchBuilder(max_batch_size, self.__max_batch_time)
 
         try:
             self.__batch.append(message)
@@ -151,16 +237,45 @@ class BatchMessages(ProcessingStep[KafkaPayload]):  # type: ignore
     def __flush(self) -> None:
         if not self.__batch:
             return
-        last = self.__batch.messages[-1]
-
-        new_message = Message(last.partition, last.offset, self.__batch.messages, last.timestamp)
         if self.__batch_start is not None:
             elapsed_time = time.time() - self.__batch_start
             self.__metrics.timing("batch_messages.build_time", elapsed_time)
             self.__batch_start = None
 
-        self.__next_step.submit(new_message)
+        # Only the messages that were not submitted yet are submitted again
+        # after a `MessageRejected`.
+        messages = self.__batch.messages
+        try:
+            while self.__submitted < len(messages):
+                self.__submitted += self.__submit(messages[self.__submitted :])
+        except MessageRejected:
+            if self.__adaptive_batch_size is not None:
+                self.__adaptive_batch_size.record_rejected()
+            raise
+
+        if self.__adaptive_batch_size is not None:
+            self.__adaptive_batch_size.record_batch(self.__batch)
         self.__batch = None
+        self.__submitted = 0
+
+    def __submit(self, messages: MessageBatch) -> int:
+        """
+        Submits as many of the messages as fit into a block of the next step
+        and returns how many were submitted.
+        """
+        count = len(messages)
+        while True:
+            last = messages[count - 1]
+            try:
+                self.__next_step.submit(
+                    Message(last.partition, last.offset, messages[:count], last.timestamp)
+                )
+                return count
+            except ValueTooLarge:
+                if self.__adaptive_batch_size is None or count == 1:
+                    raise
+                self.__adaptive_batch_size.record_overflow()
+                count //= 2
 
     def terminate(self) -> None:
         self.__closed = True
@@ -43,12 +43,14 @@ class BatchConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
         commit_max_batch_size: int,
         commit_max_batch_time: int,
         config: MetricsIngestConfiguration,
+        partial_parse: bool = False,
     ):
         self.__max_batch_time = max_batch_time
         self.__max_batch_size = max_batch_size
         self.__commit_max_batch_time = commit_max_batch_time
         self.__commit_max_batch_size = commit_max_batch_size
         self.__config = config
+        self.__partial_parse = partial_parse
 
     def create_with_partitions(
         self,
@@ -64,6 +66,7 @@ class BatchConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
                 output_topic=self.__config.output_topic,
             ),
             config=self.__config,
+            partial_parse=self.__partial_parse,
         )
         strategy = BatchMessages(transform_step, self.__max_batch_time, self.__max_batch_size)
         return strategy
@@ -75,10 +78,13 @@ class TransformStep(ProcessingStep[MessageBatch]):  # type: ignore
     """
 
     def __init__(
-        self, next_step: ProcessingStep[KafkaPayload], config: MetricsIngestConfiguration
+        self,
+        next_step: ProcessingStep[KafkaPayload],
+        config: MetricsIngestConfiguration,
+        partial_parse: bool = False,
     ) -> None:
         self.__process_messages: Callable[[Message[MessageBatch]], MessageBatch] = partial(
-            process_messages, config.use_case_id
+            process_messages, config.use_case_id, partial_parse=partial_parse
         )
         self.__next_step = next_step
         self.__closed = False
@@ -255,6 +261,7 @@ def get_streaming_metrics_consumer(
     auto_offset_reset: str,
     factory_name: str,
     indexer_profile: MetricsIngestConfiguration,
+    partial_parse: bool = False,
     **options: Mapping[str, Union[str, int]],
 ) -> StreamProcessor:
     assert factory_name == "default"
@@ -264,6 +271,7 @@ def get_streaming_metrics_consumer(
         commit_max_batch_size=commit_max_batch_size,
         commit_max_batch_time=commit_max_batch_time,
         config=indexer_profile,
+        partial_parse=partial_parse,
     )
 
     cluster_name: str = settings.KAFKA_TOPICS[indexer_profile.input_topic]["cluster"]
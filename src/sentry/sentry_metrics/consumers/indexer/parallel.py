@@ -12,7 +12,11 @@ from arroyo.types import Partition, Position, Topic
 from django.conf import settings
 
 from sentry.sentry_metrics.configuration import MetricsIngestConfiguration
-from sentry.sentry_metrics.consumers.indexer.common import BatchMessages, get_config
+from sentry.sentry_metrics.consumers.indexer.common import (
+    AdaptiveBatchSize,
+    BatchMessages,
+    get_config,
+)
 from sentry.sentry_metrics.consumers.indexer.multiprocess import SimpleProduceStep
 from sentry.sentry_metrics.consumers.indexer.processing import process_messages
 from sentry.utils.batching_kafka_consumer import create_topics
@@ -32,6 +36,14 @@ def initializer() -> None:
 
 
 class MetricsConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
+    """
+    With `adaptive_batching`, the batch size is tuned between
+    `min_batch_size` and `max_batch_size`, and the configured input block
+    size becomes an upper bound, see `AdaptiveBatchSize`. The output block
+    size is left as configured: a batch of indexed messages that overflows
+    it fails in the worker processes, where it can't be split anymore.
+    """
+
     def __init__(
         self,
         max_batch_size: int,
@@ -42,10 +54,21 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
         commit_max_batch_size: int,
         commit_max_batch_time: float,
         config: MetricsIngestConfiguration,
+        adaptive_batching: bool = False,
+        min_batch_size: int = 1,
+        partial_parse: bool = False,
     ):
         self.__config = config
+        self.__partial_parse = partial_parse
         self.__max_batch_time = max_batch_time
         self.__max_batch_size = max_batch_size
+        # Kept across rebalances, so that new strategies start out with what
+        # was learned about the traffic so far.
+        self.__adaptive_batch_size = (
+            AdaptiveBatchSize(min(min_batch_size, max_batch_size), max_batch_size)
+            if adaptive_batching
+            else None
+        )
 
         self.__processes = processes
 
@@ -60,8 +83,15 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
         commit: Callable[[Mapping[Partition, Position]], None],
         partitions: Mapping[Partition, int],
     ) -> ProcessingStrategy[KafkaPayload]:
+        input_block_size = self.__input_block_size
+        if self.__adaptive_batch_size is not None:
+            input_block_size = self.__adaptive_batch_size.get_block_size(input_block_size)
+            get_metrics().gauge("metrics_consumer.adaptive.input_block_size", input_block_size)
+
         parallel_strategy = ParallelTransformStep(
-            partial(process_messages, self.__config.use_case_id),
+            partial(
+                process_messages, self.__config.use_case_id, partial_parse=self.__partial_parse
+            ),
             SimpleProduceStep(
                 commit_function=commit,
                 commit_max_batch_size=self.__commit_max_batch_size,
@@ -72,12 +102,17 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory):  # type: ignore
             self.__processes,
             max_batch_size=self.__max_batch_size,
             max_batch_time=self.__max_batch_time,
-            input_block_size=self.__input_block_size,
+            input_block_size=input_block_size,
             output_block_size=self.__output_block_size,
             initializer=initializer,
         )
 
-        strategy = BatchMessages(parallel_strategy, self.__max_batch_time, self.__max_batch_size)
+        strategy = BatchMessages(
+            parallel_strategy,
+            self.__max_batch_time,
+            self.__max_batch_size,
+            adaptive_batch_size=self.__adaptive_batch_size,
+        )
 
         return strategy
 
@@ -95,6 +130,9 @@ def get_streaming_metrics_consumer(
     auto_offset_reset: str,
     factory_name: str,
     indexer_profile: MetricsIngestConfiguration,
+    adaptive_batching: bool = False,
+    min_batch_size: int = 1,
+    partial_parse: bool = False,
     **options: Mapping[str, Union[str, int]],
 ) -> StreamProcessor:
     assert factory_name == "multiprocess"
@@ -107,6 +145,9 @@ def get_streaming_metrics_consumer(
         commit_max_batch_size=commit_max_batch_size,
         commit_max_batch_time=commit_max_batch_time,
         config=indexer_profile,
+        adaptive_batching=adaptive_batching,
+        min_batch_size=min_batch_size,
+        partial_parse=partial_parse,
     )
 
     cluster_name: str = settings.KAFKA_TOPICS[indexer_profile.input_topic]["cluster"]
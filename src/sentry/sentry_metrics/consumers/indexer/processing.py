@@ -27,6 +27,7 @@ def get_indexer():  # type: ignore
 def process_messages(
     use_case_id: UseCaseKey,
     outer_message: Message[MessageBatch],
+    partial_parse: bool = False,
 ) -> MessageBatch:
     """
     We have an outer_message Message() whose payload is a batch of Message() objects.
@@ -44,12 +45,13 @@ def process_messages(
         * value
 
     The value of the message is what we need to parse and then translate
-    using the indexer.
+    using the indexer. With `partial_parse`, only the parts of the value that
+    are translated are parsed, see `IndexerBatch`.
     """
     indexer = get_indexer()
     metrics = get_metrics()
 
-    batch = IndexerBatch(use_case_id, outer_message)
+    batch = IndexerBatch(use_case_id, outer_message, partial_parse=partial_parse)
 
     org_strings, strings = batch.extract_strings()
 
@@ -5,15 +5,38 @@ from typing import Mapping, MutableMapping, Optional, Sequence
 from django.conf import settings
 from django.core.cache import caches
 
+from sentry.utils import metrics
+from sentry.utils.cache import LRUCache
 from sentry.utils.hashlib import md5_text
 
 logger = logging.getLogger(__name__)
 
+_CACHE_METRIC = "sentry_metrics.indexer.cache"
+
 
 class StringIndexerCache:
-    def __init__(self, version: int, cache_name: str):
+    """
+    Caches the ids of indexed strings in a shared django cache.
+
+    If ``local_cache_size`` is set, up to that many ids are also kept in an
+    in-process cache for ``local_cache_ttl`` seconds, which is consulted
+    before the shared cache. The set of strings a consumer sees is small and
+    hot, and ids never change once assigned, so most lookups can be served
+    without going over the network.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        cache_name: str,
+        local_cache_size: int = 0,
+        local_cache_ttl: Optional[int] = None,
+    ):
         self.version = version
         self.cache = caches[cache_name]
+        self.local_cache = (
+            LRUCache(max_size=local_cache_size, ttl=local_cache_ttl) if local_cache_size else None
+        )
 
     @property
     def randomized_ttl(self) -> int:
@@ -45,10 +68,29 @@ class StringIndexerCache:
 
         return formatted
 
-    def get(self, key: str, cache_namespace: str) -> int:
-        result: int = self.cache.get(
-            self.make_cache_key(key, cache_namespace), version=self.version
+    def _record_hits(self, tier: str, cache_namespace: str, hits: int, total: int) -> None:
+        metrics.incr(
+            _CACHE_METRIC,
+            tags={"tier": tier, "use_case": cache_namespace, "cache_hit": "true"},
+            amount=hits,
         )
+        metrics.incr(
+            _CACHE_METRIC,
+            tags={"tier": tier, "use_case": cache_namespace, "cache_hit": "false"},
+            amount=total - hits,
+        )
+
+    def get(self, key: str, cache_namespace: str) -> int:
+        if self.local_cache is not None:
+            result: int = self.local_cache.get((cache_namespace, key))
+            self._record_hits("local", cache_namespace, int(result is not None), 1)
+            if result is not None:
+                return result
+
+        result = self.cache.get(self.make_cache_key(key, cache_namespace), version=self.version)
+        self._record_hits("shared", cache_namespace, int(result is not None), 1)
+        if self.local_cache is not None and result is not None:
+            self.local_cache.set((cache_namespace, key), result)
         return result
 
     def set(self, key: str, value: int, cache_namespace: str) -> None:
@@ -58,29 +100,60 @@ class StringIndexerCache:
             timeout=self.randomized_ttl,
             version=self.version,
         )
+        if self.local_cache is not None:
+            self.local_cache.set((cache_namespace, key), value)
 
     def get_many(
         self, keys: Sequence[str], cache_namespace: str
     ) -> MutableMapping[str, Optional[int]]:
+        if self.local_cache is not None:
+            local_results: MutableMapping[str, Optional[int]] = {
+                key: self.local_cache.get((cache_namespace, key)) for key in keys
+            }
+            keys = [key for key, value in local_results.items() if value is None]
+            self._record_hits(
+                "local", cache_namespace, len(local_results) - len(keys), len(local_results)
+            )
+            if not keys:
+                return local_results
+
         cache_keys = {self.make_cache_key(key, cache_namespace): key for key in keys}
         results: Mapping[str, Optional[int]] = self.cache.get_many(
             cache_keys.keys(), version=self.version
         )
-        return self._format_results(keys, results, cache_namespace)
+        self._record_hits("shared", cache_namespace, len(results), len(cache_keys))
+        formatted = self._format_results(keys, results, cache_namespace)
+
+        if self.local_cache is None:
+            return formatted
+
+        for key, value in formatted.items():
+            if value is not None:
+                self.local_cache.set((cache_namespace, key), value)
+        local_results.update(formatted)
+        return local_results
 
     def set_many(self, key_values: Mapping[str, int], cache_namespace: str) -> None:
         cache_key_values = {
             self.make_cache_key(k, cache_namespace): v for k, v in key_values.items()
         }
         self.cache.set_many(cache_key_values, timeout=self.randomized_ttl, version=self.version)
+        if self.local_cache is not None:
+            for key, value in key_values.items():
+                self.local_cache.set((cache_namespace, key), value)
 
     def delete(self, key: str, cache_namespace: str) -> None:
         cache_key = self.make_cache_key(key, cache_namespace)
         self.cache.delete(cache_key, version=self.version)
+        if self.local_cache is not None:
+            self.local_cache.delete((cache_namespace, key))
 
     def delete_many(self, keys: Sequence[str], cache_namespace: str) -> None:
         cache_keys = [self.make_cache_key(key, cache_namespace) for key in keys]
         self.cache.delete_many(cache_keys, version=self.version)
+        if self.local_cache is not None:
+            for key in keys:
+                self.local_cache.delete((cache_namespace, key))
 
 
 # todo: dont hard code 1 as the version
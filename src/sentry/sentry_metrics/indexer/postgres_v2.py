@@ -1,7 +1,9 @@
+from collections import defaultdict
 from functools import reduce
 from operator import or_
-from typing import Any, Mapping, Optional, Set, Type
+from typing import Iterator, List, Mapping, MutableMapping, Optional, Sequence, Set, Type
 
+from django.conf import settings
 from django.db.models import Q
 
 from sentry.sentry_metrics.configuration import DbKey, UseCaseKey, get_ingest_config
@@ -27,21 +29,51 @@ TABLE_MAPPING: Mapping[DbKey, IndexerTable] = {
 }
 
 
+def _chunk_org_strings(
+    org_strings: Mapping[int, Set[str]], chunk_size: int
+) -> Iterator[Mapping[int, Sequence[str]]]:
+    chunk: MutableMapping[int, List[str]] = defaultdict(list)
+    size = 0
+    for organization_id, strings in org_strings.items():
+        for string in strings:
+            chunk[int(organization_id)].append(string)
+            size += 1
+            if size >= chunk_size:
+                yield chunk
+                chunk = defaultdict(list)
+                size = 0
+
+    if chunk:
+        yield chunk
+
+
 class PGStringIndexerV2(StringIndexer):
     """
     Provides integer IDs for metric names, tag keys and tag values
     and the corresponding reverse lookup.
     """
 
-    def _get_db_records(self, use_case_id: UseCaseKey, db_keys: KeyCollection) -> Any:
-        conditions = []
-        for pair in db_keys.as_tuples():
-            organization_id, string = pair
-            conditions.append(Q(organization_id=int(organization_id), string=string))
-
-        query_statement = reduce(or_, conditions)
-
-        return self._table(use_case_id).objects.filter(query_statement)
+    def _get_db_records(
+        self, use_case_id: UseCaseKey, db_keys: KeyCollection
+    ) -> Iterator[BaseIndexer]:
+        """
+        Yields the existing records for `db_keys`, with one query per chunk
+        of up to `SENTRY_METRICS_INDEXER_DB_LOOKUP_CHUNK_SIZE` keys, in which
+        the strings of each organization are matched with `string IN (...)`.
+        """
+        table = self._table(use_case_id)
+        chunks = _chunk_org_strings(
+            db_keys.mapping, settings.SENTRY_METRICS_INDEXER_DB_LOOKUP_CHUNK_SIZE
+        )
+        for chunk in chunks:
+            query_statement = reduce(
+                or_,
+                (
+                    Q(organization_id=organization_id, string__in=strings)
+                    for organization_id, strings in chunk.items()
+                ),
+            )
+            yield from table.objects.filter(query_statement)
 
     def bulk_record(
         self, use_case_id: UseCaseKey, org_strings: Mapping[int, Set[str]]
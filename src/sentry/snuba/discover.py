@@ -148,6 +148,21 @@ def transform_meta(results: EventsResponse, function_alias_map) -> Dict[str, str
     return meta
 
 
+def transform_row(row, translated_columns):
+    transformed = {}
+    for key, value in row.items():
+        if isinstance(value, float):
+            # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
+            # so needed to pick something valid to use instead
+            if math.isnan(value):
+                value = 0
+            elif math.isinf(value):
+                value = None
+        transformed[translated_columns.get(key, key)] = value
+
+    return transformed
+
+
 def transform_data(result, translated_columns, snuba_filter) -> EventsResponse:
     """
     Transform internal names back to the public schema ones.
@@ -160,21 +175,7 @@ def transform_data(result, translated_columns, snuba_filter) -> EventsResponse:
         # Translate back column names that were converted to snuba format
         col["name"] = translated_columns.get(col["name"], col["name"])
 
-    def get_row(row):
-        transformed = {}
-        for key, value in row.items():
-            if isinstance(value, float):
-                # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
-                # so needed to pick something valid to use instead
-                if math.isnan(value):
-                    value = 0
-                elif math.isinf(value):
-                    value = None
-            transformed[translated_columns.get(key, key)] = value
-
-        return transformed
-
-    final_result["data"] = [get_row(row) for row in final_result["data"]]
+    final_result["data"] = [transform_row(row, translated_columns) for row in final_result["data"]]
 
     if snuba_filter and snuba_filter.rollup and snuba_filter.rollup > 0:
         rollup = snuba_filter.rollup
@@ -218,6 +219,7 @@ def query(
     functions_acl=None,
     transform_alias_to_input_format=False,
     sample=None,
+    stream=False,
 ) -> EventsResponse:
     """
     High-level API for doing arbitrary user queries against events.
@@ -249,6 +251,9 @@ def query(
     transform_alias_to_input_format (bool) Whether aggregate columns should be returned in the originally
                                 requested function format.
     sample (float) The sample rate to run the query with
+    stream (bool) Whether rows should be decoded from the response while they are iterated,
+                for results that are too large to decode at once. `data` is an iterator
+                of the rows instead of a list, and `meta` is not included.
     """
     if not selected_columns:
         raise InvalidSearchQuery("No columns selected")
@@ -271,11 +276,15 @@ def query(
     )
     if conditions is not None:
         builder.add_conditions(conditions)
-    result = builder.run_query(referrer)
+    if stream:
+        result = builder.run_query_stream(referrer)
+    else:
+        result = builder.run_query(referrer)
     with sentry_sdk.start_span(
         op="discover.discover", description="query.transform_results"
     ) as span:
-        span.set_data("result_count", len(result.get("data", [])))
+        if not stream:
+            span.set_data("result_count", len(result.get("data", [])))
         translated_columns = {}
         function_alias_map = builder.function_alias_map
         if transform_alias_to_input_format:
@@ -289,12 +298,15 @@ def query(
             }
             for index, equation in enumerate(equations):
                 translated_columns[f"equation[{index}]"] = f"equation|{equation}"
-        result = transform_results(
-            result,
-            function_alias_map,
-            translated_columns,
-            None,
-        )
+        if stream:
+            result = {"data": (transform_row(row, translated_columns) for row in result)}
+        else:
+            result = transform_results(
+                result,
+                function_alias_map,
+                translated_columns,
+                None,
+            )
         result["tips"] = transform_tips(builder.tips)
     return result
 
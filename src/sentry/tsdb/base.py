@@ -95,6 +95,76 @@ class TSDBModel(Enum):
     sentry_app_component_interacted = 801
 
 
+class CounterSeries:
+    """
+    Counter values for a set of keys, in a columnar layout: a single list of
+    (sorted) timestamps shared by all keys, and a row of values per key that
+    is aligned with these timestamps.
+
+    Series are converted from and to the ``{key: [(timestamp, value), ...]}``
+    shape returned by ``get_range`` only at the API boundary. In between,
+    anything that only depends on the timestamps (such as bucketing them for
+    a rollup) is computed once for all keys, and aggregating rows is done
+    with slices rather than per point.
+    """
+
+    __slots__ = ("timestamps", "rows")
+
+    def __init__(self, timestamps, rows):
+        self.timestamps = timestamps
+        self.rows = rows
+
+    @classmethod
+    def from_points(cls, values):
+        """
+        Build series from a mapping of key to ``[(timestamp, value), ...]``.
+        Keys are grouped by their timestamps, so this returns one series for
+        every distinct set of timestamps (usually just one).
+        """
+        series = {}
+        for key, points in values.items():
+            timestamps, row = tuple(zip(*points)) or ((), ())
+            s = series.get(timestamps)
+            if s is None:
+                s = series[timestamps] = cls(list(timestamps), {})
+            s.rows[key] = row
+        return list(series.values())
+
+    def to_points(self):
+        timestamps = self.timestamps
+        return {key: list(zip(timestamps, row)) for key, row in self.rows.items()}
+
+    def sums(self):
+        return {key: sum(row) for key, row in self.rows.items()}
+
+    def rollup(self, rollup, normalize_ts_to_epoch):
+        """
+        Sum consecutive values that fall into the same ``rollup`` interval,
+        returning a mapping of key to ``[[timestamp, value], ...]``.
+        """
+        # (rollup timestamp, index of the first value in the bucket)
+        buckets = []
+        for i, timestamp in enumerate(self.timestamps):
+            rollup_timestamp = normalize_ts_to_epoch(timestamp, rollup)
+            if not buckets or buckets[-1][0] != rollup_timestamp:
+                buckets.append((rollup_timestamp, i))
+
+        bounds = [
+            (rollup_timestamp, start, end)
+            for (rollup_timestamp, start), end in zip(
+                buckets, [start for _, start in buckets[1:]] + [len(self.timestamps)]
+            )
+        ]
+
+        return {
+            key: [
+                [rollup_timestamp, row[start] if end - start == 1 else sum(row[start:end])]
+                for rollup_timestamp, start, end in bounds
+            ]
+            for key, row in self.rows.items()
+        }
+
+
 class BaseTSDB(Service):
     __read_methods__ = frozenset(
         [
@@ -246,13 +316,12 @@ class BaseTSDB(Service):
         # to the requested interval using the requested (or inferred) rollup
         # resolution. This result always includes the ``end`` timestamp, but
         # may not include the ``start`` timestamp.
-        series = []
-        timestamp = end
-        while timestamp >= start:
-            series.append(self.normalize_to_epoch(timestamp, rollup))
-            timestamp = timestamp - timedelta(seconds=rollup)
+        if end < start:
+            return rollup, []
 
-        return rollup, sorted(series)
+        count = (end - start) // timedelta(seconds=rollup) + 1
+        last = self.normalize_to_epoch(end, rollup)
+        return rollup, [last - rollup * i for i in range(count - 1, -1, -1)]
 
     def get_active_series(self, start=None, end=None, timestamp=None):
         rollups = {}
@@ -317,6 +386,10 @@ class BaseTSDB(Service):
 
         >>> incr_multi([(TimeSeriesModel.project, 1, {"timestamp": ...}),
         ...             (TimeSeriesModel.group, 5, {"timestamp": ...})])
+
+        Increment individual environments:
+
+        >>> incr_multi([(TimeSeriesModel.project, 1, {"environment_id": ...})])
         """
         for item in items:
             if len(item) == 2:
@@ -330,7 +403,7 @@ class BaseTSDB(Service):
                 key,
                 timestamp=options.get("timestamp", timestamp),
                 count=options.get("count", count),
-                environment_id=environment_id,
+                environment_id=options.get("environment_id", environment_id),
             )
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
@@ -371,7 +444,8 @@ class BaseTSDB(Service):
         use_cache=False,
         jitter_value=None,
     ):
-        range_set = self.get_range(
+        sum_set = {}
+        for series in self.get_range_series(
             model,
             keys,
             start,
@@ -380,10 +454,20 @@ class BaseTSDB(Service):
             environment_ids=[environment_id] if environment_id is not None else None,
             use_cache=use_cache,
             jitter_value=jitter_value,
-        )
-        sum_set = {key: sum(p for _, p in points) for (key, points) in range_set.items()}
+        ):
+            sum_set.update(series.sums())
         return sum_set
 
+    def get_range_series(self, model, keys, start, end, rollup=None, **kwargs):
+        """
+        Like ``get_range``, but returns a list of ``CounterSeries``.
+
+        Backends that can build the columnar layout directly should override
+        this (and implement ``get_range`` on top of it), the default converts
+        the result of ``get_range``.
+        """
+        return CounterSeries.from_points(self.get_range(model, keys, start, end, rollup, **kwargs))
+
     def _add_jitter_to_series(self, series, start, rollup, jitter_value):
         if jitter_value and series:
             jitter = jitter_value % rollup
@@ -397,19 +481,10 @@ class BaseTSDB(Service):
         Given a set of values (as returned from ``get_range``), roll them up
         using the ``rollup`` time (in seconds).
         """
-        normalize_ts_to_epoch = self.normalize_ts_to_epoch
         result = {}
-        for key, points in values.items():
-            result[key] = []
-            last_new_ts = None
-            for (ts, count) in points:
-                new_ts = normalize_ts_to_epoch(ts, rollup)
-                if new_ts == last_new_ts:
-                    result[key][-1][1] += count
-                else:
-                    result[key].append([new_ts, count])
-                    last_new_ts = new_ts
-        return result
+        for series in CounterSeries.from_points(values):
+            result.update(series.rollup(rollup, self.normalize_ts_to_epoch))
+        return {key: result[key] for key in values}
 
     def record(self, model, key, values, timestamp=None, environment_id=None):
         """
@@ -420,9 +495,25 @@ class BaseTSDB(Service):
     def record_multi(self, items, timestamp=None, environment_id=None):
         """
         Record occurrence of items in multiple distinct counters.
+
+        Items are ``(model, key, values)`` tuples, optionally followed by a
+        dictionary that overrides the ``timestamp`` or ``environment_id`` for
+        that item.
         """
-        for model, key, values in items:
-            self.record(model, key, values, timestamp, environment_id=environment_id)
+        for item in items:
+            if len(item) == 3:
+                model, key, values = item
+                options = {}
+            else:
+                model, key, values, options = item
+
+            self.record(
+                model,
+                key,
+                values,
+                options.get("timestamp", timestamp),
+                environment_id=options.get("environment_id", environment_id),
+            )
 
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
@@ -11,7 +11,7 @@ from django.utils import timezone
 from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
-from sentry.tsdb.base import BaseTSDB
+from sentry.tsdb.base import BaseTSDB, CounterSeries
 from sentry.utils.compat import crc32
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
@@ -24,6 +24,8 @@ T = TypeVar("T")
 SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/cmsketch.lua"))
+IncrScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/incr.lua"))
+RecordScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/record.lua"))
 
 
 class SuppressionWrapper:
@@ -209,58 +211,99 @@ class RedisTSDB(BaseTSDB):
 
         >>> incr_multi([(TimeSeriesModel.project, 1), (TimeSeriesModel.group, 5)])
 
-        Increment individual timestamps:
+        Increment individual timestamps or environments:
 
         >>> incr_multi([(TimeSeriesModel.project, 1, {"timestamp": ...}),
-        ...             (TimeSeriesModel.group, 5, {"timestamp": ...})])
+        ...             (TimeSeriesModel.group, 5, {"environment_id": ...})])
+
+        All increments are applied with a single script invocation per host.
         """
 
         default_timestamp = timestamp
         default_count = count
-
-        self.validate_arguments([item[0] for item in items], [environment_id])
+        default_environment_id = environment_id
 
         if default_timestamp is None:
             default_timestamp = timezone.now()
 
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+        operations = []
+        for item in items:
+            if len(item) == 2:
+                model, key = item
+                options = {}
+            else:
+                model, key, options = item
 
-            with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
+            operations.append(
+                (
+                    model,
+                    key,
+                    options.get("count", default_count),
+                    options.get("timestamp", default_timestamp),
+                    options.get("environment_id", default_environment_id),
+                )
+            )
 
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
+        self.validate_arguments(
+            [operation[0] for operation in operations],
+            [operation[4] for operation in operations],
+        )
 
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+        environment_ids = {None} | {operation[4] for operation in operations}
+        for (cluster, durable), environment_ids in self.get_cluster_groups(environment_ids):
+            environment_ids = set(environment_ids)
 
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
+            # hash_key -> hash_field -> count
+            key_operations = defaultdict(lambda: defaultdict(int))
+            # hash_key -> "max expiration encountered"
+            key_expiries = defaultdict(int)
 
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
+            for rollup, max_values in self.rollups.items():
+                for model, key, count, timestamp, environment_id in operations:
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
 
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
+                    for e in {None, environment_id} & environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, e
+                        )
 
-                            key_operations[(hash_key, hash_field)] += count
+                        if key_expiries[hash_key] < expiry:
+                            key_expiries[hash_key] = expiry
 
-                for (hash_key, hash_field), count in key_operations.items():
-                    client.hincrby(hash_key, hash_field, count)
-                    if key_expiries.get(hash_key):
-                        client.expireat(hash_key, key_expiries.pop(hash_key))
+                        key_operations[hash_key][hash_field] += count
+
+            arguments = {}
+            for hash_key, fields in key_operations.items():
+                args = arguments[hash_key] = [key_expiries[hash_key], len(fields)]
+                for hash_field, count in fields.items():
+                    args.extend((hash_field, count))
+
+            self.execute_per_host(cluster, durable, IncrScript, arguments)
+
+    def execute_per_host(self, cluster, durable, script, arguments):
+        """
+        Run ``script`` once for every host of the cluster, with all keys of
+        ``arguments`` (a mapping of key to the script arguments for that key)
+        that are located on the host.
+        """
+        router = cluster.get_router()
+
+        keys_by_host = defaultdict(list)
+        for key in arguments:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        commands = {}
+        for keys in keys_by_host.values():
+            # Any key located on the host can be used to route the command.
+            commands[keys[0]] = [
+                (script, keys, list(itertools.chain.from_iterable(arguments[k] for k in keys)))
+            ]
+
+        try:
+            cluster.execute_commands(commands)
+        except Exception:
+            if durable:
+                raise
 
     def get_range(
         self,
@@ -281,6 +324,24 @@ class RedisTSDB(BaseTSDB):
         >>>          start=now - timedelta(days=1),
         >>>          end=now)
         """
+        result = {}
+        for series in self.get_range_series(
+            model, keys, start, end, rollup, environment_ids, use_cache, jitter_value
+        ):
+            result.update(series.to_points())
+        return result
+
+    def get_range_series(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
         # redis backend doesn't support multiple envs
         if environment_ids is not None and len(environment_ids) > 1:
             raise NotImplementedError
@@ -291,25 +352,23 @@ class RedisTSDB(BaseTSDB):
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = [to_datetime(item) for item in series]
 
-        results = []
+        rows = {}
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
             for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
+                rows[key] = [
+                    client.hget(
+                        *self.make_counter_key(model, rollup, timestamp, key, environment_id)
                     )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
-
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+                    for timestamp in series
+                ]
 
-        for key, points in results_by_key.items():
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        return [
+            CounterSeries(
+                [to_timestamp(timestamp) for timestamp in series],
+                {key: [int(count.value or 0) for count in row] for key, row in rows.items()},
+            )
+        ]
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -393,27 +452,61 @@ class RedisTSDB(BaseTSDB):
     def record_multi(self, items, timestamp=None, environment_id=None):
         """
         Record an occurrence of an item in a distinct counter.
+
+        Items are ``(model, key, values)`` tuples, optionally followed by a
+        dictionary that overrides the ``timestamp`` or ``environment_id`` for
+        that item. All items are recorded with a single script invocation per
+        host.
         """
-        self.validate_arguments([model for model, key, values in items], [environment_id])
+        default_timestamp = timestamp
+        default_environment_id = environment_id
 
-        if timestamp is None:
-            timestamp = timezone.now()
+        if default_timestamp is None:
+            default_timestamp = timezone.now()
 
-        ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
+        operations = []
+        for item in items:
+            if len(item) == 3:
+                model, key, values = item
+                options = {}
+            else:
+                model, key, values, options = item
 
-        for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.fanout()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+            operations.append(
+                (
+                    model,
+                    key,
+                    values,
+                    options.get("timestamp", default_timestamp),
+                    options.get("environment_id", default_environment_id),
+                )
+            )
 
-            with manager as client:
-                for model, key, values in items:
-                    c = client.target_key(key)
-                    for rollup, max_values in self.rollups.items():
-                        for environment_id in environment_ids:
-                            k = self.make_key(model, rollup, ts, key, environment_id)
-                            c.pfadd(k, *values)
-                            c.expireat(k, self.calculate_expiry(rollup, max_values, timestamp))
+        self.validate_arguments(
+            [operation[0] for operation in operations],
+            [operation[4] for operation in operations],
+        )
+
+        environment_ids = {None} | {operation[4] for operation in operations}
+        for (cluster, durable), environment_ids in self.get_cluster_groups(environment_ids):
+            environment_ids = set(environment_ids)
+
+            # key -> [max expiration encountered, members...]
+            arguments = {}
+            for model, key, values, timestamp, environment_id in operations:
+                ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
+                for rollup, max_values in self.rollups.items():
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+                    for e in {None, environment_id} & environment_ids:
+                        k = self.make_key(model, rollup, ts, key, e)
+                        args = arguments.setdefault(k, [0])
+                        args[0] = max(args[0], expiry)
+                        args.extend(values)
+
+            for args in arguments.values():
+                args.insert(1, len(args) - 1)
+
+            self.execute_per_host(cluster, durable, RecordScript, arguments)
 
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
@@ -1,14 +1,27 @@
+import functools
 import itertools
 from collections import namedtuple
 from collections.abc import Mapping, Sequence, Set
 from copy import deepcopy
+from hashlib import sha1
+from time import time
 
+from django.core.cache import cache
+
+from sentry import options
 from sentry.constants import DataCategory
 from sentry.ingest.inbound_filters import FILTER_STAT_KEYS_TO_VALUES
 from sentry.tsdb.base import BaseTSDB, TSDBModel
-from sentry.utils import outcomes, snuba
+from sentry.utils import json, metrics, outcomes, snuba
 from sentry.utils.dates import to_datetime
 
+# Completed buckets of time series are cached for this long, see
+# `SnubaTSDB.get_data_with_bucket_cache`. This bounds how stale they can be.
+BUCKET_CACHE_TTL = 10 * 60
+# Buckets are only considered completed once they ended this long ago, so that
+# events that are still being ingested for them are counted.
+BUCKET_CACHE_SETTLE_DELAY = 5 * 60
+
 SnubaModelQuerySettings = namedtuple(
     # `dataset` - the dataset in Snuba that we want to query
     # `groupby` - the column in Snuba that we want to put in the group by statement
@@ -245,7 +258,9 @@ class SnubaTSDB(BaseTSDB):
         end = to_datetime(series[-1] + rollup)
         limit = min(10000, int(len(keys) * ((end - start).total_seconds() / rollup)))
 
-        conditions = conditions if conditions is not None else []
+        # Don't extend the conditions of the caller in place, they may be
+        # shared with concurrent queries.
+        conditions = list(conditions) if conditions is not None else []
         if model_query_settings.conditions is not None:
             conditions += deepcopy(model_query_settings.conditions)
             # copy because we modify the conditions in snuba.query
@@ -257,7 +272,33 @@ class SnubaTSDB(BaseTSDB):
         if group_on_model and model_group is not None:
             orderby.append(model_group)
 
-        if keys:
+        if keys and groupby == [model_group, "time"] and options.get("snuba.tsdb.bucket-cache"):
+            shape = [
+                model.value,
+                model_dataset.value,
+                aggregations,
+                conditions,
+                keys_map.get("environment"),
+                rollup,
+                series[0] % rollup,
+            ]
+            query = functools.partial(
+                snuba.query,
+                dataset=model_dataset,
+                groupby=groupby,
+                conditions=conditions,
+                filter_keys=keys_map,
+                aggregations=aggregations,
+                rollup=rollup,
+                orderby=orderby,
+                referrer=f"tsdb-modelid:{model.value}",
+                is_grouprelease=(model == TSDBModel.frequent_releases_by_group),
+                use_cache=use_cache,
+            )
+            result = self.get_data_with_bucket_cache(
+                query, shape, keys_map[model_group], series, rollup
+            )
+        elif keys:
             result = snuba.query(
                 dataset=model_dataset,
                 start=start,
@@ -284,6 +325,100 @@ class SnubaTSDB(BaseTSDB):
 
         return result
 
+    def get_data_with_bucket_cache(self, query, shape, keys, series, rollup):
+        """
+        Runs a query grouped by key and time, reusing completed buckets of
+        previous queries of the same `shape`.
+
+        Buckets are cached per key. Only buckets that ended at least
+        `BUCKET_CACHE_SETTLE_DELAY` seconds ago and start within the event
+        retention are cached, buckets that ended before the retention are
+        empty. Snuba is queried from the first bucket that is missing from the
+        cache for any key (which always includes the buckets that are still
+        being filled) up to the end of the series, and the result is merged
+        with the cached buckets before it.
+
+        Cached buckets are not invalidated when they change afterwards, i.e.
+        when events arrive late or are merged, unmerged, deleted or
+        reprocessed. Instead every bucket is only used for
+        `BUCKET_CACHE_TTL` seconds after it was queried, so results can be
+        that stale.
+        """
+        try:
+            shape_hash = sha1(json.dumps(shape, sort_keys=True).encode("utf-8")).hexdigest()
+        except TypeError:
+            return query(
+                start=to_datetime(series[0]),
+                end=to_datetime(series[-1] + rollup),
+                limit=min(10000, len(keys) * len(series)),
+            )
+
+        now = time()
+        retention = options.get("system.event-retention-days")
+        retention_start = now - retention * 24 * 60 * 60 if retention else 0
+        settled_end = now - BUCKET_CACHE_SETTLE_DELAY
+        stale_before = now - BUCKET_CACHE_TTL
+
+        def is_expired(bucket):
+            return bucket + rollup <= retention_start
+
+        def is_cacheable(bucket):
+            return bucket >= retention_start and bucket + rollup <= settled_end
+
+        cache_keys = {key: f"tsdb-bucket-cache:{shape_hash}:{key}" for key in keys}
+        cached = cache.get_many(list(cache_keys.values()))
+        # Buckets are stored as (value, time cached), so that rewriting the
+        # entry for newer buckets doesn't extend the lifetime of older ones.
+        cached_buckets = {
+            key: {
+                bucket: (value, cached_at)
+                for bucket, (value, cached_at) in (cached.get(cache_key) or {}).items()
+                if cached_at > stale_before and bucket >= retention_start
+            }
+            for key, cache_key in cache_keys.items()
+        }
+
+        cached_series = list(
+            itertools.takewhile(
+                lambda bucket: is_expired(bucket)
+                or (
+                    is_cacheable(bucket)
+                    and all(bucket in buckets for buckets in cached_buckets.values())
+                ),
+                series,
+            )
+        )
+        query_series = series[len(cached_series) :]
+        metrics.incr("tsdb.snuba.bucket_cache.hit", amount=len(cached_series))
+        metrics.incr("tsdb.snuba.bucket_cache.miss", amount=len(query_series))
+
+        if query_series:
+            result = query(
+                start=to_datetime(query_series[0]),
+                end=to_datetime(query_series[-1] + rollup),
+                limit=min(10000, len(keys) * len(query_series)),
+            )
+        else:
+            result = {}
+
+        to_cache = {}
+        for key in keys:
+            buckets = result.setdefault(key, {})
+            for bucket in cached_series:
+                buckets[bucket] = 0 if is_expired(bucket) else cached_buckets[key][bucket][0]
+
+            new_buckets = [bucket for bucket in query_series if is_cacheable(bucket)]
+            if new_buckets:
+                to_cache[cache_keys[key]] = {
+                    **cached_buckets[key],
+                    **{bucket: (buckets.get(bucket, 0), now) for bucket in new_buckets},
+                }
+
+        if to_cache:
+            cache.set_many(to_cache, BUCKET_CACHE_TTL)
+
+        return result
+
     def zerofill(self, result, groups, flat_keys):
         """
         Fills in missing keys in the nested result with zeroes.
@@ -1,3 +1,7 @@
+import threading
+import time
+from collections import OrderedDict
+
 from django.core.cache import cache
 
 default_cache = cache
@@ -35,3 +39,101 @@ class memoize:
 
 def cache_key_for_event(data) -> str:
     return "e:{1}:{0}".format(data["project"], data["event_id"])
+
+
+class LRUCache:
+    """
+    A thread-safe, in-process least recently used cache, bounded by the total
+    size of its values. Values expire after ``ttl`` seconds.
+
+    The size of a value is provided when setting it, or computed with
+    ``sizeof`` (every value counts as 1 by default, bounding the number of
+    values instead.) If values may be mutated by callers, pass a ``copy``
+    function that is applied to values going in and out of the cache.
+
+    >>> cache = LRUCache(max_size=1024 * 1024, ttl=60, sizeof=len)
+    >>> cache.set("key", b"value")
+    >>> cache.get("key")
+    b'value'
+    """
+
+    def __init__(self, max_size, ttl=None, sizeof=None, copy=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 1)
+        self.copy = copy or (lambda value: value)
+
+        self.__lock = threading.Lock()
+        self.__items = OrderedDict()
+        self.__size = 0
+
+    def __len__(self):
+        return len(self.__items)
+
+    @property
+    def size(self):
+        return self.__size
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                value, size, expires_at = self.__items[key]
+            except KeyError:
+                return default
+
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.__items[key]
+                self.__size -= size
+                return default
+
+            self.__items.move_to_end(key)
+
+        return self.copy(value)
+
+    def get_many(self, keys):
+        rv = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                rv[key] = value
+        return rv
+
+    def set(self, key, value, size=None):
+        if size is None:
+            size = self.sizeof(value)
+        if size > self.max_size:
+            self.delete(key)
+            return
+
+        value = self.copy(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.__lock:
+            previous = self.__items.pop(key, None)
+            if previous is not None:
+                self.__size -= previous[1]
+            self.__items[key] = (value, size, expires_at)
+            self.__size += size
+
+            while self.__size > self.max_size:
+                _, (_, evicted_size, _) = self.__items.popitem(last=False)
+                self.__size -= evicted_size
+
+    def set_many(self, items):
+        for key, value in items.items():
+            self.set(key, value)
+
+    def delete(self, key):
+        with self.__lock:
+            previous = self.__items.pop(key, None)
+            if previous is not None:
+                self.__size -= previous[1]
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__items.clear()
+            self.__size = 0
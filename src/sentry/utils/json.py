@@ -8,7 +8,7 @@ import datetime
 import decimal
 import uuid
 from enum import Enum
-from typing import Any
+from typing import Any, Tuple
 
 import rapidjson
 import sentry_sdk
@@ -114,6 +114,15 @@ def loads(value: str, use_rapid_json: bool = False, **kwargs) -> JSONData:
             return _default_decoder.decode(value)
 
 
+def raw_decode(value: str, idx: int = 0) -> Tuple[JSONData, int]:
+    """
+    Decodes the JSON document starting at ``idx`` (after any whitespace) and
+    returns it along with the index at which it ends. Unlike ``loads`` there
+    may be anything following the document.
+    """
+    return _default_decoder.raw_decode(value, idx)
+
+
 def dumps_htmlsafe(value):
     return mark_safe(_default_escaped_encoder.encode(value))
 
@@ -3,11 +3,12 @@ import logging
 import struct
 from datetime import timedelta
 from threading import Lock
-from typing import Any, Iterator, Mapping, Optional, Sequence, Tuple, cast
+from typing import Any, Iterator, List, Mapping, NoReturn, Optional, Sequence, Tuple, cast
 
 from django.utils import timezone
 from google.api_core import exceptions, retry
 from google.cloud import bigtable
+from google.cloud.bigtable.row import DirectRow
 from google.cloud.bigtable.row_data import PartialRowData
 from google.cloud.bigtable.row_set import RowSet
 from google.cloud.bigtable.table import Table
@@ -22,6 +23,16 @@ class BigtableError(Exception):
     pass
 
 
+def _raise_errors(errors: List[BigtableError]) -> NoReturn:
+    """
+    Raises the first of the errors of a bulk mutation, with the other errors
+    chained to it as causes.
+    """
+    for error, cause in zip(errors, errors[1:]):
+        error.__cause__ = cause
+    raise errors[0]
+
+
 class BigtableKVStorage(KVStorage[str, bytes]):
     column_family = "x"
 
@@ -170,9 +181,31 @@ class BigtableKVStorage(KVStorage[str, bytes]):
         return value
 
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None) -> None:
+        row = self.__build_row(self._get_table(), key, value, ttl)
+
+        status = row.commit()
+        if status.code != 0:
+            raise BigtableError(status.code, status.message)
+
+    def set_many(self, items: Mapping[str, bytes], ttl: Optional[timedelta] = None) -> None:
+        table = self._get_table()
+
+        rows = [self.__build_row(table, key, value, ttl) for key, value in items.items()]
+
+        errors: List[BigtableError] = []
+        for status in table.mutate_rows(rows):
+            if status.code != 0:
+                errors.append(BigtableError(status.code, status.message))
+
+        if errors:
+            _raise_errors(errors)
+
+    def __build_row(
+        self, table: Table, key: str, value: bytes, ttl: Optional[timedelta]
+    ) -> DirectRow:
         # XXX: There is a type mismatch here -- ``direct_row`` expects
         # ``bytes`` but we are providing it with ``str``.
-        row = self._get_table().direct_row(key)
+        row = table.direct_row(key)
 
         # Call to delete is just a state mutation, and in this case is just
         # used to clear all columns so the entire row will be replaced.
@@ -230,9 +263,7 @@ class BigtableKVStorage(KVStorage[str, bytes]):
 
         row.set_cell(self.column_family, self.data_column, value, timestamp=ts)
 
-        status = row.commit()
-        if status.code != 0:
-            raise BigtableError(status.code, status.message)
+        return row
 
     def delete(self, key: str) -> None:
         # XXX: There is a type mismatch here -- ``direct_row`` expects
@@ -255,13 +286,13 @@ class BigtableKVStorage(KVStorage[str, bytes]):
             row.delete()
             rows.append(row)
 
-        errors = []
+        errors: List[BigtableError] = []
         for status in table.mutate_rows(rows):
             if status.code != 0:
                 errors.append(BigtableError(status.code, status.message))
 
         if errors:
-            raise BigtableError(errors)
+            _raise_errors(errors)
 
     def bootstrap(self, automatic_expiry: bool = True) -> None:
         table = self._get_table(admin=True)
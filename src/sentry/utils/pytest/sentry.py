@@ -129,6 +129,12 @@ def pytest_configure(config):
         "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
         "nodedata": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
     }
+    # The in-process tier of the indexer cache would outlive the cache
+    # clearing between tests.
+    settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS = {
+        **settings.SENTRY_STRING_INDEXER_CACHE_OPTIONS,
+        "local_cache_size": 0,
+    }
 
     settings.SENTRY_RATELIMITER = "sentry.ratelimits.redis.RedisRateLimiter"
     settings.SENTRY_RATELIMITER_OPTIONS = {}
@@ -1,16 +1,33 @@
+import codecs
 import functools
 import logging
 import os
 import random
 import re
+import threading
 import time
-from collections import OrderedDict, namedtuple
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from hashlib import sha1
-from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    MutableSet,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 import pytz
@@ -23,6 +40,7 @@ from sentry_sdk import Hub
 from snuba_sdk import Request
 from snuba_sdk.legacy import json_to_snql
 
+from sentry import options
 from sentry.models import (
     Environment,
     Group,
@@ -36,7 +54,7 @@ from sentry.models import (
 from sentry.net.http import connection_from_url
 from sentry.snuba.dataset import Dataset
 from sentry.snuba.events import Columns
-from sentry.utils import json, metrics
+from sentry.utils import json, metrics, redis
 from sentry.utils.dates import outside_retention_with_modified_start, to_timestamp
 
 logger = logging.getLogger(__name__)
@@ -710,6 +728,38 @@ def bulk_snql_query(
     return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
 
 
+def raw_snql_query_stream(
+    request: Request,
+    referrer: Optional[str] = None,
+) -> "SnubaStreamingResult":
+    """
+    Like `raw_snql_query`, but for results that are too large to decode at
+    once: the rows are decoded from the response while the returned result
+    is iterated (see `SnubaStreamingResult`). The query cache is not used.
+
+    Errors of the query are raised right away. The result should be closed
+    if not all of its rows are iterated.
+    """
+    metrics.incr("snql.sdk.api", tags={"referrer": referrer or "unknown"})
+    headers = {"referer": referrer} if referrer else {}
+    with sentry_sdk.start_span(op="snuba_query", description=referrer or "<unknown>") as span:
+        span.set_tag("query.referrer", referrer or "<unknown>")
+        span.set_tag("snuba.stream", True)
+        try:
+            response = _raw_snql_query(request, Hub(Hub.current), headers, preload_content=False)
+        except urllib3.exceptions.HTTPError as err:
+            raise SnubaError(err)
+
+    if response.status != 200:
+        try:
+            _parse_response_body(response, headers)
+        finally:
+            response.release_conn()
+        raise SnubaError(f"HTTP {response.status}")
+
+    return SnubaStreamingResult(response, lambda x: x)
+
+
 def get_cache_key(query: SnubaQuery) -> str:
     if isinstance(query, Request):
         hashable = str(query)
@@ -729,11 +779,269 @@ def bulk_raw_query(
     return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
 
 
+StaleWhileRevalidateTTLs = Tuple[int, int]
+
+_cache_refresh_pool = ThreadPoolExecutor(max_workers=4)
+_refreshing_lock = threading.Lock()
+_refreshing: MutableSet[str] = set()
+
+
+def _get_stale_while_revalidate_ttls(referrer: Optional[str]) -> Optional[StaleWhileRevalidateTTLs]:
+    """
+    Returns the soft and hard TTL of cached results for the referrer, if
+    stale results may be served for it (see `_apply_cache_and_build_results`).
+    """
+    if not referrer:
+        return None
+    config = options.get("snuba.cache.stale-while-revalidate").get(referrer)
+    if not config:
+        return None
+    return config["soft_ttl"], config["hard_ttl"]
+
+
+def _set_cached_result(
+    cache_key: str, result: Mapping[str, Any], swr_ttls: Optional[StaleWhileRevalidateTTLs]
+) -> None:
+    if swr_ttls is None:
+        cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+    else:
+        cache.set(cache_key, json.dumps({"cached_at": time.time(), "result": result}), swr_ttls[1])
+
+
+def _load_cached_result(
+    cached_result: str, swr_ttls: Optional[StaleWhileRevalidateTTLs]
+) -> Tuple[Mapping[str, Any], bool]:
+    """
+    Decodes a cached result. Returns the result and whether it is stale.
+    """
+    if swr_ttls is None:
+        return json.loads(cached_result), False
+    cached = json.loads(cached_result)
+    return cached["result"], time.time() - cached["cached_at"] >= swr_ttls[0]
+
+
+def _refresh_cached_result(
+    hub: Hub,
+    query_params: SnubaQueryBody,
+    cache_key: str,
+    headers: Mapping[str, str],
+    swr_ttls: StaleWhileRevalidateTTLs,
+) -> None:
+    with hub:
+        try:
+            result = _bulk_snuba_query([query_params], headers)[0]
+            _set_cached_result(cache_key, result, swr_ttls)
+        except Exception:
+            logger.warning("snuba.query_cache.refresh_failed", exc_info=True)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
+
+
+def _schedule_refresh(
+    query_params: SnubaQueryBody,
+    cache_key: str,
+    headers: Mapping[str, str],
+    swr_ttls: StaleWhileRevalidateTTLs,
+) -> None:
+    """
+    Refresh a stale cached result in the background. Refreshes are skipped
+    while the same result is being refreshed by this or (for up to the soft
+    TTL) another process.
+    """
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    if not cache.add(f"{cache_key}:refresh", 1, swr_ttls[0]):
+        with _refreshing_lock:
+            _refreshing.discard(cache_key)
+        return
+
+    metrics.incr("snuba.query_cache.refresh", tags={"referrer": headers.get("referer", "unknown")})
+    _cache_refresh_pool.submit(
+        _refresh_cached_result, Hub(Hub.current), query_params, cache_key, headers, swr_ttls
+    )
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions of the same cached query within the
+    process. The first caller of `join` for a cache key becomes the leader and
+    has to `resolve` (or `reject`) the key once it has a result, later callers
+    get the leader's future to wait on.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__futures: Dict[str, Future] = {}
+
+    def join(self, key: str) -> Tuple[bool, Future]:
+        with self.__lock:
+            future = self.__futures.get(key)
+            if future is not None:
+                return False, future
+            future = self.__futures[key] = Future()
+            return True, future
+
+    def resolve(self, key: str, result: Any) -> None:
+        with self.__lock:
+            future = self.__futures.pop(key)
+        future.set_result(result)
+
+    def reject(self, key: str, error: BaseException) -> None:
+        with self.__lock:
+            future = self.__futures.pop(key)
+        future.set_exception(error)
+
+
+_single_flight = SingleFlight()
+
+#: How often followers of a query that is executed by another process check
+#: the cache for its result.
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+
+def _wait_for_cached_results(
+    cache_keys: Sequence[str], timeout: float, swr_ttls: Optional[StaleWhileRevalidateTTLs]
+) -> Mapping[str, Mapping[str, Any]]:
+    """
+    Poll the cache until the results of queries executed by other processes
+    are available or `timeout` seconds have passed. Returns the results that
+    became available.
+    """
+    results = {}
+    pending = list(cache_keys)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        for cache_key, cached_result in cache.get_many(pending).items():
+            if cached_result is not None:
+                results[cache_key] = _load_cached_result(cached_result, swr_ttls)[0]
+        pending = [cache_key for cache_key in pending if cache_key not in results]
+    return results
+
+
+def _acquire_lease(cache_key: str, timeout: int) -> bool:
+    """
+    Take the Redis lease for executing the query with the given cache key.
+    If Redis is unavailable the query is executed without a lease.
+    """
+    try:
+        client = redis.redis_clusters.get("default")
+        return bool(client.set(f"{cache_key}:lease", 1, ex=timeout, nx=True))
+    except Exception:
+        logger.warning("snuba.single_flight.lease_failed", exc_info=True)
+        return True
+
+
+def _release_lease(cache_key: str) -> None:
+    try:
+        redis.redis_clusters.get("default").delete(f"{cache_key}:lease")
+    except Exception:
+        logger.warning("snuba.single_flight.lease_failed", exc_info=True)
+
+
+def _single_flight_query(
+    to_query: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+    referrer: Optional[str],
+    mode: str,
+    swr_ttls: Optional[StaleWhileRevalidateTTLs] = None,
+) -> Sequence[Tuple[int, Mapping[str, Any]]]:
+    """
+    Execute the cache misses in `to_query`, sharing results with concurrent
+    identical queries. With `mode="local"` queries are coalesced within the
+    process. With `mode="redis"` the leader additionally takes a lease on the
+    query in Redis, and the leaders of other processes wait for its result to
+    show up in the cache instead of executing the query themselves.
+
+    Followers that time out waiting execute the query on their own.
+    """
+    timeout = settings.SENTRY_SNUBA_TIMEOUT
+    metric_tags = {"referrer": referrer or "unknown"}
+
+    leaders = []
+    followers = []
+    for query_pos, query_params, cache_key in to_query:
+        is_leader, future = _single_flight.join(cache_key)
+        if is_leader:
+            leaders.append((query_pos, query_params, cache_key))
+        else:
+            followers.append((query_pos, query_params, cache_key, future))
+
+    leases = []
+    results_by_key: Dict[str, Mapping[str, Any]] = {}
+    try:
+        to_execute = []
+        remote_followers = []
+        for query_pos, query_params, cache_key in leaders:
+            if mode != "redis":
+                to_execute.append((query_pos, query_params, cache_key))
+            elif _acquire_lease(cache_key, timeout):
+                leases.append(cache_key)
+                to_execute.append((query_pos, query_params, cache_key))
+            else:
+                remote_followers.append((query_pos, query_params, cache_key))
+
+        if remote_followers:
+            results_by_key.update(
+                _wait_for_cached_results(
+                    [cache_key for _, _, cache_key in remote_followers], timeout, swr_ttls
+                )
+            )
+            for query_pos, query_params, cache_key in remote_followers:
+                if cache_key in results_by_key:
+                    metrics.incr("snuba.single_flight.coalesced_remote", tags=metric_tags)
+                else:
+                    metrics.incr("snuba.single_flight.timeout", tags=metric_tags)
+                    to_execute.append((query_pos, query_params, cache_key))
+
+        if to_execute:
+            metrics.incr("snuba.single_flight.executed", amount=len(to_execute), tags=metric_tags)
+            query_results = _bulk_snuba_query([item[1] for item in to_execute], headers)
+            for result, (_, _, cache_key) in zip(query_results, to_execute):
+                _set_cached_result(cache_key, result, swr_ttls)
+                results_by_key[cache_key] = result
+    except BaseException as error:
+        for _, _, cache_key in leaders:
+            _single_flight.reject(cache_key, error)
+        raise
+    else:
+        for _, _, cache_key in leaders:
+            _single_flight.resolve(cache_key, results_by_key[cache_key])
+    finally:
+        for cache_key in leases:
+            _release_lease(cache_key)
+
+    results = [(query_pos, results_by_key[cache_key]) for query_pos, _, cache_key in leaders]
+    for query_pos, query_params, _, future in followers:
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            metrics.incr("snuba.single_flight.timeout", tags=metric_tags)
+            result = _bulk_snuba_query([query_params], headers)[0]
+        else:
+            metrics.incr("snuba.single_flight.coalesced", tags=metric_tags)
+        results.append((query_pos, result))
+
+    return results
+
+
 def _apply_cache_and_build_results(
     snuba_param_list: Sequence[SnubaQueryBody],
     referrer: Optional[str] = None,
     use_cache: Optional[bool] = False,
 ) -> ResultSet:
+    """
+    Runs the queries, using the query cache if `use_cache` is set.
+
+    For referrers configured in the `snuba.cache.stale-while-revalidate`
+    option, cached results are kept for their hard TTL. Results that are
+    older than the soft TTL are still returned, and refreshed in the
+    background.
+    """
     headers = {}
     if referrer:
         headers["referer"] = referrer
@@ -743,8 +1051,15 @@ def _apply_cache_and_build_results(
 
     results = []
 
+    swr_ttls = _get_stale_while_revalidate_ttls(referrer) if use_cache else None
     if use_cache:
-        cache_keys = [get_cache_key(query_params[0]) for _, query_params in query_param_list]
+        # Results for referrers with stale-while-revalidate are cached along
+        # with the time they were cached at.
+        cache_key_suffix = "" if swr_ttls is None else ":swr"
+        cache_keys = [
+            get_cache_key(query_params[0]) + cache_key_suffix
+            for _, query_params in query_param_list
+        ]
         cache_data = cache.get_many(cache_keys)
         to_query: List[Tuple[int, SnubaQueryBody, Optional[str]]] = []
         for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
@@ -753,17 +1068,26 @@ def _apply_cache_and_build_results(
             if cached_result is None:
                 metrics.incr("snuba.query_cache.miss", tags=metric_tags)
                 to_query.append((query_pos, query_params, cache_key))
+                continue
+
+            result, stale = _load_cached_result(cached_result, swr_ttls)
+            if stale:
+                metrics.incr("snuba.query_cache.stale", tags=metric_tags)
+                _schedule_refresh(query_params, cache_key, headers, swr_ttls)
             else:
                 metrics.incr("snuba.query_cache.hit", tags=metric_tags)
-                results.append((query_pos, json.loads(cached_result)))
+            results.append((query_pos, result))
     else:
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
 
-    if to_query:
+    single_flight = options.get("snuba.single-flight") if use_cache else "off"
+    if to_query and single_flight != "off":
+        results.extend(_single_flight_query(to_query, headers, referrer, single_flight, swr_ttls))
+    elif to_query:
         query_results = _bulk_snuba_query([item[1] for item in to_query], headers)
         for result, (query_pos, _, cache_key) in zip(query_results, to_query):
             if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+                _set_cached_result(cache_key, result, swr_ttls)
             results.append((query_pos, result))
 
     # Sort so that we get the results back in the original param list order
@@ -828,41 +1152,7 @@ def _bulk_snuba_query(
 
     results = []
     for response, _, reverse in query_results:
-        try:
-            body = json.loads(response.data)
-            if SNUBA_INFO:
-                if "sql" in body:
-                    print(  # NOQA: only prints when an env variable is set
-                        "{}.sql:\n {}".format(
-                            headers.get("referer", "<unknown>"),
-                            sqlparse.format(body["sql"], reindent_aligned=True),
-                        )
-                    )
-                if "error" in body:
-                    print(  # NOQA: only prints when an env variable is set
-                        "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
-                    )
-        except ValueError:
-            if response.status != 200:
-                logger.error("snuba.query.invalid-json")
-                raise SnubaError("Failed to parse snuba error response")
-            raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
-
-        if response.status != 200:
-            if body.get("error"):
-                error = body["error"]
-                if response.status == 429:
-                    raise RateLimitExceeded(error["message"])
-                elif error["type"] == "schema":
-                    raise SchemaValidationError(error["message"])
-                elif error["type"] == "clickhouse":
-                    raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
-                        error["message"]
-                    )
-                else:
-                    raise SnubaError(error["message"])
-            else:
-                raise SnubaError(f"HTTP {response.status}")
+        body = _parse_response_body(response, headers)
 
         # Forward and reverse translation maps from model ids to snuba keys, per column
         body["data"] = [reverse(d) for d in body["data"]]
@@ -871,6 +1161,52 @@ def _bulk_snuba_query(
     return results
 
 
+def _parse_response_body(
+    response: urllib3.response.HTTPResponse, headers: Mapping[str, str]
+) -> MutableMapping[str, Any]:
+    """
+    Decodes the body of a Snuba response, raising the matching `SnubaError`
+    if the query failed.
+    """
+    try:
+        body = json.loads(response.data)
+        if SNUBA_INFO:
+            if "sql" in body:
+                print(  # NOQA: only prints when an env variable is set
+                    "{}.sql:\n {}".format(
+                        headers.get("referer", "<unknown>"),
+                        sqlparse.format(body["sql"], reindent_aligned=True),
+                    )
+                )
+            if "error" in body:
+                print(  # NOQA: only prints when an env variable is set
+                    "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
+                )
+    except ValueError:
+        if response.status != 200:
+            logger.error("snuba.query.invalid-json")
+            raise SnubaError("Failed to parse snuba error response")
+        raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+
+    if response.status != 200:
+        if body.get("error"):
+            error = body["error"]
+            if response.status == 429:
+                raise RateLimitExceeded(error["message"])
+            elif error["type"] == "schema":
+                raise SchemaValidationError(error["message"])
+            elif error["type"] == "clickhouse":
+                raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
+                    error["message"]
+                )
+            else:
+                raise SnubaError(error["message"])
+        else:
+            raise SnubaError(f"HTTP {response.status}")
+
+    return body
+
+
 RawResult = Tuple[urllib3.response.HTTPResponse, Callable[[Any], Any], Callable[[Any], Any]]
 
 
@@ -902,7 +1238,10 @@ def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> Raw
 
 
 def _raw_snql_query(
-    request: Request, thread_hub: Hub, headers: Mapping[str, str]
+    request: Request,
+    thread_hub: Hub,
+    headers: Mapping[str, str],
+    preload_content: bool = True,
 ) -> urllib3.response.HTTPResponse:
     # Enter hub such that http spans are properly nested
     with thread_hub, timer("snql_query"):
@@ -922,10 +1261,195 @@ def _raw_snql_query(
         with thread_hub.start_span(op="snuba_snql.run", description=str(request)) as span:
             span.set_tag("snuba.referrer", referrer)
             return _snuba_pool.urlopen(
-                "POST", f"/{request.dataset}/snql", body=body, headers=headers
+                "POST",
+                f"/{request.dataset}/snql",
+                body=body,
+                headers=headers,
+                preload_content=preload_content,
             )
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _ResponseBuffer:
+    """
+    The text of a streamed response, read chunk by chunk as it is decoded.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self.chunks = chunks
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+
+    def read_more(self) -> bool:
+        """
+        Appends the next chunk to the text, dropping everything before the
+        current position. Returns False at the end of the response.
+        """
+        chunk = next(self.chunks, None)
+        self.text = self.text[self.pos :] + self.decoder.decode(chunk or b"", final=chunk is None)
+        self.pos = 0
+        return chunk is not None
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character, or an empty string
+        at the end of the response.
+        """
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise UnexpectedResponseError(
+                f"Could not decode JSON response: expected one of {chars!r}, got {char!r}"
+            )
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """
+        Decodes the JSON value at the current position, reading more of the
+        response until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = json.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if not self.read_more():
+                    raise UnexpectedResponseError(f"Could not decode JSON response: {e}")
+                continue
+            # A number at the end of the text may continue in the next chunk.
+            if end == len(self.text) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_response_body(buffer: _ResponseBuffer) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Decodes the object in the body of a Snuba response. Yields `(None, row)`
+    for every row in `data` and `(key, value)` for all other keys, in the
+    order they are in the response.
+    """
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+
+    while True:
+        key = buffer.decode()
+        buffer.expect(":")
+        if key == "data" and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield None, buffer.decode()
+                    if buffer.expect(",]") == "]":
+                        break
+        else:
+            yield key, buffer.decode()
+
+        if buffer.expect(",}") == "}":
+            return
+
+
+class SnubaStreamingResult:
+    """
+    The result of a query run with `raw_snql_query_stream`.
+
+    Iterating it yields the rows of the result. They are decoded from the
+    response and reverse translated one at a time while they are iterated,
+    so the response is never held in memory in full. The rows can only be
+    iterated once.
+
+    The other keys of the result (e.g. `meta`) are available through `get`.
+    Snuba may send them after the rows, in which case getting them before
+    the rows were iterated keeps the remaining rows in memory.
+    """
+
+    def __init__(self, response: urllib3.response.HTTPResponse, reverse: Translator) -> None:
+        self._response = response
+        self._reverse = reverse
+        self._body = _iter_response_body(_ResponseBuffer(response.stream(STREAM_CHUNK_SIZE)))
+        self._values: MutableMapping[str, Any] = {}
+        self._rows: Deque[Any] = deque()
+        self._iterated = False
+        self._done = False
+
+    def __enter__(self) -> "SnubaStreamingResult":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _advance(self) -> bool:
+        if self._done:
+            return False
+
+        try:
+            key, value = next(self._body)
+        except StopIteration:
+            self._done = True
+            # Read whatever follows the body before reusing the connection.
+            self._response.drain_conn()
+            self._response.release_conn()
+            return False
+        except urllib3.exceptions.HTTPError as err:
+            self.close()
+            raise SnubaError(err)
+        except Exception:
+            self.close()
+            raise
+
+        if key is None:
+            self._rows.append(value)
+        else:
+            self._values[key] = value
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        while key not in self._values and self._advance():
+            pass
+        return self._values.get(key, default)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        if self._iterated:
+            raise RuntimeError("The rows of a streamed result can only be iterated once")
+        self._iterated = True
+        return self._iter_rows()
+
+    def _iter_rows(self) -> Iterator[Mapping[str, Any]]:
+        try:
+            while self._rows or self._advance():
+                while self._rows:
+                    yield self._reverse(self._rows.popleft())
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stops reading the response, if not all of it was read yet.
+        """
+        if not self._done:
+            self._done = True
+            self._body.close()
+            # The connection can't be reused with the rest of the response
+            # still unread.
+            self._response.close()
+
+
 def query(
     dataset=None,
     start=None,
@@ -1,4 +1,10 @@
-from sentry.api.serializers import Serializer, serialize
+import threading
+
+import pytest
+import sentry_sdk
+from sentry_sdk import Hub
+
+from sentry.api.serializers import Serializer, run_attr_fetchers, serialize
 from sentry.testutils import TestCase
 
 
@@ -53,3 +59,42 @@ class BaseSerializerTest(TestCase):
         user = self.create_user()
         result = serialize(foo, user, VariadicSerializer(), kw="keyword")
         assert result["kw"] == "keyword"
+
+
+class RunAttrFetchersTest(TestCase):
+    def test_serial(self):
+        with self.settings(SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS=0):
+            assert run_attr_fetchers(
+                {"a": threading.get_ident, "b": threading.get_ident, "c": lambda: 3}
+            ) == {"a": threading.get_ident(), "b": threading.get_ident(), "c": 3}
+
+    def test_concurrent(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def fetch():
+            barrier.wait()
+            return threading.get_ident(), Hub.current.scope.span.parent_span_id
+
+        def fetch_local():
+            barrier.wait()
+            return threading.get_ident()
+
+        with self.settings(SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS=4):
+            with sentry_sdk.start_span(op="test") as span:
+                results = run_attr_fetchers({"b": fetch, "c": fetch}, {"a": fetch_local})
+
+        # Local fetchers run on the calling thread, the others on the pool
+        # within the span of the caller.
+        assert results["a"] == threading.get_ident()
+        for name in "bc":
+            thread_id, parent_span_id = results[name]
+            assert thread_id != threading.get_ident()
+            assert parent_span_id == span.span_id
+
+    def test_errors(self):
+        def fail():
+            raise ValueError("fail")
+
+        with self.settings(SENTRY_SERIALIZER_ATTR_FETCHER_WORKERS=4):
+            with pytest.raises(ValueError):
+                run_attr_fetchers({"a": lambda: 1, "b": fail})
@@ -0,0 +1,35 @@
+import time
+from unittest import mock
+
+from sentry.api.serializers import serialize
+from sentry.api.serializers.models.group import StreamGroupSerializerSnuba
+from sentry.testutils.skips import requires_pytest_benchmark
+
+GROUPS = 100
+# Round trip time of the Snuba stand-in below.
+SNUBA_LATENCY = 0.05
+
+
+def snuba_query(**kwargs):
+    time.sleep(SNUBA_LATENCY)
+    return {"data": []}
+
+
+def snuba_get_range(model, keys, **kwargs):
+    time.sleep(SNUBA_LATENCY)
+    return {key: [] for key in keys}
+
+
+@requires_pytest_benchmark
+def test_benchmark_stream_group_serializer(benchmark, factories, default_project):
+    groups = [factories.create_group(project=default_project) for _ in range(GROUPS)]
+    serializer = StreamGroupSerializerSnuba(stats_period="24h")
+
+    with mock.patch(
+        "sentry.api.serializers.models.group.aliased_query", side_effect=snuba_query
+    ), mock.patch(
+        "sentry.api.serializers.models.group.snuba_tsdb.get_range", side_effect=snuba_get_range
+    ):
+        result = benchmark(serialize, groups, serializer=serializer)
+
+    assert len(result) == GROUPS
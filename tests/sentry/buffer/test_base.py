@@ -69,3 +69,33 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch_saves_data(self):
+        group = Group.objects.create(project=Project(id=1))
+        other_group = Group.objects.create(project=Project(id=1))
+        the_date = timezone.now() + timedelta(days=5)
+        filters = {"project_id": self.project.id, "release_id": self.release.id}
+        self.buf.process_batch(
+            [
+                (Group, {"times_seen": 2}, {"id": group.id}, {"last_seen": the_date}, None),
+                (Group, {"times_seen": 3}, {"pk": other_group.id}, None, None),
+                (ReleaseProject, {"new_groups": 1}, filters, None, None),
+            ]
+        )
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen == the_date
+        other_group_ = Group.objects.get(id=other_group.id)
+        assert other_group_.times_seen == other_group.times_seen + 3
+        assert other_group_.last_seen == other_group.last_seen
+        assert ReleaseProject.objects.filter(new_groups=1, **filters).exists()
+
+    def test_process_batch_updates_group_cache(self):
+        group = Group.objects.create(project=Project(id=1))
+        orig_times_seen = Group.objects.get_from_cache(id=group.id).times_seen
+        self.buf.process_batch([(Group, {"times_seen": 5}, {"id": group.id}, None, None)])
+        assert Group.objects.get_from_cache(id=group.id).times_seen == orig_times_seen + 5
+
+    def test_process_batch_ignores_deleted_group(self):
+        self.buf.process_batch([(Group, {"times_seen": 1}, {"id": 0}, None, None)])
+        assert not Group.objects.filter(id=0).exists()
@@ -0,0 +1,108 @@
+import weakref
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from sentry.buffer.inprocess import CombiningBuffer, _run_flusher
+from sentry.models import Group
+from sentry.testutils import TestCase
+
+
+class CombiningBufferTest(TestCase):
+    def setUp(self):
+        self.buf = CombiningBuffer(
+            backend={"path": "sentry.buffer.base.Buffer"}, max_keys=3, max_delay=60
+        )
+        self.buf.backend = mock.Mock()
+        self.buf.backend.get.return_value = {"times_seen": 1}
+
+    def test_incr_combines(self):
+        now = timezone.now()
+        later = now + timedelta(seconds=5)
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1}, {"last_seen": now})
+        self.buf.incr(Group, {"times_seen": 2}, {"id": 1}, {"last_seen": later})
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 2}, signal_only=True)
+        assert not self.buf.backend.incr.called
+
+        assert self.buf.get(Group, ["times_seen"], {"id": 1}) == {"times_seen": 4}
+
+        self.buf.flush()
+        assert self.buf.backend.incr.mock_calls == [
+            mock.call(
+                Group, {"times_seen": 3}, {"id": 1}, extra={"last_seen": later}, signal_only=None
+            ),
+            mock.call(Group, {"times_seen": 1}, {"id": 2}, extra=None, signal_only=True),
+        ]
+
+        self.buf.backend.incr.reset_mock()
+        self.buf.flush()
+        assert not self.buf.backend.incr.called
+
+    def test_incr_flushes_when_full(self):
+        for i in range(3):
+            self.buf.incr(Group, {"times_seen": 1}, {"id": i})
+        assert len(self.buf.backend.incr.mock_calls) == 3
+
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 0})
+        assert len(self.buf.backend.incr.mock_calls) == 3
+
+    def test_incr_flushes_after_max_delay(self):
+        self.buf.max_delay = 0.000001
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1})
+        self.buf.backend.incr.assert_called_once_with(
+            Group, {"times_seen": 1}, {"id": 1}, extra=None, signal_only=None
+        )
+
+    def test_incr_unhashable_filters_passthrough(self):
+        self.buf.incr(Group, {"times_seen": 1}, {"id": [1]})
+        self.buf.backend.incr.assert_called_once_with(
+            Group, {"times_seen": 1}, {"id": [1]}, extra=None, signal_only=None
+        )
+
+    def test_process_delegates(self):
+        self.buf.process(batch_keys=["foo"])
+        self.buf.backend.process.assert_called_once_with(batch_keys=["foo"])
+        self.buf.process_pending(partition=1)
+        self.buf.backend.process_pending.assert_called_once_with(partition=1)
+
+    def test_flush_failure_keeps_pending(self):
+        now = timezone.now()
+        later = now + timedelta(seconds=5)
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1}, {"last_seen": now})
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 2})
+
+        self.buf.backend.incr.side_effect = [None, Exception("boom")]
+        with pytest.raises(Exception):
+            self.buf.flush()
+
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 2})
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1}, {"last_seen": later})
+        self.buf.backend.incr.reset_mock(side_effect=True)
+        self.buf.flush()
+        assert self.buf.backend.incr.mock_calls == [
+            mock.call(Group, {"times_seen": 2}, {"id": 2}, extra=None, signal_only=None),
+            mock.call(
+                Group, {"times_seen": 1}, {"id": 1}, extra={"last_seen": later}, signal_only=None
+            ),
+        ]
+
+    def test_flusher_survives_errors(self):
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1})
+        self.buf.backend.incr.side_effect = [Exception("boom"), None]
+        self.buf.max_delay = 0
+
+        def sleep(seconds):
+            if sleep.calls == 3:
+                self.buf.close()
+            sleep.calls += 1
+
+        sleep.calls = 0
+        with mock.patch("sentry.buffer.inprocess.sleep", sleep):
+            _run_flusher(weakref.ref(self.buf), self.buf.max_delay)
+
+        assert len(self.buf.backend.incr.mock_calls) == 2
+        self.buf.backend.incr.assert_called_with(
+            Group, {"times_seen": 1}, {"id": 1}, extra=None, signal_only=None
+        )
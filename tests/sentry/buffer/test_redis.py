@@ -46,6 +46,28 @@ class RedisBufferTest(TestCase):
         client = self.buf.cluster.get_routing_client()
         assert client.zrange("b:p", 0, -1) == []
 
+    @mock.patch("sentry.buffer.redis.metrics")
+    @mock.patch("sentry.buffer.redis.process_incr")
+    def test_process_pending_chunked(self, process_incr, metrics):
+        self.buf.incr_batch_size = 2
+        self.buf.pending_chunk_size = 1
+        with freeze_time(datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)) as frozen:
+            now = frozen().timestamp()
+            with self.buf.cluster.map() as client:
+                client.zadd("b:p", {"foo": now - 30, "bar": now - 20, "baz": now - 10})
+                # Added after the drain started, left for the next run.
+                client.zadd("b:p", {"qux": now + 10})
+            self.buf.process_pending()
+
+        assert process_incr.apply_async.mock_calls == [
+            mock.call(kwargs={"batch_keys": ["foo", "bar"]}),
+            mock.call(kwargs={"batch_keys": ["baz"]}),
+        ]
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == [b"qux"]
+        metrics.timing.assert_any_call("buffer.pending-size", 3)
+        metrics.timing.assert_any_call("buffer.pending-lag", 30)
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.base.Buffer.process")
     def test_process_does_bubble_up_json(self, process):
@@ -103,6 +125,56 @@ class RedisBufferTest(TestCase):
         group = Group.objects.get_from_cache(id=self.group.id)
         assert group.times_seen == orig_times_seen + times_seen_incr
 
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_batch_mode(self, process_batch):
+        self.buf.flush_mode = "batch"
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        first_key = self.buf._make_key(model, {"pk": 1})
+        second_key = self.buf._make_key(model, {"pk": 2})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 2}, {"pk": 2}, extra={"foo": "bar"})
+
+        self.buf.process(batch_keys=[first_key, second_key, "missing"])
+
+        process_batch.assert_called_once_with(
+            [
+                (mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, None),
+                (mock.Mock, {"times_seen": 2}, {"pk": 2}, {"foo": "bar"}, None),
+            ]
+        )
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == []
+        assert not client.exists(first_key)
+        assert not client.exists(self.buf._make_lock_key(first_key))
+
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_batch_mode_skips_locked(self, process_batch):
+        self.buf.flush_mode = "batch"
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        key = self.buf._make_key(model, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        client = self.buf.cluster.get_routing_client()
+        client.set(self.buf._make_lock_key(key), "1")
+
+        self.buf.process(batch_keys=[key])
+
+        assert not process_batch.called
+        assert client.exists(key)
+
+    @freeze_time()
+    def test_group_cache_updated_batch_mode(self):
+        self.buf.flush_mode = "batch"
+        orig_times_seen = Group.objects.get_from_cache(id=self.group.id).times_seen
+        self.buf.incr(
+            Group, {"times_seen": 5}, {"id": self.group.id}, {"last_seen": timezone.now()}
+        )
+        with self.tasks(), mock.patch("sentry.buffer", self.buf):
+            self.buf.process_pending()
+        group = Group.objects.get_from_cache(id=self.group.id)
+        assert group.times_seen == orig_times_seen + 5
+
     def test_get(self):
         model = mock.Mock()
         model.__name__ = "Mock"
@@ -149,6 +221,84 @@ class RedisBufferTest(TestCase):
         pending = client.zrange("b:p", 0, -1)
         assert pending == [key.encode("utf-8")]
 
+    def test_incr_saves_to_redis_json(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        self.buf.value_codec = "json"
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        columns = {"times_seen": 1}
+        filters = {"pk": 1}
+        key = self.buf._make_key(model, filters=filters)
+        self.buf.incr(
+            model,
+            columns,
+            filters,
+            extra={"foo": "bar", "data": {"type": "default"}, "datetime": now},
+        )
+        result = client.hgetall(key)
+        # Force keys to strings
+        result = {force_text(k): v for k, v in result.items()}
+        assert pickle.loads(result.pop("e+data")) == {"type": "default"}
+        assert result == {
+            "e+foo": b'["s","bar"]',
+            "e+datetime": b'["d","1493791566.0"]',
+            "f": b'{"pk":["i","1"]}',
+            "i+times_seen": b"1",
+            "m": b"unittest.mock.Mock",
+        }
+
+    def test_incr_json_falls_back_to_pickle(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        self.buf.value_codec = "json"
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = self.buf._make_key(model, filters=filters)
+        self.buf.incr(model, {"times_seen": 1}, filters, extra={"data": {"seen": now}})
+        assert pickle.loads(client.hget(key, "e+data")) == {"seen": now}
+
+    def test_incr_script_matches_pipeline(self):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        columns = {"times_seen": 1, "times_used": 2}
+        extra = {"foo": "bar", "datetime": now}
+
+        pipeline_key = self.buf._make_key(model, filters={"pk": 1})
+        self.buf.incr(model, columns, {"pk": 1}, extra=extra, signal_only=True)
+        self.buf.incr(model, columns, {"pk": 1}, extra=extra, signal_only=True)
+
+        self.buf.incr_mode = "script"
+        script_key = self.buf._make_key(model, filters={"pk": 2})
+        self.buf.incr(model, columns, {"pk": 2}, extra=extra, signal_only=True)
+        self.buf.incr(model, columns, {"pk": 2}, extra=extra, signal_only=True)
+
+        pipeline_result = client.hgetall(pipeline_key)
+        script_result = client.hgetall(script_key)
+        assert pickle.loads(pipeline_result.pop(b"f")) == {"pk": 1}
+        assert pickle.loads(script_result.pop(b"f")) == {"pk": 2}
+        assert script_result == pipeline_result
+        assert script_result[b"i+times_used"] == b"4"
+        assert 0 < client.ttl(script_key) <= self.buf.key_expire
+        assert set(client.zrange("b:p", 0, -1)) == {
+            pipeline_key.encode("utf-8"),
+            script_key.encode("utf-8"),
+        }
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_roundtrips_json_codec(self, process):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        self.buf.value_codec = "json"
+        self.buf.incr_mode = "script"
+        extra = {"last_seen": now, "data": {"type": "default"}, "level": 40}
+        self.buf.incr(Group, {"times_seen": 1}, {"id": 1}, extra=extra)
+        self.buf.process("foo")
+        process.assert_called_once_with(Group, {"times_seen": 1}, {"id": 1}, extra, None)
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr")
     @mock.patch("sentry.buffer.redis.process_pending")
@@ -1,11 +1,14 @@
 import contextlib
 import time
 from threading import Thread
+from unittest import mock
 
 import pytest
 
-from sentry.event_manager import _save_aggregate
+from sentry.event_manager import _get_or_create_grouphashes, _grouphash_cache, _save_aggregate
 from sentry.eventstore.models import CalculatedHashes, Event
+from sentry.models import GroupHash
+from sentry.testutils.helpers import override_options
 
 
 @pytest.mark.django_db(transaction=True)
@@ -87,3 +90,64 @@ def test_group_creation_race(monkeypatch, default_project, is_race_free):
         # assert many groups are new
         assert 1 < len({rv[0].id for rv in return_values}) <= CONCURRENCY
         assert 1 < sum(rv[1] for rv in return_values) <= CONCURRENCY
+
+
+def _save_event(project, hashes):
+    return _save_aggregate(
+        Event(project.id, "89aeed6a472e4c5fb992d14df4d7e1b6", data={"timestamp": time.time()}),
+        hashes=CalculatedHashes(hashes=hashes, hierarchical_hashes=[], tree_labels=[]),
+        release=None,
+        metadata={},
+        received_timestamp=None,
+        level=10,
+        culprit="",
+    )
+
+
+@pytest.mark.django_db
+def test_get_or_create_grouphashes(default_project):
+    existing = GroupHash.objects.create(project=default_project, hash="a" * 32)
+
+    grouphashes = _get_or_create_grouphashes(
+        default_project, ["a" * 32, "b" * 32, "b" * 32], ["c" * 32, "d" * 32]
+    )
+
+    assert set(grouphashes) == {"a" * 32, "b" * 32}
+    assert grouphashes["a" * 32].id == existing.id
+    assert grouphashes["b" * 32].id is not None
+    assert GroupHash.objects.filter(project=default_project).count() == 2
+
+    # Lookup hashes are returned once they exist, and nothing is created twice.
+    GroupHash.objects.create(project=default_project, hash="c" * 32)
+    grouphashes = _get_or_create_grouphashes(default_project, ["b" * 32], ["c" * 32, "d" * 32])
+    assert set(grouphashes) == {"b" * 32, "c" * 32}
+    assert GroupHash.objects.filter(project=default_project).count() == 3
+
+
+@pytest.mark.django_db
+def test_grouphash_cache(default_project):
+    _grouphash_cache.clear()
+
+    with override_options({"store.grouphash-cache": True}):
+        group, is_new, _ = _save_event(default_project, ["a" * 32, "b" * 32])
+        assert is_new
+
+        # The group was just created, so its hashes are only cached once an
+        # event finds them assigned.
+        assert _save_event(default_project, ["a" * 32, "b" * 32])[0].id == group.id
+        assert len(_grouphash_cache) == 2
+
+        with mock.patch.object(GroupHash.objects, "filter") as grouphash_filter:
+            assert _save_event(default_project, ["a" * 32, "b" * 32])[0].id == group.id
+            assert not grouphash_filter.called
+
+        # A new hash misses the cache and is assigned to the group.
+        assert _save_event(default_project, ["a" * 32, "c" * 32])[0].id == group.id
+        assert GroupHash.objects.get(project=default_project, hash="c" * 32).group_id == group.id
+
+        # Cached groups that no longer exist are ignored.
+        group.delete()
+        other_group, is_new, _ = _save_event(default_project, ["a" * 32, "b" * 32])
+        assert other_group.id != group.id
+
+    _grouphash_cache.clear()
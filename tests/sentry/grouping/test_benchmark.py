@@ -1,22 +1,16 @@
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.enhancer import Enhancements
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
+from sentry.testutils.skips import requires_pytest_benchmark
+from sentry.utils.event_frames import find_stack_frames
 from tests.sentry.grouping import grouping_input as grouping_inputs
 
 CONFIGS = {key: get_default_grouping_config_dict(key) for key in sorted(CONFIGURATIONS.keys())}
 
 
-def benchmark_available():
-    try:
-        import pytest_benchmark  # NOQA
-    except ModuleNotFoundError:
-        return False
-    else:
-        return True
-
-
-@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@requires_pytest_benchmark
 @pytest.mark.parametrize(
     "config_name", sorted(CONFIGURATIONS.keys()), ids=lambda x: x.replace("-", "_")
 )
@@ -37,3 +31,22 @@ def run_configuration(grouping_input, config):
     event.project = None
 
     event.get_hashes()
+
+
+@requires_pytest_benchmark
+@pytest.mark.parametrize(
+    "config_name", sorted(CONFIGURATIONS.keys()), ids=lambda x: x.replace("-", "_")
+)
+def test_benchmark_enhancements(config_name, benchmark):
+    enhancements = Enhancements.loads(CONFIGS[config_name]["enhancements"])
+    stacktraces = [
+        (find_stack_frames(grouping_input.data), grouping_input.data.get("platform"))
+        for grouping_input in grouping_inputs
+    ]
+
+    def run():
+        for frames, platform in stacktraces:
+            frames = [dict(frame) for frame in frames]
+            enhancements.apply_modifications_to_frame(frames, platform, None)
+
+    benchmark(run)
@@ -412,3 +412,62 @@ def test_sentinel_and_prefix(action, type):
     actions[0][1].update_frame_components_contributions([component], frames, 0)
     expected = action == "+"
     assert getattr(component, f"is_{type}_frame") is expected
+
+
+def test_rule_index_key():
+    def index_key(config):
+        return Enhancements.from_config_string(config).rules[0].get_index_key()
+
+    assert index_key("family:native function:std::* -app") == ("function", b"std::")
+    assert index_key("family:native,javascript -app") == ("family", {b"native", b"javascript"})
+    assert index_key("family:native module:foo* function:foobar* -app") == ("function", b"foobar")
+    assert index_key('function:"?[[]Sentry*" -app') is None
+    assert index_key("family:all -app") is None
+    assert index_key("!family:native -app") is None
+    assert index_key("!function:foo -app") is None
+    assert index_key("path:/foo/** -app") is None
+    assert index_key("[ function:foo ] | family:all -app") is None
+
+
+def test_rule_index_matches_all_rules():
+    enhancements = Enhancements.from_config_string(
+        """
+        family:native function:main                      +app
+        app:yes function:*                               category=mine
+        function:start*                                  category=threadbase
+        module:foo.bar.*                                 -app
+        category:threadbase                              -group
+        [ function:caller ] | function:callee            +app
+        family:javascript path:**/node_modules/**        -app
+        """,
+        bases=["mobile:2021-04-02"],
+    )
+    frames = [
+        {"function": "main", "platform": "native"},
+        {"function": "std::rt::lang_start", "package": "/usr/lib/libstd.so"},
+        {"function": "start_wqthread", "package": "/usr/lib/system/libsystem_pthread.dylib"},
+        {"function": "caller", "module": "foo.bar.baz"},
+        {"function": "callee", "module": "foo.bar"},
+        {"function": "-[NSISEngine foo]", "package": "UIKitCore"},
+        {"function": "google_breakpad::ExceptionHandler::SignalHandler"},
+        {"function": "lambda", "abs_path": "/app/node_modules/foo.js", "platform": "javascript"},
+        {"module": "android.view.View", "function": "run", "platform": "java"},
+    ]
+
+    def apply_all_rules(frames, platform):
+        # Tests every rule against every frame, without the rule index
+        match_frames = [create_match_frame(frame, platform) for frame in frames]
+        cache = {}
+        for rule in enhancements.iter_rules():
+            if rule.is_modifier:
+                for idx, action in rule.get_matching_frame_actions(
+                    match_frames, platform, None, cache
+                ):
+                    action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
+        return frames
+
+    for platform in ("native", "cocoa", "java", "python"):
+        expected = apply_all_rules([dict(frame) for frame in frames], platform)
+        actual = [dict(frame) for frame in frames]
+        enhancements.apply_modifications_to_frame(actual, platform, None)
+        assert actual == expected
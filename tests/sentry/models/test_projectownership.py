@@ -1,3 +1,5 @@
+from unittest import mock
+
 from sentry.models import ActorTuple, ProjectOwnership, Team, User
 from sentry.ownership.grammar import Matcher, Owner, Rule, dump_schema, resolve_actors
 from sentry.testutils import TestCase
@@ -75,6 +77,38 @@ class ProjectOwnershipTestCase(TestCase):
             ([ActorTuple(self.team.id, Team), ActorTuple(self.user.id, User)], [rule_a, rule_b]),
         )
 
+    def test_get_owners_schema_updated(self):
+        rule_a = Rule(Matcher("path", "*.py"), [Owner("team", self.team.slug)])
+        rule_b = Rule(Matcher("path", "*.js"), [Owner("team", self.team.slug)])
+        data = {"stacktrace": {"frames": [{"filename": "foo.py"}]}}
+
+        ownership = ProjectOwnership.objects.create(
+            project_id=self.project.id, schema=dump_schema([rule_a]), fallthrough=True
+        )
+        assert ProjectOwnership.get_owners(self.project.id, data)[1] == [rule_a]
+
+        # Same number of rules, but the compiled rules must not be reused.
+        ownership.schema = dump_schema([rule_b])
+        ownership.save()
+        assert ProjectOwnership.get_owners(self.project.id, data) == (
+            ProjectOwnership.Everyone,
+            None,
+        )
+
+    def test_get_owners_schema_hash_cached(self):
+        rule_a = Rule(Matcher("path", "*.py"), [Owner("team", self.team.slug)])
+        data = {"stacktrace": {"frames": [{"filename": "foo.py"}]}}
+
+        ProjectOwnership.objects.create(
+            project_id=self.project.id, schema=dump_schema([rule_a]), fallthrough=True
+        )
+        assert ProjectOwnership.get_owners(self.project.id, data)[1] == [rule_a]
+
+        # The cached read carries the hash of its schema.
+        with mock.patch("sentry.models.projectownership.hash_values") as hash_values:
+            assert ProjectOwnership.get_owners(self.project.id, data)[1] == [rule_a]
+        assert not hash_values.called
+
     def test_get_owners_when_codeowners_exists_and_no_issueowners(self):
         # This case will never exist bc we create a ProjectOwnership record if none exists when creating a ProjectCodeOwner record.
         # We have this testcase for potential corrupt data.
@@ -0,0 +1,76 @@
+import os
+from collections import defaultdict
+
+import pytest
+
+from sentry.nodestore.codecs import train_dictionary
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.skips import requires_pytest_benchmark
+from sentry.utils import json
+
+_fixture_path = os.path.join(os.path.dirname(__file__), "..", "grouping", "grouping_inputs")
+
+EVENTS = []
+for filename in sorted(os.listdir(_fixture_path)):
+    if filename.endswith(".json"):
+        with open(os.path.join(_fixture_path, filename)) as f:
+            EVENTS.append(json.load(f))
+
+
+@pytest.fixture(scope="module")
+def dictionaries(tmp_path_factory):
+    samples = defaultdict(list)
+    for event in EVENTS:
+        samples[event.get("platform") or "other"].append(json.dumps(event).encode("utf8"))
+
+    paths = {}
+    for platform, platform_samples in samples.items():
+        # zstd can't train dictionaries on too few samples
+        if len(platform_samples) < 8:
+            continue
+        path = tmp_path_factory.mktemp("dictionaries") / platform
+        path.write_bytes(train_dictionary(platform_samples, size=16 * 1024))
+        paths[platform] = str(path)
+    return paths
+
+
+CONFIGS = {
+    "lines": {},
+    "indexed": {"indexed_subkeys": True},
+    "zstd": {"codec": "zstd"},
+    "zstd_dictionary": {"codec": "zstd", "codec_dictionaries": True},
+}
+
+
+def get_nodestore(config_name, dictionaries):
+    config = dict(CONFIGS[config_name])
+    if config.get("codec_dictionaries"):
+        config["codec_dictionaries"] = dictionaries
+    return DjangoNodeStorage(**config)
+
+
+@requires_pytest_benchmark
+@pytest.mark.parametrize("config_name", sorted(CONFIGS))
+def test_benchmark_encode(config_name, dictionaries, benchmark):
+    ns = get_nodestore(config_name, dictionaries)
+
+    def encode_all():
+        return [ns._encode({None: event, "unprocessed": event}) for event in EVENTS]
+
+    encoded = benchmark(encode_all)
+    benchmark.extra_info["events"] = len(EVENTS)
+    benchmark.extra_info["encoded_bytes"] = sum(len(value) for value in encoded)
+
+
+@requires_pytest_benchmark
+@pytest.mark.parametrize("config_name", sorted(CONFIGS))
+def test_benchmark_decode(config_name, dictionaries, benchmark):
+    ns = get_nodestore(config_name, dictionaries)
+    encoded = [ns._encode({None: event, "unprocessed": event}) for event in EVENTS]
+
+    def decode_all():
+        return [ns._decode(value, subkey=None) for value in encoded]
+
+    assert benchmark(decode_all) == EVENTS
+    benchmark.extra_info["events"] = len(EVENTS)
+    benchmark.extra_info["encoded_bytes"] = sum(len(value) for value in encoded)
@@ -3,10 +3,14 @@ Testsuite of backend-independent nodestore tests. Add your backend to the
 `ns` fixture to have it tested.
 """
 from contextlib import nullcontext
+from unittest import mock
 
 import pytest
 
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import train_dictionary
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.utils import json
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
     get_temporary_bigtable_nodestorage,
@@ -91,3 +95,102 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+def test_set_subkeys_multi(ns):
+    ns.set_subkeys_multi(
+        {
+            "node_1": {None: {"foo": "a"}, "other": {"foo": "b"}},
+            "node_2": {None: {"foo": "c"}},
+        }
+    )
+    assert ns.get("node_1") == {"foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_2") == {"foo": "c"}
+
+    # overwrites existing nodes and their subkeys
+    ns.set_subkeys_multi({"node_1": {None: {"foo": "d"}}, "node_3": {None: {"foo": "e"}}})
+    assert ns.get_multi(["node_1", "node_2", "node_3"]) == {
+        "node_1": {"foo": "d"},
+        "node_2": {"foo": "c"},
+        "node_3": {"foo": "e"},
+    }
+    assert ns.get("node_1", subkey="other") is None
+
+
+def test_multi_batches(ns):
+    ns.multi_batch_size = 2
+    nodes = {f"node_{i}": {"foo": i} for i in range(5)}
+
+    ns.set_subkeys_multi({id: {None: data} for id, data in nodes.items()})
+    if ns.cache:
+        ns.cache.clear()
+    assert ns.get_multi(list(nodes)) == nodes
+
+    ns.delete_multi(list(nodes))
+    for id in nodes:
+        assert ns.get(id) is None
+
+
+def test_indexed_subkeys(ns):
+    ns.set_subkeys("node_legacy", {None: {"foo": "a"}, "other": {"foo": "b"}})
+
+    ns.indexed_subkeys = True
+    ns.set_subkeys("node_1", {None: {"foo": "a\n"}, "other": {"foo": "b"}, "x": "c"})
+    assert ns.get("node_1") == {"foo": "a\n"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_1", subkey="x") == "c"
+    assert ns.get("node_1", subkey="missing") is None
+
+    # nodes written with the line based layout stay readable
+    assert ns.get("node_legacy") == {"foo": "a"}
+    assert ns.get("node_legacy", subkey="other") == {"foo": "b"}
+
+    ns.indexed_subkeys = False
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+
+
+def test_codec(ns, tmp_path):
+    ns.set("node_plain", {"foo": "a"})
+
+    dictionary = tmp_path / "python"
+    dictionary.write_bytes(
+        train_dictionary(
+            [json.dumps({"platform": "python", "foo": str(i) * i}).encode() for i in range(100)],
+            size=1024,
+        )
+    )
+    NodeStorage.__init__(ns, codec="zstd", codec_dictionaries={"python": str(dictionary)})
+
+    ns.set_subkeys("node_1", {None: {"platform": "python", "foo": "a"}, "other": {"foo": "b"}})
+    ns.set("node_2", {"platform": "javascript", "foo": "c"})
+    if ns.cache:
+        ns.cache.clear()
+
+    assert ns.get("node_1") == {"platform": "python", "foo": "a"}
+    assert ns.get("node_1", subkey="other") == {"foo": "b"}
+    assert ns.get("node_2") == {"platform": "javascript", "foo": "c"}
+    assert ns.get("node_plain") == {"foo": "a"}
+
+
+def test_local_cache(ns):
+    NodeStorage.__init__(ns, local_cache_size=1024 * 1024)
+    ns.local_cache.clear()
+
+    ns.set("node_1", {"foo": "a"})
+    # The encoded node is cached, sized by its length.
+    assert ns.local_cache.size == len(ns._encode({None: {"foo": "a"}}))
+    with mock.patch.object(ns, "cache", None), mock.patch.object(
+        ns, "_get_bytes"
+    ) as get_bytes, mock.patch.object(ns, "_decode", wraps=ns._decode) as decode:
+        value = ns.get("node_1")
+        assert value == {"foo": "a"}
+        # cached items can't be mutated by callers
+        value["foo"] = "b"
+        assert ns.get_multi(["node_1"]) == {"node_1": {"foo": "a"}}
+        assert not get_bytes.called
+        # only the round trip is saved, every hit is decoded
+        assert decode.call_count == 2
+
+    ns.delete("node_1")
+    assert ns.get("node_1") is None
@@ -0,0 +1,50 @@
+from sentry.ownership.grammar import CompiledRules, Matcher, Owner, Rule
+from sentry.testutils.skips import requires_pytest_benchmark
+
+CODEOWNERS_LINES = 5000
+
+
+def make_rules():
+    rules = []
+    for i in range(CODEOWNERS_LINES):
+        if i % 5 == 0:
+            pattern = f"/src/app{i}/**/*.py"
+        elif i % 5 == 1:
+            pattern = f"components{i}/"
+        elif i % 5 == 2:
+            pattern = f"/static/app{i}/*.js"
+        elif i % 5 == 3:
+            pattern = f"module{i}.py"
+        else:
+            pattern = f"*.ext{i}"
+        rules.append(Rule(Matcher("codeowners", pattern), [Owner("team", f"team-{i % 50}")]))
+    return rules
+
+
+EVENT = {
+    "platform": "python",
+    "stacktrace": {
+        "frames": [
+            {
+                "filename": f"src/app{i * 5}/views/module{i}.py",
+                "abs_path": f"/usr/local/lib/src/app{i * 5}/views/module{i}.py",
+                "module": f"app{i}.views",
+            }
+            for i in range(30)
+        ]
+    },
+}
+
+
+@requires_pytest_benchmark
+def test_benchmark_compiled_rules(benchmark):
+    rules = make_rules()
+    compiled = CompiledRules(rules)
+    matched = benchmark(compiled.match, EVENT)
+    assert matched == [rule for rule in rules if rule.test(EVENT)]
+
+
+@requires_pytest_benchmark
+def test_benchmark_compile_rules(benchmark):
+    rules = make_rules()
+    benchmark(CompiledRules, rules)
@@ -1,6 +1,7 @@
 import pytest
 
 from sentry.ownership.grammar import (
+    CompiledRules,
     Matcher,
     Owner,
     Rule,
@@ -487,6 +488,9 @@ def _assert_matcher(matcher: Matcher, path_details, expected):
     frames = {"stacktrace": {"frames": path_details}}
     assert matcher.test(frames) == expected
 
+    rule = Rule(matcher, [Owner("user", "foo@example.com")])
+    assert CompiledRules([rule]).match(frames) == ([rule] if expected else [])
+
 
 @pytest.mark.parametrize(
     "path_details, expected",
@@ -856,6 +860,37 @@ def test_codeowners_match_threads():
     assert Matcher("codeowners", "/usr/*/src/*/app.py").test(data)
 
 
+def test_compiled_rules():
+    rules = [
+        Rule(Matcher("codeowners", "/src/components/"), [Owner("user", "a@sentry.io")]),
+        Rule(Matcher("path", "*.py"), [Owner("team", "backend")]),
+        Rule(Matcher("codeowners", "**/app.py"), [Owner("user", "b@sentry.io")]),
+        Rule(Matcher("url", "*.example.com/*"), [Owner("team", "web")]),
+        Rule(Matcher("module", "foo.*"), [Owner("team", "foo")]),
+        Rule(Matcher("tags.foo", "bar"), [Owner("team", "tags")]),
+        Rule(Matcher("codeowners", "*.py"), [Owner("user", "c@sentry.io")]),
+        Rule(Matcher("codeowners", "/src/other/"), [Owner("user", "d@sentry.io")]),
+    ]
+    compiled = CompiledRules.from_schema(dump_schema(rules))
+    assert len(compiled) == len(rules)
+
+    events = [
+        {},
+        {"stacktrace": {"frames": [{"filename": "src/components/app.py"}]}},
+        {"stacktrace": {"frames": [{"filename": "src/other/myapp.py", "module": "foo.bar"}]}},
+        {"request": {"url": "https://www.example.com/foo"}, "tags": [["foo", "bar"]]},
+        {
+            "threads": {
+                "values": [{"stacktrace": {"frames": [{"abs_path": "/usr/src/other/app.js"}]}}]
+            }
+        },
+    ]
+    for data in events:
+        assert compiled.match(data) == [rule for rule in rules if rule.test(data)]
+
+    assert compiled.match(events[1]) == [rules[0], rules[1], rules[2], rules[6]]
+
+
 def test_parse_code_owners():
     assert parse_code_owners(codeowners_fixture_data) == (
         ["@getsentry/frontend", "@getsentry/docs", "@getsentry/ecosystem"],
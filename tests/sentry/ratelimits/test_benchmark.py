@@ -0,0 +1,48 @@
+from unittest import mock
+
+import pytest
+
+from sentry.ratelimits.sliding_windows import Quota, RedisSlidingWindowRateLimiter, RequestedQuota
+from sentry.testutils.skips import requires_pytest_benchmark
+
+GRANULARITY_SECONDS = 10
+WINDOW_SECONDS = [60, 600, 3600]
+REQUESTS = 100
+
+
+def make_requests(window_seconds):
+    quotas = [
+        Quota(window_seconds=window_seconds, granularity_seconds=GRANULARITY_SECONDS, limit=10000)
+    ]
+    return [
+        RequestedQuota(prefix=f"org-id:{org_id}", requested=1, quotas=quotas)
+        for org_id in range(REQUESTS)
+    ]
+
+
+@pytest.mark.parametrize("window_seconds", WINDOW_SECONDS)
+@pytest.mark.parametrize("window_mode", ["granules", "aggregate"])
+def test_redis_cost(window_mode, window_seconds):
+    limiter = RedisSlidingWindowRateLimiter(window_mode=window_mode)
+    requests = make_requests(window_seconds)
+
+    with mock.patch.object(limiter.client, "mget", wraps=limiter.client.mget) as mget:
+        limiter.check_within_quotas(requests, timestamp=10000)
+
+    keys = sum(len(call.args[0]) for call in mget.mock_calls)
+    if window_mode == "granules":
+        assert keys == REQUESTS * window_seconds // GRANULARITY_SECONDS
+    else:
+        assert keys == 0
+
+
+@requires_pytest_benchmark
+@pytest.mark.parametrize("window_seconds", WINDOW_SECONDS)
+@pytest.mark.parametrize("window_mode", ["granules", "aggregate"])
+def test_benchmark_check_and_use_quotas(benchmark, window_mode, window_seconds):
+    limiter = RedisSlidingWindowRateLimiter(window_mode=window_mode)
+    requests = make_requests(window_seconds)
+    timestamps = iter(range(10000, 10000 + 1000000))
+
+    benchmark.extra_info["granules"] = window_seconds // GRANULARITY_SECONDS
+    benchmark(lambda: limiter.check_and_use_quotas(requests, timestamp=next(timestamps)))
@@ -8,9 +8,9 @@ from sentry.ratelimits.sliding_windows import (
 )
 
 
-@pytest.fixture
-def limiter():
-    return RedisSlidingWindowRateLimiter()
+@pytest.fixture(params=["granules", "aggregate"])
+def limiter(request):
+    return RedisSlidingWindowRateLimiter(window_mode=request.param)
 
 
 TIMESTAMP_OFFSET = 100
@@ -101,3 +101,43 @@ def test_multiple_windows(limiter):
     )
 
     assert resp == [GrantedQuota(prefix="foo", granted=5)]
+
+
+def test_aggregate_window_slides():
+    limiter = RedisSlidingWindowRateLimiter(window_mode="aggregate")
+    quotas = [Quota(window_seconds=3600, granularity_seconds=10, limit=100)]
+
+    for timestamp in range(0, 3600, 60):
+        resp = limiter.check_and_use_quotas(
+            [RequestedQuota(prefix="foo", requested=3, quotas=quotas)],
+            timestamp=TIMESTAMP_OFFSET + timestamp,
+        )
+        assert resp == [GrantedQuota(prefix="foo", granted=max(0, min(3, 100 - timestamp // 20)))]
+
+    # The first requests slide out of the window one by one.
+    for timestamp in range(3600, 3600 + 180, 60):
+        resp = limiter.check_and_use_quotas(
+            [RequestedQuota(prefix="foo", requested=3, quotas=quotas)],
+            timestamp=TIMESTAMP_OFFSET + timestamp,
+        )
+        assert resp == [GrantedQuota(prefix="foo", granted=3)]
+
+    resp = limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=3, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET + 3600 + 120,
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=0)]
+
+    # After an entire window without requests everything is available again.
+    resp = limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=100, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET + 3600 * 3,
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=100)]
+
+    # Timestamps older than that window see an empty window.
+    resp = limiter.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=100, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET + 3600,
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=100)]
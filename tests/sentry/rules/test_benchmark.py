@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache import cache
+
+from sentry.models import Rule
+from sentry.rules.processor import RuleProcessor
+from sentry.testutils.skips import requires_pytest_benchmark
+
+RULES = 200
+
+
+@pytest.fixture
+def rules(default_project):
+    Rule.objects.bulk_create(
+        Rule(
+            project=default_project,
+            label=f"Rule {i}",
+            data={
+                "conditions": [
+                    {"id": "sentry.rules.conditions.first_seen_event.FirstSeenEventCondition"},
+                    {
+                        "id": "sentry.rules.filters.tagged_event.TaggedEventFilter",
+                        "key": "foo",
+                        "match": "eq",
+                        "value": f"value-{i}",
+                    },
+                    {"id": "sentry.rules.filters.level.LevelFilter", "match": "gte", "level": "40"},
+                ],
+                "action_match": "all",
+                "filter_match": "all",
+                "actions": [{"id": "sentry.rules.actions.notify_event.NotifyEventAction"}],
+            },
+        )
+        for i in range(RULES)
+    )
+    return Rule.get_for_project(default_project.id)
+
+
+@pytest.fixture
+def rule_processor(factories, default_project, rules):
+    event = factories.store_event(
+        data={"message": "hello", "level": "error", "tags": {"foo": "value-0"}},
+        project_id=default_project.id,
+    )
+    return RuleProcessor(
+        event,
+        is_new=False,
+        is_regression=False,
+        is_new_group_environment=False,
+        has_reappeared=False,
+    )
+
+
+@requires_pytest_benchmark
+@pytest.mark.django_db
+def test_benchmark_apply(benchmark, rule_processor):
+    assert not benchmark(lambda: list(rule_processor.apply()))
+
+
+@requires_pytest_benchmark
+@pytest.mark.django_db
+def test_benchmark_bulk_get_rule_status(benchmark, rule_processor, rules):
+    def setup():
+        # Every round fetches all statuses from the database.
+        cache.clear()
+        return (rules,), {}
+
+    rule_statuses = benchmark.pedantic(rule_processor.bulk_get_rule_status, setup=setup, rounds=20)
+    assert len(rule_statuses) == RULES
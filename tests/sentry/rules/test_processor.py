@@ -11,8 +11,9 @@ from sentry.models import GroupRuleStatus, GroupStatus, Rule, RuleFireHistory
 from sentry.notifications.types import ActionTargetType
 from sentry.rules import init_registry
 from sentry.rules.conditions import EventCondition
+from sentry.rules.conditions.every_event import EveryEventCondition
 from sentry.rules.filters.base import EventFilter
-from sentry.rules.processor import RuleProcessor
+from sentry.rules.processor import RuleProcessor, get_compiled_rules
 from sentry.testutils import TestCase
 
 EMAIL_ACTION_DATA = {
@@ -167,6 +168,32 @@ class RuleProcessorTest(TestCase):
             # creates no rows.
             self.run_query_test(rp, 2)
 
+    def test_compiled_rules(self):
+        rp = RuleProcessor(
+            self.event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+        )
+        compiled_rule = get_compiled_rules(self.project, [self.rule])[0]
+        assert compiled_rule.conditions == ((EVERY_EVENT_COND_DATA, EveryEventCondition),)
+        assert compiled_rule.filters == ()
+
+        # Rules are only compiled once per version of the rule
+        rule = Rule.objects.get(id=self.rule.id)
+        assert get_compiled_rules(self.project, [rule])[0] is compiled_rule
+
+        self.rule.update(
+            data={
+                "conditions": [EVERY_EVENT_COND_DATA],
+                "action_match": "none",
+                "actions": [EMAIL_ACTION_DATA],
+            }
+        )
+        assert get_compiled_rules(self.project, [self.rule])[0] is not compiled_rule
+        assert len(list(rp.apply())) == 0
+
     @patch(
         "sentry.constants._SENTRY_RULES",
         [
@@ -0,0 +1,133 @@
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+import pytest
+from arroyo.backends.kafka import KafkaPayload
+from arroyo.types import Message, Partition, Topic
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from sentry.sentry_metrics.configuration import UseCaseKey
+from sentry.sentry_metrics.consumers.indexer.batch import IndexerBatch
+from sentry.sentry_metrics.indexer.base import KeyCollection
+from sentry.sentry_metrics.indexer.models import StringIndexer
+from sentry.sentry_metrics.indexer.postgres_v2 import PGStringIndexerV2
+from sentry.testutils.skips import requires_pytest_benchmark
+from sentry.utils import json
+
+pytestmark = pytest.mark.sentry_metrics
+
+ORGS = 10
+STRINGS_PER_ORG = 1000
+USE_CASE_ID = UseCaseKey.RELEASE_HEALTH
+
+MESSAGES = 10000
+
+
+@pytest.fixture
+def keys():
+    # 10k keys, half of which exist.
+    StringIndexer.objects.bulk_create(
+        StringIndexer(organization_id=org_id, string=f"string-{i}")
+        for org_id in range(1, ORGS + 1)
+        for i in range(0, STRINGS_PER_ORG, 2)
+    )
+    return KeyCollection(
+        {org_id: {f"string-{i}" for i in range(STRINGS_PER_ORG)} for org_id in range(1, ORGS + 1)}
+    )
+
+
+def get_db_records_or_chained(keys):
+    # The previous lookup, with one condition per key.
+    query_statement = reduce(
+        or_,
+        (
+            Q(organization_id=organization_id, string=string)
+            for organization_id, string in keys.as_tuples()
+        ),
+    )
+    return list(StringIndexer.objects.filter(query_statement))
+
+
+def measure_sql(fn):
+    with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+        records = fn()
+    return records, sum(len(query["sql"]) for query in queries)
+
+
+@pytest.mark.django_db
+def test_get_db_records_sql_size(keys):
+    records, sql_size = measure_sql(
+        lambda: list(PGStringIndexerV2()._get_db_records(USE_CASE_ID, keys))
+    )
+    or_chained_records, or_chained_sql_size = measure_sql(lambda: get_db_records_or_chained(keys))
+
+    assert len(records) == ORGS * STRINGS_PER_ORG // 2
+    assert {r.id for r in records} == {r.id for r in or_chained_records}
+    assert sql_size < or_chained_sql_size / 2
+
+
+@requires_pytest_benchmark
+@pytest.mark.django_db
+def test_benchmark_get_db_records(benchmark, keys):
+    indexer = PGStringIndexerV2()
+    benchmark(lambda: list(indexer._get_db_records(USE_CASE_ID, keys)))
+
+
+@requires_pytest_benchmark
+@pytest.mark.django_db
+def test_benchmark_get_db_records_or_chained(benchmark, keys):
+    benchmark(lambda: get_db_records_or_chained(keys))
+
+
+def make_outer_message():
+    partition = Partition(Topic("topic"), 0)
+    messages = [
+        Message(
+            partition,
+            offset,
+            KafkaPayload(
+                None,
+                json.dumps(
+                    {
+                        "name": f"d:sessions/duration{offset % 100}@second",
+                        "tags": {
+                            "environment": "production",
+                            "release": f"1.0.{offset % 1000}",
+                            "session.status": "exited",
+                        },
+                        "timestamp": 1654000000 + offset,
+                        "type": "d",
+                        "value": [1.5 * i for i in range(offset % 20)],
+                        "org_id": offset % ORGS + 1,
+                        "project_id": 3,
+                    }
+                ).encode("utf-8"),
+                [],
+            ),
+            datetime.now(),
+        )
+        for offset in range(MESSAGES)
+    ]
+    return Message(partition, MESSAGES - 1, messages, datetime.now())
+
+
+@requires_pytest_benchmark
+@pytest.mark.parametrize("partial_parse", [False, True])
+def test_benchmark_indexer_batch(benchmark, partial_parse):
+    outer_message = make_outer_message()
+    org_strings, _ = IndexerBatch(USE_CASE_ID, outer_message).extract_strings()
+    mapping = {
+        org_id: {string: i for i, string in enumerate(strings)}
+        for org_id, strings in org_strings.items()
+    }
+
+    def process():
+        batch = IndexerBatch(USE_CASE_ID, outer_message, partial_parse=partial_parse)
+        batch.extract_strings()
+        return batch.reconstruct_messages(mapping, {})
+
+    assert len(benchmark(process)) == MESSAGES
+    benchmark.extra_info["messages_per_second"] = MESSAGES / benchmark.stats.stats.mean
@@ -1,7 +1,9 @@
+from unittest import mock
+
 import pytest
 
 from sentry.sentry_metrics.configuration import UseCaseKey
-from sentry.sentry_metrics.indexer.cache import indexer_cache
+from sentry.sentry_metrics.indexer.cache import StringIndexerCache, indexer_cache
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 
@@ -64,3 +66,35 @@ def test_separate_namespacing() -> None:
     indexer_cache.set("a", 2, UseCaseKey.PERFORMANCE.value)
     assert indexer_cache.get("a", UseCaseKey.RELEASE_HEALTH.value) == 1
     assert indexer_cache.get("a", UseCaseKey.PERFORMANCE.value) == 2
+
+
+def test_local_cache(use_case_id: str) -> None:
+    cache.clear()
+    local_cache = StringIndexerCache(version=1, cache_name="default", local_cache_size=10)
+
+    local_cache.set("a", 1, use_case_id)
+    local_cache.set_many({"b": 2, "c": 3}, use_case_id)
+
+    # Values written through the cache are served without the shared cache.
+    with mock.patch.object(local_cache, "cache") as shared_cache:
+        assert local_cache.get("a", use_case_id) == 1
+        assert local_cache.get_many(["b", "c"], use_case_id) == {"b": 2, "c": 3}
+        assert not shared_cache.get.called
+        assert not shared_cache.get_many.called
+
+    # Values only in the shared cache are fetched and kept locally.
+    indexer_cache.set("d", 4, use_case_id)
+    assert local_cache.get_many(["a", "d", "e"], use_case_id) == {"a": 1, "d": 4, "e": None}
+    with mock.patch.object(local_cache, "cache") as shared_cache:
+        shared_cache.get.return_value = None
+        assert local_cache.get("d", use_case_id) == 4
+        assert local_cache.get("d", UseCaseKey.PERFORMANCE.value) is None
+
+    local_cache.delete("a", use_case_id)
+    local_cache.delete_many(["b", "d"], use_case_id)
+    assert local_cache.get_many(["a", "b", "c", "d"], use_case_id) == {
+        "a": None,
+        "b": None,
+        "c": 3,
+        "d": None,
+    }
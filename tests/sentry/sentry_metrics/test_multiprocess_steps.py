@@ -9,11 +9,17 @@ from unittest.mock import Mock, call, patch
 import pytest
 from arroyo.backends.kafka import KafkaPayload
 from arroyo.processing.strategies import MessageRejected
+from arroyo.processing.strategies.streaming.transform import ValueTooLarge
 from arroyo.types import Message, Partition, Topic
 
 from sentry.sentry_metrics.configuration import UseCaseKey, get_ingest_config
-from sentry.sentry_metrics.consumers.indexer.batch import invalid_metric_tags, valid_metric_name
+from sentry.sentry_metrics.consumers.indexer.batch import (
+    invalid_metric_tags,
+    parse_partial_payload,
+    valid_metric_name,
+)
 from sentry.sentry_metrics.consumers.indexer.common import (
+    AdaptiveBatchSize,
     BatchMessages,
     DuplicateMessage,
     MetricsBatchBuilder,
@@ -139,6 +145,109 @@ def test_batch_messages_join():
     assert not next_step.submit.called
 
 
+def test_batch_messages_adaptive_batch_size():
+    next_step = Mock()
+    adaptive_batch_size = AdaptiveBatchSize(min_batch_size=1, max_batch_size=4)
+    adaptive_batch_size.batch_size = 2
+    batch_messages_step = BatchMessages(
+        next_step=next_step,
+        max_batch_time=100.0,
+        max_batch_size=4,
+        adaptive_batch_size=adaptive_batch_size,
+    )
+    messages = [
+        Message(Partition(Topic("topic"), 0), i, KafkaPayload(None, b"x" * i, []), datetime.now())
+        for i in range(10)
+    ]
+
+    # The next step pushes back, so the batch size grows once the batch is
+    # accepted.
+    next_step.submit.side_effect = MessageRejected()
+    batch_messages_step.submit(message=messages[0])
+    with pytest.raises(MessageRejected):
+        batch_messages_step.submit(message=messages[1])
+    assert adaptive_batch_size.batch_size == 2
+
+    next_step.submit.side_effect = None
+    batch_messages_step.poll()
+    assert next_step.submit.call_count == 2
+    assert adaptive_batch_size.batch_size == 4
+    assert adaptive_batch_size.largest_message_size == 1
+
+    # Without back pressure it shrinks again, down to the minimum.
+    for message in messages[2:6]:
+        batch_messages_step.submit(message=message)
+    assert next_step.submit.call_count == 3
+    assert adaptive_batch_size.batch_size == 3
+    assert adaptive_batch_size.largest_message_size == 5
+
+    for _ in range(100):
+        adaptive_batch_size.record_batch(MetricsBatchBuilder(1, 100.0))
+    assert adaptive_batch_size.batch_size == 1
+
+
+def test_adaptive_block_size():
+    adaptive_batch_size = AdaptiveBatchSize(min_batch_size=10, max_batch_size=1000)
+    # Nothing is known about the messages yet
+    assert adaptive_batch_size.get_block_size(32000000) == 32000000
+
+    batch = MetricsBatchBuilder(1, 100.0)
+    batch.append(
+        Message(Partition(Topic("topic"), 0), 1, KafkaPayload(None, b"x" * 488, []), datetime.now())
+    )
+    adaptive_batch_size.record_batch(batch)
+    assert adaptive_batch_size.get_block_size(32000000) == 4 * 1000 * 1000
+    assert adaptive_batch_size.get_block_size(2000000) == 2000000
+
+    adaptive_batch_size.record_overflow()
+    assert adaptive_batch_size.get_block_size(32000000) == 32000000
+
+
+def test_batch_messages_adaptive_overflow():
+    submitted = []
+
+    def submit(message):
+        if len(message.payload) > 2:
+            raise ValueTooLarge()
+        if len(submitted) == 1:
+            submitted.append(None)
+            raise MessageRejected()
+        submitted.append([m.offset for m in message.payload])
+        assert message.offset == message.payload[-1].offset
+
+    next_step = Mock()
+    next_step.submit.side_effect = submit
+    adaptive_batch_size = AdaptiveBatchSize(min_batch_size=1, max_batch_size=5)
+    batch_messages_step = BatchMessages(
+        next_step=next_step,
+        max_batch_time=100.0,
+        max_batch_size=5,
+        adaptive_batch_size=adaptive_batch_size,
+    )
+    messages = [
+        Message(Partition(Topic("topic"), 0), i, KafkaPayload(None, b"x", []), datetime.now())
+        for i in range(5)
+    ]
+
+    # The batch is split until the halves fit, and only the messages that
+    # were not submitted yet are retried after back pressure.
+    for message in messages[:4]:
+        batch_messages_step.submit(message=message)
+    with pytest.raises(MessageRejected):
+        batch_messages_step.submit(message=messages[4])
+    assert adaptive_batch_size.overflowed
+    assert submitted == [[0, 1], None]
+
+    batch_messages_step.submit(message=messages[4])
+    assert submitted == [[0, 1], None, [2], [3, 4]]
+    assert adaptive_batch_size.get_block_size(32000000) == 32000000
+
+    next_step.submit.side_effect = ValueTooLarge()
+    batch_messages_step = BatchMessages(next_step=next_step, max_batch_time=100.0, max_batch_size=1)
+    with pytest.raises(ValueTooLarge):
+        batch_messages_step.submit(message=messages[0])
+
+
 def test_metrics_batch_builder():
     max_batch_time = 3.0  # seconds
     max_batch_size = 2
@@ -260,8 +369,9 @@ def __translated_payload(
     return payload
 
 
+@pytest.mark.parametrize("partial_parse", [False, True])
 @patch("sentry.sentry_metrics.consumers.indexer.processing.get_indexer", return_value=MockIndexer())
-def test_process_messages(mock_indexer) -> None:
+def test_process_messages(mock_indexer, partial_parse) -> None:
     message_payloads = [counter_payload, distribution_payload, set_payload]
     message_batch = [
         Message(
@@ -276,7 +386,11 @@ def test_process_messages(mock_indexer) -> None:
     last = message_batch[-1]
     outer_message = Message(last.partition, last.offset, message_batch, last.timestamp)
 
-    new_batch = process_messages(use_case_id=UseCaseKey.RELEASE_HEALTH, outer_message=outer_message)
+    new_batch = process_messages(
+        use_case_id=UseCaseKey.RELEASE_HEALTH,
+        outer_message=outer_message,
+        partial_parse=partial_parse,
+    )
     expected_new_batch = [
         Message(
             m.partition,
@@ -377,9 +491,10 @@ invalid_payloads = [
 ]
 
 
+@pytest.mark.parametrize("partial_parse", [False, True])
 @pytest.mark.parametrize("invalid_payload, error_text, format_payload", invalid_payloads)
 def test_process_messages_invalid_messages(
-    invalid_payload, error_text, format_payload, caplog
+    invalid_payload, error_text, format_payload, partial_parse, caplog
 ) -> None:
     """
     Test the following kinds of invalid payloads:
@@ -421,7 +536,9 @@ def test_process_messages_invalid_messages(
         return_value=MockIndexer(),
     ):
         new_batch = process_messages(
-            use_case_id=UseCaseKey.RELEASE_HEALTH, outer_message=outer_message
+            use_case_id=UseCaseKey.RELEASE_HEALTH,
+            outer_message=outer_message,
+            partial_parse=partial_parse,
         )
 
     # we expect just the valid counter_payload msg to be left
@@ -457,3 +574,40 @@ def test_invalid_metric_tags() -> None:
     assert invalid_metric_tags(tags) == [bad_tag]
     tags["release"] = None
     assert invalid_metric_tags(tags) == [None]
+
+
+def test_parse_partial_payload() -> None:
+    payload = parse_partial_payload(
+        b'{"name": "c:sessions/session@none", "tags": {"environment": "production"}, '
+        b'"value": [1, 2.5e3], "type": "c", "org_id": 1, "metric_id": 5}'
+    )
+    assert payload is not None
+    assert payload.name == "c:sessions/session@none"
+    assert payload.org_id == 1
+    assert payload.type == "c"
+    assert payload.tags == {"environment": "production"}
+    assert payload.members == [b'"value": [1, 2.5e3]', b'"type": "c"', b'"org_id": 1']
+    assert json.loads(payload.splice({"tags": {"1": 2}, "metric_id": 3})) == {
+        "value": [1, 2.5e3],
+        "type": "c",
+        "org_id": 1,
+        "tags": {"1": 2},
+        "metric_id": 3,
+    }
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 1, "value": {"a": [1]}}', id="nested"),
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 1, "va\\u006cue": 1}', id="escaped"),
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 1, "org_id": 2}', id="duplicate"),
+        pytest.param(b'{"name": "a", "type": "c"}', id="missing"),
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 1, "tags": []}', id="tags"),
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 1} []', id="trailing"),
+        pytest.param(b'{"name": "a", "type": "c", "org_id": 01}', id="invalid"),
+        pytest.param(b"{}", id="empty"),
+    ],
+)
+def test_parse_partial_payload_fallback(payload) -> None:
+    assert parse_partial_payload(payload) is None
@@ -1,6 +1,8 @@
 from typing import Mapping, Set, Tuple
 
 import pytest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
 
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.indexer.base import KeyCollection, KeyResult, KeyResults
@@ -260,11 +262,29 @@ class PostgresIndexerV2Test(TestCase):
         assert indexer_cache.get(key, self.cache_namespace) is None
         assert indexer_cache.get(string.id, self.cache_namespace) is None
 
-        self.indexer._get_db_records(self.use_case_id, collection)
+        assert list(self.indexer._get_db_records(self.use_case_id, collection)) == [string]
 
         assert indexer_cache.get(string.id, self.cache_namespace) is None
         assert indexer_cache.get(key, self.cache_namespace) is None
 
+    def test_get_db_records_chunked(self):
+        strings = {
+            (org_id, string): StringIndexer.objects.create(organization_id=org_id, string=string)
+            for org_id in (123, 456)
+            for string in ("a", "b", "c")
+        }
+        collection = KeyCollection({123: {"a", "b", "c", "d"}, 456: {"b", "c", "e"}})
+
+        with self.settings(SENTRY_METRICS_INDEXER_DB_LOOKUP_CHUNK_SIZE=3), CaptureQueriesContext(
+            connections[DEFAULT_DB_ALIAS]
+        ) as queries:
+            records = list(self.indexer._get_db_records(self.use_case_id, collection))
+
+        assert len(queries) == 3
+        assert sorted(records, key=lambda r: r.id) == sorted(
+            (strings[key] for key in strings if key != (456, "a")), key=lambda r: r.id
+        )
+
 
 class KeyCollectionTest(TestCase):
     def test_no_data(self) -> None:
@@ -4,7 +4,7 @@ from unittest import TestCase, mock
 
 import pytz
 
-from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, BaseTSDB
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, BaseTSDB, CounterSeries
 from sentry.utils.dates import to_timestamp
 
 
@@ -39,6 +39,32 @@ class BaseTSDBTest(TestCase):
         assert len(post_results) == 1
         assert post_results[1] == [[1368889200, 15], [1368892800, 7]]
 
+    def test_rollup_mixed_timestamps(self):
+        pre_results = {
+            1: [(1368889980, 5), (1368890040, 10), (1368893640, 7)],
+            2: [(1368893640, 1), (1368897240, 2)],
+            3: [],
+            4: [(1368889980, 1), (1368890040, 1), (1368893640, 1)],
+        }
+        assert self.tsdb.rollup(pre_results, 3600) == {
+            1: [[1368889200, 15], [1368892800, 7]],
+            2: [[1368892800, 1], [1368896400, 2]],
+            3: [],
+            4: [[1368889200, 2], [1368892800, 1]],
+        }
+
+    def test_counter_series(self):
+        values = {
+            1: [(1368889980, 5), (1368890040, 10)],
+            2: [(1368889980, 0), (1368890040, 3)],
+            3: [(1368890040, 1)],
+        }
+        series = CounterSeries.from_points(values)
+        assert [s.timestamps for s in series] == [[1368889980, 1368890040], [1368890040]]
+        assert series[0].sums() == {1: 15, 2: 3}
+        assert series[1].sums() == {3: 1}
+        assert {k: v for s in series for k, v in s.to_points().items()} == values
+
     def test_calculate_expiry(self):
         timestamp = datetime(2013, 5, 18, 15, 13, 58, 132928, tzinfo=pytz.UTC)
         result = self.tsdb.calculate_expiry(10, 30, timestamp)
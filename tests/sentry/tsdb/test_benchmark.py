@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from sentry.testutils.skips import requires_pytest_benchmark
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, BaseTSDB, CounterSeries
+
+GROUPS = 1000
+DAYS = 90
+
+TSDB = BaseTSDB(rollups=((ONE_HOUR, 24 * DAYS), (ONE_DAY, DAYS)))
+END = datetime(2022, 6, 1, tzinfo=pytz.utc)
+START = END - timedelta(days=DAYS - 1)
+
+
+def make_values(rollup):
+    _, timestamps = TSDB.get_optimal_rollup_series(START, END, rollup)
+    return {
+        group_id: [(timestamp, (group_id * i) % 7) for i, timestamp in enumerate(timestamps)]
+        for group_id in range(GROUPS)
+    }
+
+
+@requires_pytest_benchmark
+def test_benchmark_make_series(benchmark):
+    benchmark(lambda: TSDB.make_series(0, START, END, ONE_DAY))
+
+
+@requires_pytest_benchmark
+def test_benchmark_rollup_daily(benchmark):
+    values = make_values(ONE_HOUR)
+    result = benchmark(TSDB.rollup, values, ONE_DAY)
+    assert len(result) == GROUPS
+    assert len(result[0]) == DAYS
+
+
+@requires_pytest_benchmark
+def test_benchmark_sums(benchmark):
+    series = CounterSeries.from_points(make_values(ONE_DAY))
+
+    def sums():
+        result = {}
+        for s in series:
+            result.update(s.sums())
+        return result
+
+    assert len(benchmark(sums)) == GROUPS
+
+
+@requires_pytest_benchmark
+def test_benchmark_to_points(benchmark):
+    (series,) = CounterSeries.from_points(make_values(ONE_DAY))
+    result = benchmark(series.to_points)
+    assert len(result) == GROUPS
+    assert len(result[0]) == DAYS
@@ -188,6 +188,40 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_incr_multi_item_options(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.incr_multi(
+            [
+                (TSDBModel.project, 1, {"timestamp": dts[0], "environment_id": 1}),
+                (TSDBModel.project, 1, {"timestamp": dts[1], "environment_id": 2, "count": 2}),
+                (TSDBModel.project, 2, {"timestamp": dts[1]}),
+                (TSDBModel.group, 3, {"timestamp": dts[1], "environment_id": 1}),
+            ]
+        )
+
+        assert self.db.get_range(TSDBModel.project, [1, 2], dts[0], dts[-1]) == {
+            1: [(timestamp(dts[0]), 1), (timestamp(dts[1]), 2)],
+            2: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 1)],
+        }
+        assert self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1], environment_ids=[1]) == {
+            1: [(timestamp(dts[0]), 1), (timestamp(dts[1]), 0)]
+        }
+        assert self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1], environment_ids=[2]) == {
+            1: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 2)]
+        }
+        assert self.db.get_range(TSDBModel.group, [3], dts[0], dts[-1], environment_ids=[1]) == {
+            3: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 1)]
+        }
+
+        hash_key, _ = self.db.make_counter_key(TSDBModel.project, 10, dts[1], 1, None)
+        assert self.db.cluster.get_local_client_for_key(hash_key).ttl(hash_key) > 0
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -326,6 +360,36 @@ class RedisTSDBTest(TestCase):
         )
         assert results == {1: 0, 2: 0}
 
+    def test_record_multi_item_options(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(2)]
+
+        model = TSDBModel.users_affected_by_group
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        self.db.record_multi(
+            [
+                (model, 1, ("foo", "bar"), {"timestamp": dts[0], "environment_id": 1}),
+                (model, 1, ("baz",), {"timestamp": dts[1], "environment_id": 2}),
+                (model, 2, ("foo",)),
+            ],
+            timestamp=dts[1],
+        )
+
+        assert self.db.get_distinct_counts_series(model, [1, 2], dts[0], dts[-1], rollup=3600) == {
+            1: [(timestamp(dts[0]), 2), (timestamp(dts[1]), 1)],
+            2: [(timestamp(dts[0]), 0), (timestamp(dts[1]), 1)],
+        }
+        assert self.db.get_distinct_counts_series(
+            model, [1], dts[0], dts[-1], rollup=3600, environment_id=1
+        ) == {1: [(timestamp(dts[0]), 2), (timestamp(dts[1]), 0)]}
+        assert self.db.get_distinct_counts_totals(
+            model, [1], dts[0], dts[-1], rollup=3600, environment_id=2
+        ) == {1: 1}
+
     def test_frequency_tables(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC)
         model = TSDBModel.frequent_issues_by_project
@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta
+from unittest import mock
 
 import pytz
+from django.core.cache import cache
+from freezegun import freeze_time
 
 from sentry.constants import DataCategory
+from sentry.testutils import TestCase
 from sentry.testutils.cases import OutcomesSnubaTest
+from sentry.testutils.helpers import override_options
 from sentry.tsdb.base import TSDBModel
 from sentry.tsdb.snuba import SnubaTSDB
-from sentry.utils.dates import to_timestamp
+from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.outcomes import Outcome
 
 
@@ -473,3 +478,127 @@ class SnubaTSDBTest(OutcomesSnubaTest):
         ]
         for model in models:
             assert model in SnubaTSDB.model_query_settings
+
+
+@freeze_time("2022-01-10 12:30:00")
+class SnubaTSDBBucketCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = SnubaTSDB()
+        self.now = datetime(2022, 1, 10, 12, 30, tzinfo=pytz.utc)
+        self.query = mock.Mock(side_effect=self.run_query)
+        cache.clear()
+
+    def run_query(self, start, end, limit):
+        # Every bucket of the queried range holds its hour, except for the
+        # latest one which is still being filled.
+        return {
+            1: {
+                bucket: to_datetime(bucket).hour
+                for bucket in range(int(to_timestamp(start)), int(to_timestamp(end)), 3600)
+            }
+        }
+
+    def get_data(self, hours, end=None):
+        _, series = self.db.get_optimal_rollup_series(
+            (end or self.now) - timedelta(hours=hours), end or self.now, 3600
+        )
+        result = self.db.get_data_with_bucket_cache(self.query, ["shape"], [1], series, 3600)
+        assert result == {1: {bucket: to_datetime(bucket).hour for bucket in series}}
+        return series
+
+    def test_tail(self):
+        series = self.get_data(hours=24)
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[0]), end=to_datetime(series[-1] + 3600), limit=25
+        )
+
+        # Only the bucket that is still being filled is queried again.
+        self.get_data(hours=24)
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[-1]), end=to_datetime(series[-1] + 3600), limit=1
+        )
+
+        # Buckets are shared with longer windows, the gap is queried.
+        series = self.get_data(hours=48)
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[0]), end=to_datetime(series[-1] + 3600), limit=49
+        )
+        self.get_data(hours=48)
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[-1]), end=to_datetime(series[-1] + 3600), limit=1
+        )
+
+    def test_completed_entirely_cached(self):
+        end = self.now - timedelta(hours=2)
+        self.get_data(hours=4, end=end)
+        assert self.query.call_count == 1
+        self.get_data(hours=4, end=end)
+        assert self.query.call_count == 1
+
+    def test_bucket_boundary(self):
+        with freeze_time("2022-01-10 12:04:59"):
+            # The bucket of 11:00 only ended 5 minutes ago.
+            self.now = datetime(2022, 1, 10, 12, 4, 59, tzinfo=pytz.utc)
+            series = self.get_data(hours=4)
+            self.get_data(hours=4)
+            assert self.query.call_args == mock.call(
+                start=to_datetime(series[-2]), end=to_datetime(series[-1] + 3600), limit=2
+            )
+
+        with freeze_time("2022-01-10 12:05:00"):
+            self.now = datetime(2022, 1, 10, 12, 5, tzinfo=pytz.utc)
+            self.get_data(hours=4)
+            self.get_data(hours=4)
+            assert self.query.call_args == mock.call(
+                start=to_datetime(series[-1]), end=to_datetime(series[-1] + 3600), limit=1
+            )
+
+    def test_stale_buckets(self):
+        end = self.now - timedelta(hours=2)
+        self.get_data(hours=4, end=end)
+
+        with freeze_time(self.now + timedelta(minutes=6)):
+            series = self.get_data(hours=5, end=end + timedelta(hours=1))
+            assert self.query.call_args == mock.call(
+                start=to_datetime(series[-1]), end=to_datetime(series[-1] + 3600), limit=1
+            )
+
+        # Caching the newer bucket didn't extend the lifetime of the older ones.
+        with freeze_time(self.now + timedelta(minutes=11)):
+            series = self.get_data(hours=5, end=end + timedelta(hours=1))
+            assert self.query.call_args == mock.call(
+                start=to_datetime(series[0]), end=to_datetime(series[-1] + 3600), limit=6
+            )
+
+    @override_options({"system.event-retention-days": 1})
+    def test_retention_cutoff(self):
+        # The bucket of 12:00 on the previous day straddles the retention
+        # cutoff, the ones before it are expired and empty.
+        _, series = self.db.get_optimal_rollup_series(
+            self.now - timedelta(hours=48), self.now, 3600
+        )
+        result = self.db.get_data_with_bucket_cache(self.query, ["shape"], [1], series, 3600)
+        assert result[1][series[0]] == 0
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[24]), end=to_datetime(series[-1] + 3600), limit=25
+        )
+
+        self.db.get_data_with_bucket_cache(self.query, ["shape"], [1], series, 3600)
+        assert self.query.call_args == mock.call(
+            start=to_datetime(series[24]), end=to_datetime(series[-1] + 3600), limit=25
+        )
+
+    @override_options({"snuba.tsdb.bucket-cache": True})
+    @mock.patch("sentry.utils.snuba.query")
+    def test_get_range(self, query):
+        query.side_effect = lambda **kwargs: self.run_query(
+            kwargs["start"], kwargs["end"], kwargs["limit"]
+        )
+        start = self.now - timedelta(hours=4)
+        expected = {1: [(bucket, to_datetime(bucket).hour) for bucket in self.get_data(hours=4)]}
+
+        assert self.db.get_range(TSDBModel.group, [1], start, self.now, rollup=3600) == expected
+        assert self.db.get_range(TSDBModel.group, [1], start, self.now, rollup=3600) == expected
+        assert query.call_count == 2
+        assert query.call_args[1]["start"] == to_datetime(expected[1][-1][0])
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from sentry.utils.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert len(cache) == 2
+
+
+def test_lru_cache_bounded_by_size():
+    cache = LRUCache(max_size=10, sizeof=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("c", "cccc")
+    assert cache.get("a") is None
+    assert cache.size == 8
+
+    # values larger than the cache are never stored
+    cache.set("b", "b" * 11)
+    assert cache.get("b") is None
+    assert cache.size == 4
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(max_size=10, ttl=60)
+    with mock.patch("time.monotonic", return_value=100):
+        cache.set("a", 1)
+    with mock.patch("time.monotonic", return_value=159):
+        assert cache.get("a") == 1
+    with mock.patch("time.monotonic", return_value=160):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_copy():
+    cache = LRUCache(max_size=10, copy=dict)
+    value = {"foo": "bar"}
+    cache.set("a", value)
+    value["foo"] = "baz"
+    cache.get("a")["foo"] = "qux"
+    assert cache.get("a") == {"foo": "bar"}
+
+
+def test_lru_cache_delete():
+    cache = LRUCache(max_size=10)
+    cache.set_many({"a": 1, "b": 2, "c": 3})
+    cache.delete("a")
+    cache.delete_many(["b", "d"])
+    assert cache.get_many(["a", "b", "c"]) == {"c": 3}
+    cache.clear()
+    assert cache.get("c") is None
+    assert cache.size == 0
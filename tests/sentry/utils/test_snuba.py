@@ -1,23 +1,38 @@
+import io
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from unittest import mock
 
 import pytest
 import pytz
+import urllib3
+from django.core.cache import cache
 from django.utils import timezone
+from freezegun import freeze_time
 
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+from sentry.utils import json, redis
 from sentry.utils.snuba import (
     Dataset,
+    RateLimitExceeded,
     SnubaQueryParams,
+    SnubaStreamingResult,
+    UnexpectedResponseError,
     UnqualifiedQueryError,
+    _apply_cache_and_build_results,
     _prepare_query_params,
+    _single_flight,
+    get_cache_key,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
     get_snuba_translators,
     quantize_time,
+    raw_snql_query_stream,
 )
 
 
@@ -374,3 +389,181 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+class SingleFlightTest(TestCase):
+    query = ({"query": "MATCH (events) SELECT count()"}, None, None)
+    result = {"data": [{"count": 1}]}
+
+    def setUp(self):
+        self.cache_key = get_cache_key(self.query[0])
+        cache.delete(self.cache_key)
+
+    @override_options({"snuba.single-flight": "local"})
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_local(self, bulk_snuba_query):
+        release = threading.Event()
+
+        def query(params, headers):
+            release.wait(5)
+            return [self.result for _ in params]
+
+        bulk_snuba_query.side_effect = query
+
+        with mock.patch.object(_single_flight, "join", wraps=_single_flight.join) as join:
+            with ThreadPoolExecutor(max_workers=5) as pool:
+                futures = [
+                    pool.submit(
+                        _apply_cache_and_build_results, [self.query], "test", use_cache=True
+                    )
+                    for _ in range(5)
+                ]
+                while join.call_count < 5:
+                    release.wait(0.01)
+                release.set()
+                results = [future.result() for future in futures]
+
+        assert results == [[self.result]] * 5
+        assert bulk_snuba_query.call_count == 1
+
+    @override_options({"snuba.single-flight": "redis"})
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_redis(self, bulk_snuba_query):
+        client = redis.redis_clusters.get("default")
+        lease_key = f"{self.cache_key}:lease"
+
+        # Another process is executing the query.
+        client.set(lease_key, 1, ex=10)
+        timer = threading.Timer(0.1, cache.set, [self.cache_key, json.dumps(self.result)])
+        timer.start()
+        try:
+            assert _apply_cache_and_build_results([self.query], "test", use_cache=True) == [
+                self.result
+            ]
+        finally:
+            timer.cancel()
+            client.delete(lease_key)
+        assert bulk_snuba_query.call_count == 0
+
+        # The lease is taken and released by the process executing the query.
+        cache.delete(self.cache_key)
+        bulk_snuba_query.return_value = [self.result]
+        assert _apply_cache_and_build_results([self.query], "test", use_cache=True) == [self.result]
+        assert bulk_snuba_query.call_count == 1
+        assert not client.exists(lease_key)
+
+
+class StaleWhileRevalidateTest(TestCase):
+    query = ({"query": "MATCH (events) SELECT count()"}, None, None)
+
+    def setUp(self):
+        cache.delete_many([get_cache_key(self.query[0]) + suffix for suffix in ["", ":swr"]])
+        cache.delete(get_cache_key(self.query[0]) + ":swr:refresh")
+
+    @override_options(
+        {"snuba.cache.stale-while-revalidate": {"test": {"soft_ttl": 10, "hard_ttl": 100}}}
+    )
+    @mock.patch("sentry.utils.snuba._cache_refresh_pool")
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_stale_while_revalidate(self, bulk_snuba_query, refresh_pool):
+        refresh_pool.submit.side_effect = lambda fn, *args: fn(*args)
+
+        def query():
+            return _apply_cache_and_build_results([self.query], "test", use_cache=True)
+
+        with freeze_time("2022-01-10 12:00:00"):
+            bulk_snuba_query.return_value = [{"data": [{"count": 1}]}]
+            assert query() == [{"data": [{"count": 1}]}]
+            assert bulk_snuba_query.call_count == 1
+
+        with freeze_time("2022-01-10 12:00:09"):
+            bulk_snuba_query.return_value = [{"data": [{"count": 2}]}]
+            assert query() == [{"data": [{"count": 1}]}]
+            assert bulk_snuba_query.call_count == 1
+
+            # Other referrers don't share the cached result.
+            assert _apply_cache_and_build_results([self.query], "other", use_cache=True) == [
+                {"data": [{"count": 2}]}
+            ]
+            assert bulk_snuba_query.call_count == 2
+
+        with freeze_time("2022-01-10 12:00:10"):
+            # The stale result is served and refreshed in the background.
+            assert query() == [{"data": [{"count": 1}]}]
+            assert refresh_pool.submit.call_count == 1
+            assert bulk_snuba_query.call_count == 3
+            assert query() == [{"data": [{"count": 2}]}]
+            assert refresh_pool.submit.call_count == 1
+
+
+def make_response(body, status=200):
+    return urllib3.HTTPResponse(
+        body=io.BytesIO(json.dumps(body).encode("utf-8")),
+        status=status,
+        preload_content=False,
+    )
+
+
+@mock.patch("sentry.utils.snuba.STREAM_CHUNK_SIZE", 7)
+class SnubaStreamingResultTest(unittest.TestCase):
+    body = {
+        "data": [{"id": i, "message": f"ünïcode {i}", "value": i / 3} for i in range(20)],
+        "meta": [{"name": "id"}, {"name": "message"}, {"name": "value"}],
+        "timing": {"duration_ms": 12345},
+    }
+
+    def reverse(self, row):
+        return {**row, "reversed": True}
+
+    def test_rows(self):
+        result = SnubaStreamingResult(make_response(self.body), self.reverse)
+        rows = iter(result)
+        assert next(rows) == self.reverse(self.body["data"][0])
+        # Keys that follow the rows have not been decoded yet.
+        assert result._values == {}
+        assert list(rows) == [self.reverse(row) for row in self.body["data"][1:]]
+        assert result.get("meta") == self.body["meta"]
+        assert result.get("timing") == self.body["timing"]
+        assert result.get("missing") is None
+
+        with pytest.raises(RuntimeError):
+            iter(result)
+
+    def test_get_before_rows(self):
+        result = SnubaStreamingResult(make_response(self.body), self.reverse)
+        assert result.get("meta") == self.body["meta"]
+        assert list(result) == [self.reverse(row) for row in self.body["data"]]
+
+    def test_empty(self):
+        result = SnubaStreamingResult(make_response({"data": [], "meta": []}), self.reverse)
+        assert list(result) == []
+        assert result.get("meta") == []
+
+    def test_close(self):
+        response = make_response(self.body)
+        with SnubaStreamingResult(response, self.reverse) as result:
+            rows = iter(result)
+            next(rows)
+        assert response.closed
+        assert list(rows) == []
+
+    def test_invalid_json(self):
+        response = urllib3.HTTPResponse(
+            body=io.BytesIO(b'{"data": [{"id": 1}, {"id": '), status=200, preload_content=False
+        )
+        with pytest.raises(UnexpectedResponseError):
+            list(SnubaStreamingResult(response, self.reverse))
+        assert response.closed
+
+    @mock.patch("sentry.utils.snuba._raw_snql_query")
+    def test_raw_snql_query_stream(self, raw_snql_query):
+        raw_snql_query.return_value = make_response(self.body)
+        result = raw_snql_query_stream(mock.sentinel.request, "test")
+        assert raw_snql_query.call_args[1] == {"preload_content": False}
+        assert list(result) == self.body["data"]
+
+        raw_snql_query.return_value = make_response(
+            {"error": {"type": "rate-limited", "message": "slow down"}}, status=429
+        )
+        with pytest.raises(RateLimitExceeded):
+            raw_snql_query_stream(mock.sentinel.request, "test")
@@ -12,6 +12,7 @@ from sentry.rules.conditions.event_frequency import (
     EventFrequencyCondition,
     EventFrequencyPercentCondition,
     EventUniqueUserFrequencyCondition,
+    batch_frequency_queries,
 )
 from sentry.testutils.cases import RuleTestCase, SnubaTestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
@@ -187,6 +188,39 @@ class EventFrequencyConditionTestCase(
                 project_id=self.project.id,
             )
 
+    def test_batch_frequency_queries(self):
+        event = self.store_event(
+            data={
+                "fingerprint": ["something_random"],
+                "timestamp": iso_format(before_now(minutes=1)),
+            },
+            project_id=self.project.id,
+        )
+        self.increment(event, 3)
+        rules = [
+            self.get_rule(data={"interval": "1h", "value": 2}),
+            self.get_rule(data={"interval": "1h", "value": 10}),
+            self.get_rule(data={"interval": "1d", "value": 2}),
+        ]
+
+        with patch.object(EventFrequencyCondition, "query_hook", autospec=True) as query_hook:
+            query_hook.return_value = 4
+            with batch_frequency_queries():
+                self.assertPasses(rules[0], event)
+                self.assertDoesNotPass(rules[1], event)
+                self.assertPasses(rules[2], event)
+            # One query per distinct interval.
+            assert query_hook.call_count == 2
+
+            # Results are not reused for later events of the same group.
+            with batch_frequency_queries():
+                self.assertPasses(rules[0], event)
+            assert query_hook.call_count == 3
+
+            # Nor outside of a batch.
+            self.assertPasses(rules[0], event)
+            assert query_hook.call_count == 4
+
 
 @freeze_time((now() - timedelta(days=2)).replace(hour=12, minute=40, second=0, microsecond=0))
 class EventUniqueUserFrequencyConditionTestCase(